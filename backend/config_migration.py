@@ -0,0 +1,129 @@
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
+import yaml
+
+from .filemanagement import (
+    file_in_folder,
+    list_of_filenames_in_directory,
+    make_config_filter_paths_absolute,
+    write_file_atomically,
+)
+from .legacy_config_import import (
+    CURRENT_VERSION,
+    identify_version,
+    migrate_legacy_config,
+)
+
+DEFAULT_MIGRATION_WORKERS = 4
+
+
+def migrate_config_file(config_dir, config_name, validators, dry_run=False):
+    """
+    Migrate a single config file in config_dir to the current version.
+    The migrated config is validated, and only written if it has no blocking errors.
+    Returns a result dict with the file name, the status and any errors.
+    The status is one of "migrated", "current", "skipped" or "failed".
+    """
+    result = {
+        "name": config_name,
+        "status": "skipped",
+        "version": None,
+        "errors": None,
+    }
+    try:
+        path = file_in_folder(config_dir, config_name)
+        with open(path, encoding="utf-8") as f:
+            config_object = yaml.safe_load(f)
+        with validators.validator() as validator:
+            version = identify_version(config_object, validator)
+        result["version"] = version
+        if version is None:
+            result["errors"] = [
+                ([], "This does not appear to be a CamillaDSP config file.", "error")
+            ]
+            return result
+        if version == CURRENT_VERSION:
+            result["status"] = "current"
+            return result
+        migrate_legacy_config(config_object)
+        config_abs = make_config_filter_paths_absolute(config_object, config_dir)
+        with validators.validator() as validator:
+            validator.validate_config(config_abs)
+            issues = validator.get_errors()
+        if issues:
+            result["errors"] = issues
+        if any(issue[2] == "error" for issue in issues):
+            result["status"] = "failed"
+            return result
+        if not dry_run:
+            write_file_atomically(path, yaml.dump(config_object).encode("utf-8"))
+        result["status"] = "migrated"
+    except yaml.YAMLError as e:
+        result["errors"] = [([], f"YAML syntax error: {e}", "error")]
+    except (AttributeError, UnicodeDecodeError):
+        result["errors"] = [([], "This does not appear to be a YAML file.", "error")]
+    except Exception as e:
+        logging.error("Failed to migrate config file %s: %s", config_name, e)
+        result["status"] = "failed"
+        result["errors"] = [([], f"Error: {e}", "error")]
+    return result
+
+
+def migrate_config_dir(
+    config_dir, validators, workers=DEFAULT_MIGRATION_WORKERS, dry_run=False
+):
+    """
+    Migrate all legacy config files in config_dir, using a pool of worker threads.
+    This is a generator that yields the result for each file as it completes.
+    """
+    names = list_of_filenames_in_directory(config_dir)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                migrate_config_file, config_dir, name, validators, dry_run=dry_run
+            )
+            for name in names
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+async def migrate_config_dir_async(
+    config_dir, validators, workers=DEFAULT_MIGRATION_WORKERS, dry_run=False
+):
+    """
+    Async version of migrate_config_dir, for use in request handlers.
+    The files are migrated in worker threads, without blocking the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    names = await loop.run_in_executor(
+        None, list_of_filenames_in_directory, config_dir
+    )
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        tasks = [
+            loop.run_in_executor(
+                executor,
+                partial(
+                    migrate_config_file, config_dir, name, validators, dry_run=dry_run
+                ),
+            )
+            for name in names
+        ]
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        # Waiting for the executor here would block the event loop
+        # until all queued files are migrated, when the client disconnects.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def result_as_json_line(result):
+    """
+    Serialize a migration result as a line of json.
+    """
+    return (json.dumps(result) + "\n").encode("utf-8")
@@ -0,0 +1,192 @@
+import math
+from copy import deepcopy
+
+from .processing_cost import operations_per_sample
+
+
+def _gain_in_db(parameters):
+    """
+    Get the gain of a Gain filter in dB, and if it is inverted.
+    Returns None if the gain can't be expressed in dB.
+    """
+    gain = parameters.get("gain", 0.0)
+    inverted = bool(parameters.get("inverted"))
+    if parameters.get("scale") == "linear":
+        if gain == 0:
+            return None
+        if gain < 0:
+            inverted = not inverted
+        return 20 * math.log10(abs(gain)), inverted
+    return gain, inverted
+
+
+def _is_foldable_gain(filt):
+    return (
+        filt is not None
+        and filt.get("type") == "Gain"
+        and not (filt.get("parameters") or {}).get("mute")
+        and _gain_in_db(filt.get("parameters") or {}) is not None
+    )
+
+
+def _is_identity_mixer(mixer):
+    """
+    Check if a mixer passes all channels through unchanged.
+    """
+    channels = mixer["channels"]["in"]
+    if mixer["channels"]["out"] != channels:
+        return False
+    mappings = mixer.get("mapping") or []
+    if sorted(mapping["dest"] for mapping in mappings) != list(range(channels)):
+        return False
+    for mapping in mappings:
+        if mapping.get("mute") or len(mapping["sources"]) != 1:
+            return False
+        source = mapping["sources"][0]
+        if source["channel"] != mapping["dest"] or source.get("inverted"):
+            return False
+        if source.get("mute"):
+            return False
+        gain = source.get("gain", 0.0)
+        if source.get("scale") == "linear":
+            if gain != 1.0:
+                return False
+        elif gain != 0.0:
+            return False
+    return True
+
+
+def _unique_name(base, existing):
+    name = base
+    index = 2
+    while name in existing:
+        name = f"{base}_{index}"
+        index += 1
+    return name
+
+
+def _fold_gains(names, filters, report):
+    """
+    Replace runs of consecutive Gain filters in a list of filter names
+    by a single Gain filter.
+    New filter definitions are added to filters.
+    """
+    folded = []
+    run = []
+
+    def flush():
+        if len(run) == 1:
+            folded.append(run[0])
+        elif len(run) > 1:
+            total = 0.0
+            inverted = False
+            for name in run:
+                gain, invert = _gain_in_db(filters[name]["parameters"])
+                total += gain
+                inverted ^= invert
+            report["gain_filters_folded"] += len(run) - 1
+            if total == 0.0 and not inverted:
+                report["gain_filters_folded"] += 1
+            else:
+                name = _unique_name("+".join(run), filters)
+                filters[name] = {
+                    "type": "Gain",
+                    "description": "Combined gain of " + ", ".join(run),
+                    "parameters": {
+                        "gain": total,
+                        "scale": "dB",
+                        "inverted": inverted,
+                        "mute": False,
+                    },
+                }
+                folded.append(name)
+        run.clear()
+
+    for name in names:
+        if _is_foldable_gain(filters.get(name)):
+            run.append(name)
+        else:
+            flush()
+            folded.append(name)
+    flush()
+    return folded
+
+
+def _same_filter_step_target(first, second):
+    return (
+        first["type"] == "Filter"
+        and second["type"] == "Filter"
+        and not first.get("bypassed")
+        and not second.get("bypassed")
+        and first.get("channels") == second.get("channels")
+    )
+
+
+def _referenced_filters(pipeline):
+    return {
+        name
+        for step in pipeline
+        if step["type"] == "Filter"
+        for name in step.get("names") or []
+    }
+
+
+def optimize_config(config_object):
+    """
+    Optimize the pipeline of a config:
+    - remove mixers that pass all channels through unchanged,
+    - merge adjacent Filter steps that process the same channels,
+    - fold consecutive Gain filters in a step into a single Gain filter.
+    Filters and mixers that are no longer used are removed.
+    Returns the optimized config and a report of the changes,
+    the input config is not modified.
+    """
+    config = deepcopy(config_object)
+    filters = config.get("filters") or {}
+    mixers = config.get("mixers") or {}
+    pipeline = config.get("pipeline") or []
+    filters_before = _referenced_filters(pipeline)
+    report = {
+        "mixers_removed": 0,
+        "filter_steps_merged": 0,
+        "gain_filters_folded": 0,
+    }
+
+    identity_mixers = {
+        name for name, mixer in mixers.items() if _is_identity_mixer(mixer)
+    }
+    removed_mixers = set()
+    steps = []
+    for step in pipeline:
+        if step["type"] == "Mixer" and step["name"] in identity_mixers:
+            removed_mixers.add(step["name"])
+            report["mixers_removed"] += 1
+            continue
+        if step["type"] == "Filter" and not step.get("names"):
+            continue
+        if steps and _same_filter_step_target(steps[-1], step):
+            steps[-1]["names"] = steps[-1]["names"] + step["names"]
+            report["filter_steps_merged"] += 1
+            continue
+        steps.append(step)
+
+    for step in steps:
+        if step["type"] == "Filter" and not step.get("bypassed"):
+            step["names"] = _fold_gains(step["names"], filters, report)
+    steps = [step for step in steps if step["type"] != "Filter" or step["names"]]
+
+    used_mixers = {step["name"] for step in steps if step["type"] == "Mixer"}
+    for name in removed_mixers - used_mixers:
+        del mixers[name]
+    unused_filters = filters_before - _referenced_filters(steps)
+    for name in unused_filters:
+        filters.pop(name, None)
+    if "pipeline" in config:
+        config["pipeline"] = steps
+
+    operations_before = operations_per_sample(config_object)
+    operations_after = operations_per_sample(config)
+    report["operations_per_sample_before"] = operations_before
+    report["operations_per_sample_after"] = operations_after
+    report["operations_per_sample_saved"] = operations_before - operations_after
+    return config, report
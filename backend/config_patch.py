@@ -0,0 +1,157 @@
+from copy import deepcopy
+
+
+class PatchError(ValueError):
+    """
+    Raised when a JSON Patch can't be applied to a config.
+    """
+
+
+def _parse_pointer(pointer):
+    """
+    Split a JSON Pointer (RFC 6901) into a list of reference tokens.
+    """
+    if not isinstance(pointer, str):
+        raise PatchError(f"Invalid JSON pointer: {pointer}")
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise PatchError(f"JSON pointer must start with '/': {pointer}")
+    return [
+        token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")
+    ]
+
+
+def _child_key(container, token, for_add=False):
+    """
+    Get the key or index in a container that a token refers to.
+    """
+    if isinstance(container, dict):
+        return token
+    if isinstance(container, list):
+        if for_add and token == "-":
+            return len(container)
+        if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+            raise PatchError(f"Invalid array index: {token}")
+        index = int(token)
+        limit = len(container) + 1 if for_add else len(container)
+        if index >= limit:
+            raise PatchError(f"Array index out of range: {token}")
+        return index
+    raise PatchError(f"Can't reference '{token}' in a value that is not a container")
+
+
+def _get(document, tokens):
+    value = document
+    for token in tokens:
+        key = _child_key(value, token)
+        if isinstance(value, dict) and key not in value:
+            raise PatchError(f"Path does not exist: /{'/'.join(tokens)}")
+        value = value[key]
+    return value
+
+
+def _shallow_copy(value):
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return list(value)
+    raise PatchError("Can't modify a value that is not a container")
+
+
+def _copy_to_parent(document, tokens):
+    """
+    Make shallow copies of the containers from the document root
+    down to the parent of the target.
+    Returns the new root and the copied parent container.
+    """
+    root = _shallow_copy(document)
+    parent = root
+    for token in tokens[:-1]:
+        key = _child_key(parent, token)
+        if isinstance(parent, dict) and key not in parent:
+            raise PatchError(f"Path does not exist: /{'/'.join(tokens)}")
+        child = _shallow_copy(parent[key])
+        parent[key] = child
+        parent = child
+    return root, parent
+
+
+def _add(document, tokens, value):
+    if not tokens:
+        return value
+    root, parent = _copy_to_parent(document, tokens)
+    key = _child_key(parent, tokens[-1], for_add=True)
+    if isinstance(parent, list):
+        parent.insert(key, value)
+    else:
+        parent[key] = value
+    return root
+
+
+def _remove(document, tokens):
+    if not tokens:
+        raise PatchError("Can't remove the whole document")
+    root, parent = _copy_to_parent(document, tokens)
+    key = _child_key(parent, tokens[-1])
+    if isinstance(parent, dict) and key not in parent:
+        raise PatchError(f"Path does not exist: /{'/'.join(tokens)}")
+    del parent[key]
+    return root
+
+
+def _replace(document, tokens, value):
+    if not tokens:
+        return value
+    root, parent = _copy_to_parent(document, tokens)
+    key = _child_key(parent, tokens[-1])
+    if isinstance(parent, dict) and key not in parent:
+        raise PatchError(f"Path does not exist: /{'/'.join(tokens)}")
+    parent[key] = value
+    return root
+
+
+def _apply_operation(document, operation):
+    if not isinstance(operation, dict) or "op" not in operation:
+        raise PatchError(f"Invalid patch operation: {operation}")
+    if "path" not in operation:
+        raise PatchError(f"Patch operation is missing 'path': {operation}")
+    op = operation["op"]
+    tokens = _parse_pointer(operation["path"])
+    if op in ("add", "replace", "test") and "value" not in operation:
+        raise PatchError(f"Patch operation is missing 'value': {operation}")
+    if op == "add":
+        return _add(document, tokens, operation["value"])
+    if op == "remove":
+        return _remove(document, tokens)
+    if op == "replace":
+        return _replace(document, tokens, operation["value"])
+    if op in ("move", "copy"):
+        if "from" not in operation:
+            raise PatchError(f"Patch operation is missing 'from': {operation}")
+        from_tokens = _parse_pointer(operation["from"])
+        value = _get(document, from_tokens)
+        if op == "copy":
+            return _add(document, tokens, deepcopy(value))
+        if tokens[: len(from_tokens)] == from_tokens and tokens != from_tokens:
+            raise PatchError("Can't move a value into one of its children")
+        return _add(_remove(document, from_tokens), tokens, value)
+    if op == "test":
+        if _get(document, tokens) != operation["value"]:
+            raise PatchError(f"Test failed for path: {operation['path']}")
+        return document
+    raise PatchError(f"Unknown patch operation: {op}")
+
+
+def apply_patch(document, patch):
+    """
+    Apply a JSON Patch (RFC 6902) to a document.
+    The document is not modified, only the containers on the paths
+    touched by the patch are copied, everything else is shared
+    between the original and the patched document.
+    """
+    if not isinstance(patch, list):
+        raise PatchError("A patch must be a list of operations")
+    for operation in patch:
+        document = _apply_operation(document, operation)
+    return document
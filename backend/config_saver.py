@@ -0,0 +1,85 @@
+import asyncio
+import hashlib
+import logging
+
+import yaml
+
+from .filemanagement import file_mtime, write_file_atomically
+
+
+def content_hash(data):
+    """
+    Get the hash of the content of a file, as a hex string.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+class ConfigSaver:
+    """
+    Writes config files in a worker thread, one write at a time per file.
+    A config saved while a write of the same file is in progress is kept pending,
+    and replaces any config that was already pending for that file.
+    The futures of all the saves that were replaced get the result
+    of the write that replaced them.
+    A file is not written again if it already has the same content.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._workers = {}
+        self._written = {}
+        self.writes = 0
+
+    def save(self, path, config_object):
+        """
+        Queue a config to be written to a file,
+        and return a future for the hash of the written content.
+        """
+        future = asyncio.get_running_loop().create_future()
+        futures = [future]
+        if path in self._pending:
+            logging.debug("Replacing pending save of %s", path)
+            futures = self._pending[path][1] + futures
+        self._pending[path] = (config_object, futures)
+        if path not in self._workers:
+            self._workers[path] = asyncio.create_task(self._write_pending(path))
+        return future
+
+    async def _write_pending(self, path):
+        loop = asyncio.get_running_loop()
+        try:
+            while path in self._pending:
+                config_object, futures = self._pending.pop(path)
+                try:
+                    digest = await loop.run_in_executor(
+                        None, self._write, path, config_object
+                    )
+                except Exception as e:
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    for future in futures:
+                        if not future.done():
+                            future.set_result(digest)
+        finally:
+            del self._workers[path]
+
+    def _write(self, path, config_object):
+        data = yaml.dump(config_object).encode("utf-8")
+        digest = content_hash(data)
+        if self._written.get(path) == (digest, file_mtime(path)):
+            logging.debug("Config file %s is unchanged, not writing", path)
+            return digest
+        write_file_atomically(path, data)
+        self._written[path] = (digest, file_mtime(path))
+        self.writes += 1
+        return digest
+
+    async def wait(self):
+        """
+        Wait for all pending writes to finish.
+        """
+        workers = list(self._workers.values())
+        if workers:
+            await asyncio.wait(workers)
@@ -1,6 +1,8 @@
 import logging
 from copy import copy
 
+from .filters import merge_duplicate_filters
+
 
 class EqAPO:
     filter_types = {
@@ -39,7 +41,17 @@ class EqAPO:
     delay_units = {"ms": "ms", "samples": "samples"}
 
     def __init__(self, config_text, nbr_channels):
-        self.lines = config_text.splitlines()
+        """
+        The config can be given either as a string,
+        or as an iterable of lines such as an open text file.
+        It's also possible to pass an empty string,
+        and then provide the text in chunks with `feed()`.
+        """
+        if isinstance(config_text, str):
+            self.lines = config_text.splitlines()
+        else:
+            self.lines = config_text
+        self._partial_line = ""
         self.filters = {}
         self.mixers = {}
         self.name_index = {
@@ -113,8 +125,7 @@ class EqAPO:
         return parsed, params[nbr_tokens:]
 
     # Parse the parameters for a command
-    def parse_filter_params(self, param_str):
-        params = param_str.split()
+    def parse_filter_params(self, params):
         # TODO skip this command if OFF
         # enabled = params[0] == "ON"
         ftype = params[1]
@@ -130,23 +141,21 @@ class EqAPO:
         return param_dict
 
     # Parse a Preamp command to a filter
-    def parse_gain(self, param_str):
-        params = param_str.split()
+    def parse_gain(self, params):
         gain = self.parse_number(params[0])
         if params[1].lower() != "db":
-            logging.warning("invalid preamp line: %s", param_str)
+            logging.warning("invalid preamp line: %s", " ".join(params))
             return None
         return {"type": "Gain", "parameters": {"gain": gain, "scale": "dB"}}
 
     # Parse a Delay command to a filter
-    def parse_delay(self, param_str):
-        params = param_str.split()
+    def parse_delay(self, params):
         delay = self.parse_number(params[0])
         unit = self.delay_units[params[1]]
         return {"type": "Delay", "parameters": {"delay": delay, "unit": unit}}
 
     # Parse a Copy command into a Mixer
-    def parse_copy(self, param_str):
+    def parse_copy(self, params):
         handled_channels = set()
         mixer = {
             "channels": {
@@ -155,7 +164,6 @@ class EqAPO:
             },
             "mapping": [],
         }
-        params = param_str.strip().split(" ")
         for dest in params:
             dest_ch, expr = dest.split("=")
             dest_ch = self.lookup_channel_index(dest_ch)
@@ -218,13 +226,19 @@ class EqAPO:
         if not line or line.startswith("#") or not ":" in line:
             return
         filtname = None
+        description = line.strip()
         command_name, params = line.split(":", 1)
-        command = command_name.split()[0]
+        command_tokens = command_name.split()
+        if not command_tokens:
+            return
+        command = command_tokens[0]
+        # Split the parameters once, the parsers below all work on the tokens.
+        tokens = params.split()
         logging.debug("Parse command: %s", command)
         if command in ("Filter", "Convolution", "Preamp", "Delay"):
             filt = {}
             if command == "Filter":
-                filterparams = self.parse_filter_params(params)
+                filterparams = self.parse_filter_params(tokens)
                 if not filterparams:
                     return
                 filt = {"type": "Biquad", "parameters": filterparams}
@@ -235,31 +249,29 @@ class EqAPO:
                     "parameters": {"filename": filename, "type": "wav"},
                 }
             elif command == "Preamp":
-                filt = self.parse_gain(params)
+                filt = self.parse_gain(tokens)
             elif command == "Delay":
-                filt = self.parse_delay(params)
-            filt["description"] = line.strip()
+                filt = self.parse_delay(tokens)
+            filt["description"] = description
             filtname = f"{command}_{self.name_index[command]}"
             self.name_index[command] += 1
             self.filters[filtname] = filt
             self.pipeline[-1]["names"].append(filtname)
         elif command == "Channel":
-            if params.strip() == "all":
+            if tokens == ["all"]:
                 self.selected_channels = None
             else:
-                self.selected_channels = [
-                    self.lookup_channel_index(c) for c in params.strip().split(" ")
-                ]
+                self.selected_channels = [self.lookup_channel_index(c) for c in tokens]
             new_filterstep = {
                 "type": "Filter",
                 "names": [],
-                "description": line.strip(),
+                "description": description,
                 "channels": copy(self.selected_channels),
             }
             self.pipeline.append(new_filterstep)
         elif command == "Copy":
-            mixer = self.parse_copy(params)
-            mixer["description"] = line.strip()
+            mixer = self.parse_copy(tokens)
+            mixer["description"] = description
             mixername = f"{command}_{self.name_index[command]}"
             self.name_index[command] += 1
             self.mixers[mixername] = mixer
@@ -291,14 +303,18 @@ class EqAPO:
             logging.warning("Skipping unrecognized command '%s'", command)
 
     def postprocess(self):
-        for idx, step in enumerate(list(self.pipeline)):
-            if step["type"] == "Filter" and len(step["names"]) == 0:
-                logging.debug("remove %s", step)
-                self.pipeline.remove(step)
+        # Rebuild the lists instead of removing items one by one,
+        # to keep this linear in the number of steps.
+        self.pipeline = [
+            step
+            for step in self.pipeline
+            if step["type"] != "Filter" or len(step["names"]) > 0
+        ]
         for _, mixer in self.mixers.items():
-            for idx, dest in enumerate(list(mixer["mapping"])):
-                if len(dest["sources"]) == 0:
-                    mixer["mapping"].pop(idx)
+            mixer["mapping"] = [
+                dest for dest in mixer["mapping"] if len(dest["sources"]) > 0
+            ]
+        merge_duplicate_filters({"filters": self.filters, "pipeline": self.pipeline})
 
     def build_config(self):
         config = {
@@ -308,9 +324,30 @@ class EqAPO:
         }
         return config
 
+    def feed(self, text):
+        """
+        Parse a chunk of text.
+        Complete lines are parsed immediately,
+        an incomplete last line is kept until the next chunk arrives.
+        """
+        lines = (self._partial_line + text).split("\n")
+        self._partial_line = lines.pop()
+        for line in lines:
+            self.parse_line(line.rstrip("\r"))
+
+    def finish(self):
+        """
+        Parse any remaining text given to `feed()`, and return the config.
+        """
+        if self._partial_line:
+            self.parse_line(self._partial_line.rstrip("\r"))
+            self._partial_line = ""
+        self.postprocess()
+        return self.build_config()
+
     def translate_file(self):
         for line in self.lines:
-            self.parse_line(line)
+            self.parse_line(line.rstrip("\r\n"))
         self.postprocess()
         config = self.build_config()
         return config
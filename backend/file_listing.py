@@ -0,0 +1,124 @@
+import threading
+from fnmatch import fnmatchcase
+
+from .filemanagement import config_file_info
+
+FILE_FIELDS = ("name", "lastModified", "size")
+CONFIG_INFO_FIELDS = ("title", "description", "version", "valid", "errors")
+CONFIG_FIELDS = FILE_FIELDS + CONFIG_INFO_FIELDS
+
+SORT_KEYS = {
+    "name": lambda entry: entry["name"].lower(),
+    "mtime": lambda entry: entry["lastModified"],
+    "size": lambda entry: entry["size"],
+}
+
+_GLOB_CHARACTERS = "*?["
+
+
+def _non_negative_int(query, name):
+    value = query.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        number = int(value)
+    except ValueError as e:
+        raise ValueError(f"Invalid value for {name}: {value}") from e
+    if number < 0:
+        raise ValueError(f"Invalid value for {name}: {value}")
+    return number
+
+
+def parse_listing_query(query, allowed_fields):
+    """
+    Read the offset, limit, sort, filter and fields parameters of a file listing.
+    Sorting is by name, mtime or size, with a "-" prefix for descending order.
+    Fields are given as a comma separated list.
+    Raises ValueError if any parameter is invalid.
+    """
+    sort = query.get("sort") or "name"
+    if sort.lstrip("-") not in SORT_KEYS:
+        raise ValueError(f"Invalid sort order: {sort}")
+    fields = allowed_fields
+    if query.get("fields"):
+        fields = tuple(field.strip() for field in query["fields"].split(","))
+        unknown = [field for field in fields if field not in allowed_fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return {
+        "offset": _non_negative_int(query, "offset") or 0,
+        "limit": _non_negative_int(query, "limit"),
+        "sort": sort,
+        "pattern": query.get("filter") or None,
+        "fields": fields,
+    }
+
+
+def name_matches(name, pattern):
+    """
+    Check if a file name matches a filter, ignoring case.
+    A filter with any of the characters *?[ is a glob pattern,
+    otherwise it matches any name that contains it.
+    """
+    name = name.lower()
+    pattern = pattern.lower()
+    if any(character in pattern for character in _GLOB_CHARACTERS):
+        return fnmatchcase(name, pattern)
+    return pattern in name
+
+
+def select_files(entries, offset=0, limit=None, sort="name", pattern=None):
+    """
+    Filter, sort and slice a list of file entries.
+    Returns the number of matching entries, and the selected entries.
+    """
+    if pattern:
+        entries = [entry for entry in entries if name_matches(entry["name"], pattern)]
+    descending = sort.startswith("-")
+    key = SORT_KEYS[sort.lstrip("-")]
+    # Sorting by name first gives a stable order for equal values.
+    entries = sorted(entries, key=SORT_KEYS["name"])
+    entries.sort(key=key, reverse=descending)
+    end = None if limit is None else offset + limit
+    return len(entries), entries[offset:end]
+
+
+def pick_fields(entries, fields):
+    """
+    Keep only the given fields of each entry.
+    """
+    return [{field: entry.get(field) for field in fields} for entry in entries]
+
+
+class ConfigInfoIndex:
+    """
+    Keeps the title, description and validation result of config files,
+    and reuses them for as long as the file is unchanged.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def info(self, folder, entry, validator):
+        """
+        Get the title, description and validation result of a config file,
+        given its name, modification time and size.
+        """
+        key = (entry["lastModified"], entry["size"])
+        with self._lock:
+            cached = self._entries.get(entry["name"])
+        if cached is not None and cached[0] == key:
+            return dict(cached[1])
+        info = config_file_info(folder, entry["name"], validator)
+        with self._lock:
+            self._entries[entry["name"]] = (key, info)
+        return dict(info)
+
+    def forget(self, name):
+        with self._lock:
+            self._entries.pop(name, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
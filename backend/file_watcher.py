@@ -0,0 +1,374 @@
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import stat
+import struct
+import sys
+from os.path import join
+
+from .filemanagement import list_of_files_in_directory
+
+# Seconds between directory scans when inotify is not available.
+DEFAULT_POLL_INTERVAL = 2.0
+
+# Largest number of events kept for a subscriber that is not reading them.
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+CREATED = "created"
+MODIFIED = "modified"
+DELETED = "deleted"
+# Sent instead of the events that did not fit in the queue of a subscriber.
+OVERFLOW = "overflow"
+
+# Flags from <sys/inotify.h>
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+
+WATCH_MASK = (
+    IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+# Events that mean that the watched directory itself is gone,
+# and that the watch no longer works.
+LOST_WATCH_MASK = IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED
+RESCAN_MASK = LOST_WATCH_MASK | IN_Q_OVERFLOW
+
+# struct inotify_event: wd, mask, cookie, len, followed by the name.
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """
+    Minimal inotify wrapper, calling the C library via ctypes.
+    """
+
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    def add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        return wd
+
+    def rm_watch(self, wd):
+        if self._libc.inotify_rm_watch(self.fd, wd) < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    def read_events(self):
+        """
+        Read the queued events, without blocking.
+        Returns a list of (watch descriptor, mask, name) tuples.
+        """
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                events.append((wd, mask, os.fsdecode(name)))
+
+    def close(self):
+        os.close(self.fd)
+
+
+def file_entry(folder, name):
+    """
+    Get the name, modification time and size of a file in a folder.
+    Returns None for hidden files, directories and files that don't exist.
+    """
+    if name.startswith("."):
+        return None
+    try:
+        st = os.stat(join(folder, name))
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return {"name": name, "lastModified": st.st_mtime, "size": st.st_size}
+
+
+def scan_directory(folder):
+    """
+    Get the entries of all files in a folder, as a dict with the file names as keys.
+    """
+    try:
+        files = list_of_files_in_directory(folder)
+    except OSError as e:
+        logging.error("Unable to list directory %s: %s", folder, e)
+        return {}
+    return {file["name"]: file for file in files}
+
+
+class FileWatcher:
+    """
+    Keeps the list of files in a set of directories in memory,
+    and publishes an event for every file that is created, modified or deleted.
+    The directories are watched with inotify where available,
+    and are otherwise scanned every poll_interval seconds in the executor.
+    Changes made by the backend itself should be reported with refresh,
+    so that they are included right away also when polling.
+    The directories are given as a dict with a label for each path.
+    """
+
+    def __init__(self, directories, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.directories = dict(directories)
+        self.poll_interval = poll_interval
+        self.methods = {}
+        self._state = {}
+        self._inotify = None
+        self._watches = {}
+        self._poll_task = None
+        self._listeners = []
+        self._subscribers = set()
+
+    async def start(self):
+        """
+        Scan the directories and start watching them for changes.
+        """
+        loop = asyncio.get_running_loop()
+        self._start_inotify()
+        watched = {label for labels in self._watches.values() for label in labels}
+        self.methods = {
+            label: "inotify" if label in watched else "polling"
+            for label in self.directories
+        }
+        # The watches are added first, so that no change is missed.
+        for label, folder in self.directories.items():
+            self._state[label] = await loop.run_in_executor(
+                None, scan_directory, folder
+            )
+        if self._inotify is not None:
+            loop.add_reader(self._inotify.fd, self._read_inotify_events)
+        if len(watched) < len(self.directories):
+            self._poll_task = asyncio.create_task(self._poll())
+
+    @property
+    def method(self):
+        """
+        How the directories are watched: "inotify", "polling", or "mixed".
+        """
+        methods = set(self.methods.values())
+        if len(methods) == 1:
+            return methods.pop()
+        return "mixed" if methods else None
+
+    def _start_inotify(self):
+        # Directories that can't be watched with inotify are polled instead.
+        try:
+            self._inotify = _Inotify()
+        except (OSError, AttributeError) as e:
+            logging.info("Using polling to watch for file changes: %s", e)
+            return
+        for label, folder in self.directories.items():
+            try:
+                wd = self._inotify.add_watch(folder)
+            except OSError as e:
+                logging.info("Using polling to watch %s for changes: %s", folder, e)
+                continue
+            self._watches.setdefault(wd, []).append(label)
+        if not self._watches:
+            self._stop_inotify()
+
+    def _stop_inotify(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        self._watches = {}
+
+    def stop(self):
+        """
+        Stop watching the directories.
+        """
+        if self._inotify is not None:
+            asyncio.get_running_loop().remove_reader(self._inotify.fd)
+            self._stop_inotify()
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+
+    def add_listener(self, callback):
+        """
+        Call a function with every change event.
+        """
+        self._listeners.append(callback)
+
+    def subscribe(self):
+        """
+        Get a queue that receives every change event.
+        """
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    def files(self, label):
+        """
+        Get the name, modification time and size of the files in a directory,
+        sorted by name.
+        """
+        self._update(label)
+        return sorted(
+            (dict(entry) for entry in self._state[label].values()),
+            key=lambda entry: entry["name"].lower(),
+        )
+
+    def names(self, label):
+        """
+        Get the names of the files in a directory, sorted by name.
+        """
+        self._update(label)
+        return sorted(self._state[label], key=str.lower)
+
+    def refresh(self, folder, names):
+        """
+        Check the given files in a folder for changes right away.
+        """
+        for label, path in self.directories.items():
+            if path == folder and label in self._state:
+                for name in names:
+                    self._refresh(label, name)
+
+    def _update(self, label):
+        if label not in self._state:
+            # Not started yet.
+            self._state[label] = scan_directory(self.directories[label])
+        elif self.methods.get(label) == "inotify":
+            # Changes made just before are handled before answering.
+            self._read_inotify_events()
+
+    def _read_inotify_events(self):
+        rescan = set()
+        changed = {}
+        for wd, mask, name in self._inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                rescan.update(self.directories)
+                continue
+            labels = self._watches.get(wd, ())
+            if mask & LOST_WATCH_MASK:
+                labels = self._watch_again(wd, mask)
+            if mask & RESCAN_MASK:
+                rescan.update(labels)
+            elif name:
+                for label in labels:
+                    changed.setdefault(label, set()).add(name)
+        for label in rescan:
+            logging.warning("Lost track of %s, scanning it again", label)
+            self._apply_scan(label, scan_directory(self.directories[label]))
+        for label, names in changed.items():
+            if label in rescan:
+                continue
+            for name in sorted(names):
+                self._refresh(label, name)
+
+    def _watch_again(self, wd, mask):
+        # The watched directory was deleted or moved away, and its watch is gone.
+        # The path is watched again, or polled if that fails.
+        labels = self._watches.pop(wd, [])
+        if mask & IN_MOVE_SELF:
+            try:
+                self._inotify.rm_watch(wd)
+            except OSError:
+                pass
+        for label in labels:
+            folder = self.directories[label]
+            try:
+                new_wd = self._inotify.add_watch(folder)
+            except OSError as e:
+                logging.warning("Using polling to watch %s for changes: %s", folder, e)
+                self.methods[label] = "polling"
+                continue
+            self._watches.setdefault(new_wd, []).append(label)
+        if "polling" in self.methods.values() and self._poll_task is None:
+            self._poll_task = asyncio.create_task(self._poll())
+        return labels
+
+    def _refresh(self, label, name):
+        state = self._state[label]
+        old = state.get(name)
+        new = file_entry(self.directories[label], name)
+        if new is None:
+            if old is not None:
+                del state[name]
+                self._publish(label, DELETED, name, None)
+        elif old is None:
+            state[name] = new
+            self._publish(label, CREATED, name, new)
+        elif new != old:
+            state[name] = new
+            self._publish(label, MODIFIED, name, new)
+
+    def _apply_scan(self, label, entries):
+        old_state = self._state.get(label, {})
+        self._state[label] = entries
+        for name in sorted(old_state.keys() - entries.keys()):
+            self._publish(label, DELETED, name, None)
+        for name, entry in sorted(entries.items()):
+            if name not in old_state:
+                self._publish(label, CREATED, name, entry)
+            elif old_state[name] != entry:
+                self._publish(label, MODIFIED, name, entry)
+
+    async def _poll(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            for label, folder in self.directories.items():
+                if self.methods[label] != "polling":
+                    continue
+                entries = await loop.run_in_executor(None, scan_directory, folder)
+                self._apply_scan(label, entries)
+
+    def _publish(self, label, event_type, name, entry):
+        event = {
+            "directory": label,
+            "event": event_type,
+            "name": name,
+            "file": dict(entry) if entry is not None else None,
+        }
+        logging.debug("File change: %s", event)
+        for callback in self._listeners:
+            try:
+                callback(event)
+            except Exception as e:
+                logging.error("File change listener failed: %s", e)
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # The subscriber must reload everything.
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"event": OVERFLOW})
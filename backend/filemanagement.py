@@ -1,14 +1,16 @@
+import asyncio
+import codecs
 import io
 import logging
 import os
+import stat
+import tempfile
+import time
 import traceback
 import zipfile
-from copy import deepcopy
 from os import rename
 from os.path import (
     commonpath,
-    getmtime,
-    getsize,
     isabs,
     isfile,
     join,
@@ -22,9 +24,10 @@ from typing import Optional
 import yaml
 from aiohttp import web
 from camilladsp import CamillaError
-from yaml.scanner import ScannerError
 
 from .legacy_config_import import identify_version, CURRENT_VERSION
+from .metrics import span
+from .shell_commands import CommandTimeout, run_shell_command
 
 DEFAULT_STATEFILE = {
     "config_path": None,
@@ -32,6 +35,9 @@ DEFAULT_STATEFILE = {
     "volume": [0.0, 0.0, 0.0, 0.0, 0.0],
 }
 
+# Longest time in seconds that a resolved active config name is reused.
+ACTIVE_CONFIG_NAME_TTL = 10.0
+
 
 def file_in_folder(folder, filename):
     """
@@ -55,11 +61,12 @@ def path_of_coeff_file(request, coeff_name):
 async def store_files(folder, request):
     """
     Write a set of files (raw data) to disk.
+    Returns the names of the stored files.
     """
     data = await request.post()
-    i = 0
+    names = []
     while True:
-        filename = f"file{i}"
+        filename = f"file{len(names)}"
         if filename not in data:
             break
         file = data[filename]
@@ -67,8 +74,43 @@ async def store_files(folder, request):
         content = file.file.read()
         with open(file_in_folder(folder, filename), "wb") as f:
             f.write(content)
-        i += 1
-    return web.Response(text=f"Saved {i} file(s)")
+        names.append(filename)
+    return names
+
+
+async def iter_uploaded_text(request, max_size, chunk_size=64 * 1024):
+    """
+    Read the text of an upload in chunks, while the request body is arriving.
+    Accepts either a multipart upload, where the first part is used,
+    or the text as the plain request body.
+    Raises HTTPRequestEntityTooLarge as soon as more than max_size bytes have arrived.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    received = 0
+    if request.content_type.startswith("multipart/"):
+        reader = await request.multipart()
+        part = await reader.next()
+        if part is None:
+            return
+
+        async def chunks():
+            while True:
+                chunk = await part.read_chunk(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+        source = chunks()
+    else:
+        source = request.content.iter_chunked(chunk_size)
+    async for chunk in source:
+        received += len(chunk)
+        if received > max_size:
+            raise web.HTTPRequestEntityTooLarge(
+                max_size=max_size, actual_size=received
+            )
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
 
 
 def list_of_files_in_directory(
@@ -79,16 +121,17 @@ def list_of_files_in_directory(
     """
 
     files_list = []
-    for file in os.listdir(folder):
-        file_data = _get_file_data(
-            folder,
-            file,
-            file_stats=file_stats,
-            title_and_desc=title_and_desc,
-            validator=validator,
-        )
-        if file_data is not None:
-            files_list.append(file_data)
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            file_data = _get_file_data(
+                folder,
+                entry,
+                file_stats=file_stats,
+                title_and_desc=title_and_desc,
+                validator=validator,
+            )
+            if file_data is not None:
+                files_list.append(file_data)
 
     sorted_files = sorted(files_list, key=lambda x: x["name"].lower())
     return sorted_files
@@ -114,7 +157,8 @@ def _get_title_and_desc(filepath, file_data, folder, validator=None):
                 return
             file_data["title"] = parsed.get("title")
             file_data["description"] = parsed.get("description")
-            file_data["version"] = identify_version(parsed)
+            with span("validation"):
+                file_data["version"] = identify_version(parsed, validator)
             if file_data["version"] is None:
                 file_data["errors"] = [
                     (
@@ -158,25 +202,42 @@ def _get_title_and_desc(filepath, file_data, folder, validator=None):
             file_data["errors"] = [([], f"Error: {e}", "error")]
 
 
-def _get_file_data(folder, file, file_stats=True, title_and_desc=False, validator=None):
-    filepath = file_in_folder(folder, file)
-    if not isfile(filepath) or file.startswith("."):
-        # skip directories and hidden files
+def _get_file_data(folder, entry, file_stats=True, title_and_desc=False, validator=None):
+    # The file type usually comes with the directory listing,
+    # and DirEntry.stat() is cached, so there is at most one stat call per file.
+    if entry.name.startswith("."):
+        # skip hidden files
+        return None
+    try:
+        if not entry.is_file():
+            # skip directories
+            return None
+        file_data = {
+            "name": entry.name,
+        }
+        if file_stats:
+            stats = entry.stat()
+            file_data["lastModified"] = stats.st_mtime
+            file_data["size"] = stats.st_size
+    except OSError:
+        # the file was removed while listing
         return None
-
-    file_data = {
-        "name": file,
-    }
-    if file_stats:
-        file_data["lastModified"] = getmtime(filepath)
-        file_data["size"] = getsize(filepath)
 
     if title_and_desc:
-        _get_title_and_desc(filepath, file_data, folder, validator=validator)
+        _get_title_and_desc(entry.path, file_data, folder, validator=validator)
 
     return file_data
 
 
+def config_file_info(folder, file, validator=None):
+    """
+    Get the title, description, version and validation result of a config file.
+    """
+    info = {}
+    _get_title_and_desc(file_in_folder(folder, file), info, folder, validator=validator)
+    return info
+
+
 def list_of_filenames_in_directory(folder):
     return [
         file["name"] for file in list_of_files_in_directory(folder, file_stats=False)
@@ -221,15 +282,56 @@ def read_yaml_from_path_to_object(request, path):
     """
     Read a yaml file at the given path, return the validated content as a Python object.
     """
-    validator = request.app["VALIDATOR"]
-    validator.validate_file(path)
-    return validator.get_config()
+    with request.app["VALIDATORS"].validator() as validator:
+        validator.validate_file(path)
+        return validator.get_config()
 
 
-def get_active_config_path(request):
+def file_mtime(path):
     """
-    Get the active config filename.
+    Get the modification time of a file, or None if it doesn't exist.
+    """
+    if not path:
+        return None
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def invalidate_active_config_path(app):
+    """
+    Forget the cached active config name, it is resolved again on the next request.
+    """
+    app["STORE"]["active_config_name"] = None
+
+
+async def get_active_config_path(request):
     """
+    Get the active config filename.
+    The result is cached, and resolved again when the statefile is modified,
+    when the active config is set, or after ACTIVE_CONFIG_NAME_TTL seconds.
+    """
+    store = request.app["STORE"]
+    statefile_mtime = file_mtime(request.app["statefile_path"])
+    now = time.monotonic()
+    cached = store["active_config_name"]
+    if (
+        cached is not None
+        and now - cached["time"] < ACTIVE_CONFIG_NAME_TTL
+        and cached["statefile_mtime"] == statefile_mtime
+    ):
+        return cached["name"]
+    name = await _resolve_active_config_path(request)
+    store["active_config_name"] = {
+        "name": name,
+        "time": now,
+        "statefile_mtime": statefile_mtime,
+    }
+    return name
+
+
+async def _resolve_active_config_path(request):
     statefile_path = request.app["statefile_path"]
     config_dir = request.app["config_dir"]
     cdsp = request.app["CAMILLA"]
@@ -253,28 +355,50 @@ def get_active_config_path(request):
             return None
         if statefile_path:
             logging.debug("Getting config from statefile: %s", statefile_path)
-            confpath = _read_statefile_config_path(statefile_path)
+            confpath = request.app["STATEFILE"].get("config_path")
             return _verify_path_in_config_dir(confpath, config_dir)
         logging.error(
             "The backend config has no state file and is unable to persistently store config file path"
         )
         return None
     try:
-        logging.debug("Running command: %s", on_get)
-        stream = os.popen(on_get)
-        result = stream.read().strip()
-        logging.debug("Command result: %s", result)
-        fname = _verify_path_in_config_dir(result, config_dir)
+        _returncode, result, _stderr = await run_shell_command(
+            on_get, request.app["active_config_command_timeout"]
+        )
+        fname = _verify_path_in_config_dir(result.strip(), config_dir)
         return fname
+    except CommandTimeout as e:
+        logging.error("Failed to run on_get_active_config command: %s", e)
+        return None
     except Exception:
         logging.error("Failed to run on_get_active_config command")
         traceback.print_exc()
         return None
 
 
-def set_path_as_active_config(request, filepath):
+def _log_on_set_result(future):
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logging.error("Failed to run on_set_active_config command: %s", error)
+    elif future.result() is None:
+        logging.debug("on_set_active_config command replaced by a newer one")
+    else:
+        returncode, stdout, stderr = future.result()
+        if returncode != 0:
+            logging.error(
+                "on_set_active_config command failed with exit code %s: %s",
+                returncode,
+                stderr.strip() or stdout.strip(),
+            )
+
+
+async def set_path_as_active_config(request, filepath):
     """
     Persistlently set the given config file path as the active config.
+    The on_set_active_config command runs without blocking the event loop.
+    Unless on_set_active_config_background is set, this waits for it to finish.
     """
     on_set = request.app["on_set_active_config"]
     statefile_path = request.app["statefile_path"]
@@ -286,12 +410,8 @@ def set_path_as_active_config(request, filepath):
         online = False
     if not online:
         if statefile_path:
-            try:
-                logging.debug("Update config file path in statefile to '%s'", filepath)
-                _update_statefile_config_path(statefile_path, filepath)
-            except Exception:
-                logging.error("Failed to update statefile at %s", statefile_path)
-                traceback.print_exc()
+            logging.debug("Update config file path in statefile to '%s'", filepath)
+            request.app["STATEFILE"].update(config_path=filepath)
         else:
             logging.error(
                 "The backend config has no state file and is unable to persistently store config file path"
@@ -305,14 +425,18 @@ def set_path_as_active_config(request, filepath):
             logging.error(
                 "CamillaDSP runs without state file and is unable to persistently store config file path"
             )
+    invalidate_active_config_path(request.app)
     if on_set:
         try:
             cmd = on_set.format(f'"{filepath}"')
-            logging.debug("Running command: %s", cmd)
-            os.system(cmd)
         except Exception:
             logging.error("Failed to run on_set_active_config command")
             traceback.print_exc()
+            return
+        future = request.app["ACTIVE_CONFIG_HOOK"].submit(cmd)
+        future.add_done_callback(_log_on_set_result)
+        if not request.app["on_set_active_config_background"]:
+            await asyncio.wait([future])
 
 
 def _verify_path_in_config_dir(path, config_dir):
@@ -333,56 +457,39 @@ def _verify_path_in_config_dir(path, config_dir):
     return None
 
 
-def _update_statefile_config_path(statefile_path, new_config_path):
+def write_file_atomically(path, data):
     """
-    Read a statefile if possible, update the config filename, and write the result"
+    Write data to a file, via a temporary file in the same directory
+    that is renamed to the target name when complete.
+    The target file is never left partially written.
     """
+    folder, filename = split(path)
     try:
-        with open(statefile_path, encoding="utf-8") as f:
-            state = yaml.safe_load(f)
-    except ScannerError as e:
-        logging.error(
-            "Invalid yaml syntax in statefile: %s, details: %s", statefile_path, e
-        )
-        state = deepcopy(DEFAULT_STATEFILE)
-    except OSError as e:
-        logging.error(
-            "Statefile could not be opened: %s, details: %s", statefile_path, e
-        )
-        state = deepcopy(DEFAULT_STATEFILE)
-    state["config_path"] = new_config_path
-    yaml_state = yaml.dump(state).encode("utf-8")
-    with open(statefile_path, "wb") as f:
-        f.write(yaml_state)
-
-
-def _read_statefile_config_path(statefile_path):
-    """
-    Read a statefile if possible, and get the config_path"
-    """
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o644
+    fd, temp_path = tempfile.mkstemp(prefix=f".{filename}.", dir=folder)
     try:
-        with open(statefile_path, encoding="utf-8") as f:
-            state = yaml.safe_load(f)
-            return state["config_path"]
-    except ScannerError as e:
-        logging.error(
-            "Invalid yaml syntax in statefile: %s, details: %s", statefile_path, e
-        )
-    except OSError as e:
-        logging.error(
-            "Statefile could not be opened: %s, details: %s", statefile_path, e
-        )
-    return None
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        if isfile(temp_path):
+            os.remove(temp_path)
+        raise
 
 
-def save_config_to_yaml_file(config_name, config_object, request):
+async def save_config_to_yaml_file(config_name, config_object, request):
     """
     Write a given config object to a yaml file.
+    The file is written in a worker thread,
+    and the hash of the written content is returned.
     """
     config_file = path_of_config_file(request, config_name)
-    yaml_config = yaml.dump(config_object).encode("utf-8")
-    with open(config_file, "wb") as f:
-        f.write(yaml_config)
+    return await request.app["CONFIG_SAVER"].save(config_file, config_object)
 
 
 def coeff_dir_relative_to_config_dir(request):
@@ -421,23 +528,53 @@ def make_config_filter_paths_relative(config_object, config_dir):
 def convert_config_filter_paths(config_object, conversion):
     """
     Apply a path conversion to all filter coefficient paths of a config.
+    The input is not modified. Only the top level dict, the filters dict
+    and the filters that have a coefficient file path are copied,
+    all other sections are shared with the input config.
     """
-    config = deepcopy(config_object)
+    config = dict(config_object)
     filters = config.get("filters")
     if filters is not None:
-        for filter_name in filters:
-            filt = filters[filter_name]
-            convert_filter_path(filt, conversion)
+        filters = dict(filters)
+        for filter_name, filt in filters.items():
+            if _has_coefficient_file(filt):
+                filt = dict(filt)
+                filt["parameters"] = dict(filt["parameters"])
+                convert_filter_path(filt, conversion)
+                filters[filter_name] = filt
+        config["filters"] = filters
     return config
 
 
+def _has_coefficient_file(filter_as_dict):
+    """
+    Check if a filter reads its coefficients from a file.
+    """
+    return filter_as_dict["type"] == "Conv" and filter_as_dict["parameters"][
+        "type"
+    ] in ("Raw", "Wav")
+
+
+def coefficient_file_paths(config_object):
+    """
+    Get the coefficient file paths used by the filters of a config.
+    """
+    filters = config_object.get("filters")
+    if not filters:
+        return []
+    return [
+        filt["parameters"]["filename"]
+        for filt in filters.values()
+        if _has_coefficient_file(filt) and filt["parameters"]["filename"]
+    ]
+
+
 def convert_filter_path(filter_as_dict, conversion):
     """
     Apply a path conversion to a filter coefficient path.
     """
-    ftype = filter_as_dict["type"]
-    parameters = filter_as_dict["parameters"]
-    if ftype == "Conv" and parameters["type"] in ["Raw", "Wav"]:
+    if _has_coefficient_file(filter_as_dict):
+        parameters = filter_as_dict["parameters"]
         filename = parameters["filename"]
         if filename:
             filename = conversion(filename)
@@ -1,3 +1,4 @@
+import json
 import re
 from os.path import basename, splitext
 
@@ -165,3 +166,31 @@ def plot_options_to_object(samplerate_and_channel_options):
         )
     step_options.sort(key=lambda x: x["name"])
     return step_options
+
+
+def merge_duplicate_filters(config):
+    """
+    Merge filters with identical definitions, and update the pipeline
+    to use the remaining filter. The first filter of each set of duplicates is kept.
+    Descriptions are not compared, since these typically only differ
+    by the line or block the filter was imported from.
+    The config is modified in place.
+    """
+    filters = config.get("filters")
+    if not filters:
+        return config
+    kept = {}
+    renamed = {}
+    for name, filt in list(filters.items()):
+        definition = {key: value for key, value in filt.items() if key != "description"}
+        key = json.dumps(definition, sort_keys=True)
+        if key in kept:
+            renamed[name] = kept[key]
+            del filters[name]
+        else:
+            kept[key] = name
+    if renamed:
+        for step in config.get("pipeline") or []:
+            if step["type"] == "Filter":
+                step["names"] = [renamed.get(name, name) for name in step["names"]]
+    return config
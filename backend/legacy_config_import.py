@@ -1,10 +1,27 @@
-from camilladsp_plot.validate_config import CamillaValidator
+import threading
 
 CURRENT_VERSION = 4
 
 V3_SAMPLE_FORMATS = ("S16LE", "S24LE3", "S24LE", "S32LE", "FLOAT32LE", "FLOAT64LE")
 
-_VALIDATOR = CamillaValidator()
+_default_validator_lock = threading.Lock()
+_default_validator = None
+
+
+def _get_default_validator():
+    """
+    Get a validator for callers that don't provide one.
+    It is created on first use, to keep the slow import of
+    the validation module out of the startup.
+    """
+    global _default_validator  # pylint: disable=global-statement
+    with _default_validator_lock:
+        if _default_validator is None:
+            # pylint: disable-next=import-outside-toplevel
+            from camilladsp_plot.validate_config import CamillaValidator
+
+            _default_validator = CamillaValidator()
+        return _default_validator
 
 
 # v1->v2 introduces the default volume control, remove old volume filters
@@ -354,28 +371,143 @@ def _look_for_v3_sample_formats(config):
     return False
 
 
-def identify_version(config):
-    if not isinstance(config, dict):
-        return None
+# The filter types that can have a legacy version marker.
+_MARKER_FILTER_TYPES = frozenset(("Volume", "Loudness", "Dither", "Conv"))
 
-    if _look_for_v1_volume(config):
-        return 1
-    if _look_for_v1_loudness(config):
-        return 1
-    if _look_for_v1_resampler(config):
-        return 1
-    if _look_for_v1_devices(config):
+
+def _filter_markers(filters):
+    """
+    Find the oldest version marker among the filters.
+    """
+    version = None
+    for filt in filters.values():
+        if not isinstance(filt, dict):
+            continue
+        ftype = filt.get("type")
+        if ftype not in _MARKER_FILTER_TYPES:
+            continue
+        parameters = filt.get("parameters")
+        if not isinstance(parameters, dict):
+            continue
+        if ftype == "Volume" and "fader" not in parameters:
+            return 1
+        if ftype == "Loudness" and "ramp_time" in parameters:
+            return 1
+        if ftype == "Dither" and parameters.get("type") in ("Uniform", "Simple"):
+            return 1
+        if ftype == "Conv" and parameters.get("format") in V3_SAMPLE_FORMATS:
+            version = 3
+    return version
+
+
+def _device_markers(devices):
+    """
+    Find the oldest version marker in the devices section.
+    """
+    if "enable_resampling" in devices:
         return 1
-    if _look_for_v1_dither(config):
+    version = None
+    for direction in ("capture", "playback"):
+        device = devices.get(direction)
+        if not isinstance(device, dict):
+            continue
+        dtype = device.get("type")
+        if dtype == "CoreAudio" and "change_format" in device:
+            return 1
+        if direction == "capture" and dtype == "File":
+            version = 2
+        elif version is None and (
+            device.get("format") in V3_SAMPLE_FORMATS
+            or (dtype == "Pulse" and "format" in device)
+        ):
+            version = 3
+    return version
+
+
+def _pipeline_markers(pipeline):
+    """
+    Find the oldest version marker in the pipeline.
+    """
+    for step in pipeline:
+        if isinstance(step, dict) and step.get("type") == "Filter" and "channel" in step:
+            return 2
+    return None
+
+
+def _mixer_markers(mixers):
+    """
+    Find the oldest version marker among the mixers.
+    """
+    for mixerconf in mixers.values():
+        if not isinstance(mixerconf, dict):
+            continue
+        mappings = mixerconf.get("mapping")
+        if not isinstance(mappings, list):
+            continue
+        output_channels = set()
+        for mapping in mappings:
+            if not isinstance(mapping, dict):
+                continue
+            dest = mapping.get("dest")
+            if dest in output_channels:
+                return 3
+            output_channels.add(dest)
+            sources = mapping.get("sources")
+            if not isinstance(sources, list):
+                continue
+            input_channels = set()
+            for source in sources:
+                if not isinstance(source, dict):
+                    continue
+                channel = source.get("channel")
+                if channel in input_channels:
+                    return 3
+                input_channels.add(channel)
+    return None
+
+
+def _legacy_version(config):
+    """
+    Look for features of older config versions, in a single pass over the config.
+    Returns the oldest version found, or None if there are no legacy features.
+    Gives the same result as checking the `_look_for_*` functions in order.
+    """
+    filters = config.get("filters")
+    devices = config.get("devices")
+    pipeline = config.get("pipeline")
+    mixers = config.get("mixers")
+    markers = set()
+    if isinstance(filters, dict):
+        markers.add(_filter_markers(filters))
+    if 1 not in markers and isinstance(devices, dict):
+        markers.add(_device_markers(devices))
+    if 1 in markers:
         return 1
-    if _look_for_v2_pipeline(config):
-        return 2
-    if _look_for_v2_devices(config):
+    if isinstance(pipeline, list):
+        markers.add(_pipeline_markers(pipeline))
+    if 2 in markers:
         return 2
-    if _look_for_v3_mixer(config):
+    if 3 not in markers and isinstance(mixers, dict):
+        markers.add(_mixer_markers(mixers))
+    if 3 in markers:
         return 3
-    if _look_for_v3_sample_formats(config):
-        return 3
-    if _VALIDATOR.passes_sections_schema(config):
+    return None
+
+
+def identify_version(config, validator=None):
+    """
+    Identify the CamillaDSP version a config is made for.
+    The optional validator is used to check configs for the current version,
+    when it is not given a shared default validator is used.
+    """
+    if not isinstance(config, dict):
+        return None
+
+    legacy_version = _legacy_version(config)
+    if legacy_version is not None:
+        return legacy_version
+    if validator is None:
+        validator = _get_default_validator()
+    if validator.passes_sections_schema(config):
         return CURRENT_VERSION
     return None
@@ -0,0 +1,171 @@
+import logging
+import os
+
+from .filemanagement import replace_tokens_in_filter_config
+from .processing_cost import (
+    DEFAULT_CHUNKSIZE,
+    filter_operations_per_sample,
+    pipeline_step_operations,
+)
+
+# Number of bytes per sample for the raw and wav sample formats.
+SAMPLE_BYTES = {
+    "S16LE": 2,
+    "S16_LE": 2,
+    "S24LE3": 3,
+    "S24_3_LE": 3,
+    "S24LE": 4,
+    "S24_4_LE": 4,
+    "S24_4_RJ_LE": 4,
+    "S24_4_LJ_LE": 4,
+    "S32LE": 4,
+    "S32_LE": 4,
+    "FLOAT32LE": 4,
+    "F32_LE": 4,
+    "FLOAT64LE": 8,
+    "F64_LE": 8,
+}
+
+# Sinc length and number of interpolation points of the AsyncSinc profiles.
+SINC_PROFILES = {
+    "VeryFast": (64, 2),
+    "Fast": (128, 2),
+    "Balanced": (192, 3),
+    "Accurate": (256, 4),
+}
+
+INTERPOLATION_POINTS = {
+    "Nearest": 1,
+    "Linear": 2,
+    "Quadratic": 3,
+    "Cubic": 4,
+    "Quintic": 6,
+    "Septic": 8,
+}
+
+# The Synchronous resampler is FFT based, with a roughly fixed cost per sample.
+SYNCHRONOUS_RESAMPLER_OPERATIONS = 40
+
+
+def _text_coefficient_count(filename, skip_lines, read_lines):
+    count = 0
+    with open(filename, encoding="utf-8") as f:
+        for index, line in enumerate(f):
+            if index < skip_lines or not line.strip():
+                continue
+            count += 1
+            if read_lines and count >= read_lines:
+                break
+    return count
+
+
+def coefficient_file_taps(parameters):
+    """
+    Get the number of taps of a Conv filter that reads its coefficients from a file.
+    Returns 0 if the file can't be read.
+    """
+    filename = parameters.get("filename")
+    if not filename:
+        return 0
+    try:
+        if parameters.get("type") == "Wav":
+            return _wav_taps(filename)
+        sampleformat = parameters.get("format", "TEXT")
+        if sampleformat == "TEXT":
+            return _text_coefficient_count(
+                filename,
+                parameters.get("skip_bytes_lines") or 0,
+                parameters.get("read_bytes_lines") or 0,
+            )
+        size = os.path.getsize(filename) - (parameters.get("skip_bytes_lines") or 0)
+        read_bytes = parameters.get("read_bytes_lines") or 0
+        if read_bytes:
+            size = min(size, read_bytes)
+        return max(size, 0) // SAMPLE_BYTES.get(sampleformat, 4)
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        logging.debug("Unable to read coefficient file %s: %s", filename, e)
+        return 0
+
+
+def _wav_taps(filename):
+    # pylint: disable-next=import-outside-toplevel
+    from camilladsp_plot.audiofileread import read_wav_header
+
+    header = read_wav_header(filename)
+    if not header:
+        raise ValueError("Unable to read wav header")
+    if header.get("frames"):
+        return header["frames"]
+    frame_bytes = header["channels"] * SAMPLE_BYTES[header["sampleformat"]]
+    return header["datalength"] // frame_bytes
+
+
+def resampler_operations_per_sample(resampler):
+    """
+    Estimate the number of operations per output sample and channel for a resampler.
+    """
+    if not resampler:
+        return 0
+    rtype = resampler.get("type")
+    if rtype == "AsyncSinc":
+        if resampler.get("profile") in SINC_PROFILES:
+            sinc_len, points = SINC_PROFILES[resampler["profile"]]
+        else:
+            sinc_len = resampler.get("sinc_len") or 128
+            points = INTERPOLATION_POINTS.get(resampler.get("interpolation"), 2)
+        return sinc_len * points + points
+    if rtype == "AsyncPoly":
+        return 2 * INTERPOLATION_POINTS.get(resampler.get("interpolation"), 4)
+    if rtype == "Synchronous":
+        return SYNCHRONOUS_RESAMPLER_OPERATIONS
+    return 0
+
+
+def estimate_processing_cost(config_object):
+    """
+    Estimate the processing cost of a config with absolute coefficient file paths.
+    Returns the cost of each pipeline step and of the resampler,
+    as the approximate number of arithmetic operations per second.
+    Multiply-accumulates of the time domain filters and the operations
+    of the FFT convolutions are counted alike, so the result is a rough
+    measure for comparing configs, not a prediction of the processing load.
+    """
+    devices = config_object.get("devices") or {}
+    samplerate = devices.get("samplerate") or 48000
+    chunksize = devices.get("chunksize") or DEFAULT_CHUNKSIZE
+    capture = devices.get("capture") or {}
+    taps_by_file = {}
+
+    def filter_operations(filt):
+        taps = None
+        parameters = filt.get("parameters") or {}
+        if filt.get("type") == "Conv" and parameters.get("type") in ("Raw", "Wav"):
+            resolved = {"type": "Conv", "parameters": dict(parameters)}
+            replace_tokens_in_filter_config(
+                resolved, samplerate, capture.get("channels")
+            )
+            filename = resolved["parameters"]["filename"]
+            if filename not in taps_by_file:
+                taps_by_file[filename] = coefficient_file_taps(resolved["parameters"])
+            taps = taps_by_file[filename]
+        return filter_operations_per_sample(filt, chunksize=chunksize, taps=taps)
+
+    steps = pipeline_step_operations(config_object, filter_operations=filter_operations)
+    for step in steps:
+        step["operations_per_second"] = step["operations_per_sample"] * samplerate
+    resampler_operations = (
+        resampler_operations_per_sample(devices.get("resampler"))
+        * (capture.get("channels") or 0)
+        * samplerate
+    )
+    return {
+        "unit": "operations per second",
+        "samplerate": samplerate,
+        "chunksize": chunksize,
+        "steps": steps,
+        "resampler_operations_per_second": resampler_operations,
+        "total_operations_per_second": sum(
+            step["operations_per_second"] for step in steps
+        )
+        + resampler_operations,
+    }
@@ -0,0 +1,355 @@
+import contextvars
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from aiohttp import web
+
+# Histogram buckets in seconds for request latencies.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Histogram buckets in seconds for config validation durations.
+VALIDATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# Status values reported as gauges, with the metric name and help text.
+DSP_GAUGES = (
+    ("processingload", "camilladsp_processing_load", "Processing load in percent"),
+    ("resamplerload", "camilladsp_resampler_load", "Resampler load in percent"),
+    ("bufferlevel", "camilladsp_buffer_level", "Playback buffer level in frames"),
+    ("rateadjust", "camilladsp_rate_adjust", "Rate adjust factor"),
+    ("capturerate", "camilladsp_capture_rate", "Measured capture sample rate"),
+    ("clippedsamples", "camilladsp_clipped_samples", "Number of clipped samples"),
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Number of recent requests per route that are kept for calculating percentiles.
+RECENT_REQUESTS = 1000
+
+
+class _RequestTiming:
+    """
+    The time spent in each phase of a request, in seconds.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        # Time spent in nested spans, for each open span.
+        self.nested = []
+
+
+_request_timing = contextvars.ContextVar("request_timing", default=None)
+
+
+@contextmanager
+def span(phase):
+    """
+    Context manager that adds the time spent in the block to the
+    given phase of the current request, such as "dsp", "file",
+    "validation", "plot" or "serialization".
+    Time spent in nested spans is only counted for the innermost span.
+    Outside of a request, for example in worker threads, nothing is recorded.
+    """
+    timing = _request_timing.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    timing.nested.append(0.0)
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = timing.nested.pop()
+        timing.phases[phase] = timing.phases.get(phase, 0.0) + elapsed - nested
+        if timing.nested:
+            timing.nested[-1] += elapsed
+
+
+def _percentile(sorted_values, fraction):
+    index = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+
+class Histogram:
+    """
+    A thread safe histogram with fixed buckets.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counts = [0] * len(self.buckets)
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value):
+        with self._lock:
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[index] += 1
+                    break
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        """
+        Get the cumulative bucket counts, the sum and the count of all observations.
+        """
+        with self._lock:
+            cumulative = []
+            total = 0
+            for count in self._counts:
+                total += count
+                cumulative.append(total)
+            return cumulative, self._sum, self._count
+
+
+class BackendMetrics:
+    """
+    Counters and histograms for the backend itself.
+    Requests are counted per method, route and status,
+    and the latency is recorded per method and route.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._request_counts = {}
+        self._latencies = {}
+        self._recent = {}
+        self._reconnect_attempts = 0
+
+    def observe_request(self, method, route, status, seconds, phases=None):
+        with self._lock:
+            key = (method, route, status)
+            self._request_counts[key] = self._request_counts.get(key, 0) + 1
+            histogram = self._latencies.get((method, route))
+            if histogram is None:
+                histogram = Histogram(LATENCY_BUCKETS)
+                self._latencies[(method, route)] = histogram
+                self._recent[(method, route)] = deque(maxlen=RECENT_REQUESTS)
+            self._recent[(method, route)].append((seconds, dict(phases or {})))
+        histogram.observe(seconds)
+
+    def timing_summary(self):
+        """
+        Get latency percentiles and the mean time per phase for each route,
+        calculated from the most recent requests.
+        """
+        with self._lock:
+            recent = {key: list(requests) for key, requests in self._recent.items()}
+        summary = []
+        for (method, route), requests in sorted(recent.items()):
+            durations = sorted(seconds for seconds, _ in requests)
+            phase_totals = {}
+            for _, phases in requests:
+                for phase, seconds in phases.items():
+                    phase_totals[phase] = phase_totals.get(phase, 0.0) + seconds
+            summary.append(
+                {
+                    "method": method,
+                    "route": route,
+                    "count": len(durations),
+                    "p50": _percentile(durations, 0.5),
+                    "p90": _percentile(durations, 0.9),
+                    "p99": _percentile(durations, 0.99),
+                    "max": durations[-1],
+                    "mean_phases": {
+                        phase: total / len(durations)
+                        for phase, total in sorted(phase_totals.items())
+                    },
+                }
+            )
+        return summary
+
+    def count_reconnect_attempt(self):
+        with self._lock:
+            self._reconnect_attempts += 1
+
+    @property
+    def reconnect_attempts(self):
+        return self._reconnect_attempts
+
+    def request_counts(self):
+        with self._lock:
+            return dict(self._request_counts)
+
+    def latencies(self):
+        with self._lock:
+            return dict(self._latencies)
+
+
+def route_name(request):
+    """
+    Get the route pattern of a request, to avoid one series per url.
+    """
+    route = request.match_info.route
+    if route.resource is None:
+        return "unmatched"
+    return route.resource.canonical
+
+
+def _format_phases(phases, total):
+    parts = [f"{phase} {seconds:.3f} s" for phase, seconds in sorted(phases.items())]
+    other = total - sum(phases.values())
+    parts.append(f"other {max(other, 0.0):.3f} s")
+    return ", ".join(parts)
+
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    """
+    Count requests and record their latency, with the time spent in each phase.
+    Requests slower than the slow_request_threshold setting are logged.
+    """
+    timing = _RequestTiming()
+    token = _request_timing.set(timing)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        _request_timing.reset(token)
+        request.app["METRICS"].observe_request(
+            request.method, route_name(request), status, elapsed, timing.phases
+        )
+        threshold = request.app["slow_request_threshold"]
+        # Websocket connections are open for as long as the client wants.
+        if threshold is not None and elapsed > threshold and status != 101:
+            logging.warning(
+                "Slow request: %s %s took %.3f s (%s)",
+                request.method,
+                request.path,
+                elapsed,
+                _format_phases(timing.phases, elapsed),
+            )
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels):
+    if not labels:
+        return ""
+    content = ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+    return "{" + content + "}"
+
+
+def _format_value(value):
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Writer:
+    def __init__(self):
+        self.lines = []
+
+    def header(self, name, mtype, help_text):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {mtype}")
+
+    def sample(self, name, value, **labels):
+        self.lines.append(f"{name}{_labels(**labels)} {_format_value(value)}")
+
+    def histogram(self, name, histogram, **labels):
+        cumulative, total, count = histogram.snapshot()
+        for bound, bucket_count in zip(histogram.buckets, cumulative):
+            self.sample(
+                f"{name}_bucket", bucket_count, le=_format_value(bound), **labels
+            )
+        self.sample(f"{name}_bucket", count, le="+Inf", **labels)
+        self.sample(f"{name}_sum", total, **labels)
+        self.sample(f"{name}_count", count, **labels)
+
+    def text(self):
+        return "\n".join(self.lines) + "\n"
+
+
+def render_metrics(app):
+    """
+    Render the metrics in the Prometheus text format.
+    Only values that are already stored in the app are used,
+    this never calls the CamillaDSP process.
+    """
+    writer = _Writer()
+    status = app["STATUSCACHE"]
+    state = status.get("cdsp_status")
+    if state is not None:
+        writer.header("camilladsp_state", "gauge", "Current processing state")
+        writer.sample("camilladsp_state", 1, state=state)
+    for key, name, help_text in DSP_GAUGES:
+        value = status.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            writer.header(name, "gauge", help_text)
+            writer.sample(name, value)
+
+    metrics = app["METRICS"]
+    writer.header(
+        "camillagui_http_requests_total", "counter", "Number of handled requests"
+    )
+    for (method, route, code), count in sorted(metrics.request_counts().items()):
+        writer.sample(
+            "camillagui_http_requests_total",
+            count,
+            method=method,
+            route=route,
+            status=code,
+        )
+    writer.header(
+        "camillagui_http_request_duration_seconds",
+        "histogram",
+        "Request handling time",
+    )
+    for (method, route), histogram in sorted(metrics.latencies().items()):
+        writer.histogram(
+            "camillagui_http_request_duration_seconds",
+            histogram,
+            method=method,
+            route=route,
+        )
+    writer.header(
+        "camillagui_reconnect_attempts_total",
+        "counter",
+        "Attempts to reconnect to CamillaDSP",
+    )
+    writer.sample("camillagui_reconnect_attempts_total", metrics.reconnect_attempts)
+
+    cache = app["VALIDATION_CACHE"]
+    hits, misses = cache.hits, cache.misses
+    writer.header(
+        "camillagui_validation_cache_hits_total", "counter", "Validation cache hits"
+    )
+    writer.sample("camillagui_validation_cache_hits_total", hits)
+    writer.header(
+        "camillagui_validation_cache_misses_total", "counter", "Validation cache misses"
+    )
+    writer.sample("camillagui_validation_cache_misses_total", misses)
+    writer.header(
+        "camillagui_validation_cache_hit_ratio",
+        "gauge",
+        "Fraction of validations answered from the cache",
+    )
+    writer.sample(
+        "camillagui_validation_cache_hit_ratio",
+        hits / (hits + misses) if hits + misses else 0.0,
+    )
+    writer.header(
+        "camillagui_validation_duration_seconds",
+        "histogram",
+        "Time spent validating configs",
+    )
+    writer.histogram(
+        "camillagui_validation_duration_seconds", app["VALIDATORS"].durations
+    )
+    return writer.text()
@@ -0,0 +1,152 @@
+import math
+
+DEFAULT_CHUNKSIZE = 1024
+
+# Rough number of multiply-accumulate operations per sample and channel
+# for filters with a fixed cost.
+FILTER_OPERATIONS = {
+    "Biquad": 5,
+    "Gain": 1,
+    "Volume": 1,
+    "Loudness": 10,
+    "Delay": 1,
+    "Dither": 4,
+    "Limiter": 2,
+}
+
+# Number of biquads in the BiquadCombo types with a fixed size.
+BIQUAD_COMBO_SECTIONS = {
+    "Tilt": 1,
+    "FivePointPeq": 5,
+}
+
+
+def _biquad_combo_sections(parameters):
+    ctype = parameters.get("type")
+    if ctype in BIQUAD_COMBO_SECTIONS:
+        return BIQUAD_COMBO_SECTIONS[ctype]
+    if ctype == "GraphicEqualizer":
+        return len(parameters.get("gains") or [])
+    order = parameters.get("order")
+    if isinstance(order, int):
+        return math.ceil(order / 2)
+    return 1
+
+
+def convolution_operations_per_sample(taps, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Estimate the number of operations per sample for a convolution,
+    done as a segmented FFT convolution with segments of one chunk.
+    Each chunk needs one forward and one inverse FFT of twice the chunksize,
+    and one complex multiply-accumulate per frequency bin and segment.
+    """
+    if taps <= 0:
+        return 0
+    segments = math.ceil(taps / chunksize)
+    fft_size = 2 * chunksize
+    fft_operations = 2 * fft_size * math.log2(fft_size)
+    multiply_operations = 4 * segments * (chunksize + 1)
+    return (fft_operations + multiply_operations) / chunksize
+
+
+def filter_operations_per_sample(filt, chunksize=DEFAULT_CHUNKSIZE, taps=None):
+    """
+    Estimate the number of operations per sample and channel for a filter.
+    The length of Conv filters that read coefficients from a file
+    must be provided as taps, otherwise they are counted as zero.
+    """
+    ftype = filt.get("type")
+    parameters = filt.get("parameters") or {}
+    if ftype in FILTER_OPERATIONS:
+        return FILTER_OPERATIONS[ftype]
+    if ftype == "BiquadCombo":
+        return 5 * _biquad_combo_sections(parameters)
+    if ftype == "DiffEq":
+        return len(parameters.get("a") or []) + len(parameters.get("b") or [])
+    if ftype == "Conv":
+        if parameters.get("type") == "Values":
+            taps = len(parameters.get("values") or [])
+        return convolution_operations_per_sample(taps or 0, chunksize)
+    return 0
+
+
+def mixer_operations_per_sample(mixer):
+    """
+    Estimate the number of operations per sample for a mixer,
+    one for each source of each unmuted mapping.
+    """
+    operations = 0
+    for mapping in mixer.get("mapping") or []:
+        if not mapping.get("mute"):
+            operations += len(mapping.get("sources") or [])
+    return operations
+
+
+def initial_channel_count(config):
+    """
+    Get the number of channels at the start of the pipeline.
+    Imported configs may lack the devices section,
+    then the number is guessed from the mixers and filter steps.
+    """
+    devices = config.get("devices") or {}
+    capture = devices.get("capture") or {}
+    if isinstance(capture.get("channels"), int):
+        return capture["channels"]
+    mixers = config.get("mixers") or {}
+    for step in config.get("pipeline") or []:
+        if step.get("type") == "Mixer" and step.get("name") in mixers:
+            return mixers[step["name"]]["channels"]["in"]
+    used = [
+        channel
+        for step in config.get("pipeline") or []
+        if step.get("type") == "Filter"
+        for channel in step.get("channels") or []
+        if isinstance(channel, int)
+    ]
+    return max(used) + 1 if used else 1
+
+
+def pipeline_step_operations(config, filter_operations=filter_operations_per_sample):
+    """
+    Estimate the number of operations per sample for each pipeline step.
+    Returns a list with one entry per step, with the step index,
+    the number of channels processed and the operations per sample.
+    """
+    filters = config.get("filters") or {}
+    mixers = config.get("mixers") or {}
+    channels = initial_channel_count(config)
+    steps = []
+    for index, step in enumerate(config.get("pipeline") or []):
+        operations = 0
+        step_channels = channels
+        if step.get("bypassed"):
+            pass
+        elif step.get("type") == "Filter":
+            if step.get("channels") is not None:
+                step_channels = len(step["channels"])
+            for name in step.get("names") or []:
+                if name in filters:
+                    operations += step_channels * filter_operations(filters[name])
+        elif step.get("type") == "Mixer" and step.get("name") in mixers:
+            mixer = mixers[step["name"]]
+            operations = mixer_operations_per_sample(mixer)
+            step_channels = mixer["channels"]["in"]
+            channels = mixer["channels"]["out"]
+        steps.append(
+            {
+                "index": index,
+                "type": step.get("type"),
+                "channels": step_channels,
+                "operations_per_sample": operations,
+            }
+        )
+    return steps
+
+
+def operations_per_sample(config):
+    """
+    Estimate the total number of operations per sample for a config.
+    """
+    return sum(
+        step["operations_per_sample"] for step in pipeline_step_operations(config)
+    )
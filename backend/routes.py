@@ -8,6 +8,7 @@ from .views import (
     download_configs_zip,
     eval_filter_values,
     eval_filterstep_values,
+    file_changes,
     get_config_at_gui_start,
     get_active_config_name,
     get_backends,
@@ -19,15 +20,23 @@ from .views import (
     get_gui_config,
     get_gui_index,
     get_list_param,
+    get_metrics,
+    get_load_estimate,
+    get_optimized_config,
     get_log_file,
     get_param,
     get_param_json,
     get_playback_devices,
+    get_ready,
+    get_request_timings,
     get_status,
+    get_status_history,
     get_stored_coeffs,
     get_stored_configs,
     get_wav_info,
+    migrate_configs,
     parse_and_validate_yml_config_to_json,
+    patch_config,
     rename_coeff_file,
     rename_config_file,
     save_config_file,
@@ -47,6 +56,10 @@ from .views import (
 
 def setup_routes(app):
     app.router.add_get("/api/status", get_status)
+    app.router.add_get("/api/ready", get_ready)
+    app.router.add_get("/api/statushistory", get_status_history)
+    app.router.add_get("/metrics", get_metrics)
+    app.router.add_get("/api/admin/timings", get_request_timings)
     app.router.add_get("/api/getparam/{name}", get_param)
     app.router.add_get("/api/getparamjson/{name}", get_param_json)
     app.router.add_get("/api/getlistparam/{name}", get_list_param)
@@ -56,6 +69,7 @@ def setup_routes(app):
     app.router.add_post("/api/evalfilterstep", eval_filterstep_values)
     app.router.add_get("/api/getconfig", get_config)
     app.router.add_post("/api/setconfig", set_config)
+    app.router.add_post("/api/patchconfig", patch_config)
     app.router.add_post("/api/stop", stop_processing)
     app.router.add_get("/api/getstartconfig", get_config_at_gui_start)
     app.router.add_get("/api/getactiveconfigfilename", get_active_config_name)
@@ -69,9 +83,12 @@ def setup_routes(app):
     app.router.add_post("/api/convolvertojson", translate_convolver_to_json)
     app.router.add_post("/api/eqapotojson", translate_eqapo_to_json)
     app.router.add_post("/api/validateconfig", validate_config)
+    app.router.add_post("/api/optimizeconfig", get_optimized_config)
+    app.router.add_post("/api/estimateload", get_load_estimate)
     app.router.add_get("/api/wavinfo", get_wav_info)
     app.router.add_get("/api/storedconfigs", get_stored_configs)
     app.router.add_get("/api/storedcoeffs", get_stored_coeffs)
+    app.router.add_get("/api/filechanges", file_changes)
     app.router.add_get("/api/defaultsforcoeffs", get_defaults_for_coeffs)
     app.router.add_post("/api/uploadconfigs", store_configs)
     app.router.add_post("/api/uploadcoeffs", store_coeffs)
@@ -84,6 +101,7 @@ def setup_routes(app):
     app.router.add_get("/api/guiconfig", get_gui_config)
     app.router.add_get("/api/getconfigfile", get_config_file)
     app.router.add_post("/api/saveconfigfile", save_config_file)
+    app.router.add_post("/api/migrateconfigs", migrate_configs)
     app.router.add_get("/api/logfile", get_log_file)
     app.router.add_get("/api/capturedevices/{backend}", get_capture_devices)
     app.router.add_get("/api/playbackdevices/{backend}", get_playback_devices)
@@ -37,6 +37,12 @@ BACKEND_CONFIG_DEFAULTS = {
     "supported_capture_types": None,
     "supported_playback_types": None,
     "log_file": None,
+    "import_max_size": 16 * 1024**2,
+    "status_history_length": 24 * 3600,
+    "slow_request_threshold": 1.0,
+    "active_config_command_timeout": 5.0,
+    "on_set_active_config_background": False,
+    "file_watcher_poll_interval": 2.0,
 }
 
 
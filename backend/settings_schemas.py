@@ -17,6 +17,12 @@ BACKEND_CONFIG_SCHEMA = {
         "default_config": {"type": ["string", "null"], "minLength": 1},
         "statefile_path": {"type": ["string", "null"], "minLength": 1},
         "log_file": {"type": ["string", "null"], "minLength": 1},
+        "import_max_size": {"type": "integer", "exclusiveMinimum": 0},
+        "status_history_length": {"type": "integer", "exclusiveMinimum": 0},
+        "slow_request_threshold": {"type": ["number", "null"], "exclusiveMinimum": 0},
+        "active_config_command_timeout": {"type": "number", "exclusiveMinimum": 0},
+        "on_set_active_config_background": {"type": "boolean"},
+        "file_watcher_poll_interval": {"type": "number", "exclusiveMinimum": 0},
         "on_set_active_config": {"type": ["string", "null"], "minLength": 1},
         "on_get_active_config": {"type": ["string", "null"], "minLength": 1},
         "supported_capture_types": {
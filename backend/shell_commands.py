@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import os
+import signal
+
+# On posix systems, commands run in their own process group,
+# so that any processes they start are stopped together with them.
+_PROCESS_GROUPS = hasattr(os, "killpg")
+
+
+class CommandTimeout(Exception):
+    """
+    Raised when a shell command does not finish within the timeout.
+    """
+
+
+def _kill(process):
+    try:
+        if _PROCESS_GROUPS:
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass
+
+
+async def run_shell_command(cmd, timeout):
+    """
+    Run a command in the operating system shell, without blocking the event loop.
+    Returns the exit code and the captured stdout and stderr.
+    The command is killed if it does not finish within timeout seconds,
+    and CommandTimeout is raised. It is also killed if the call is cancelled.
+    """
+    logging.debug("Running command: %s", cmd)
+    process = await asyncio.create_subprocess_shell(
+        cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=_PROCESS_GROUPS,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError as e:
+        _kill(process)
+        await process.wait()
+        raise CommandTimeout(
+            f"Command did not finish within {timeout} seconds: {cmd}"
+        ) from e
+    except asyncio.CancelledError:
+        _kill(process)
+        await process.wait()
+        raise
+    stdout = stdout.decode("utf-8", errors="replace")
+    stderr = stderr.decode("utf-8", errors="replace")
+    logging.debug("Command exit code: %s, output: %s", process.returncode, stdout)
+    if stderr:
+        logging.debug("Command stderr: %s", stderr)
+    return process.returncode, stdout, stderr
+
+
+class LatestCommandRunner:
+    """
+    Runs shell commands one at a time.
+    A command submitted while another one is running is kept pending,
+    and replaces any command that was already pending.
+    The future of a replaced command gets the result None.
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._pending = None
+        self._worker = None
+
+    def submit(self, cmd):
+        """
+        Queue a command, and return a future for its exit code and output.
+        """
+        future = asyncio.get_running_loop().create_future()
+        if self._pending is not None:
+            replaced_cmd, replaced = self._pending
+            logging.debug("Dropping pending command: %s", replaced_cmd)
+            if not replaced.done():
+                replaced.set_result(None)
+        self._pending = (cmd, future)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run_pending())
+        return future
+
+    async def _run_pending(self):
+        while self._pending is not None:
+            cmd, future = self._pending
+            self._pending = None
+            try:
+                result = await run_shell_command(cmd, self.timeout)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+    async def stop(self):
+        """
+        Drop the pending command, and kill the running one.
+        The futures of both are cancelled.
+        """
+        if self._pending is not None:
+            _cmd, future = self._pending
+            self._pending = None
+            future.cancel()
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
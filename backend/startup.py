@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import threading
+import time
+
+from .views import OFFLINE_CACHE, reconnect, update_slow_status, version_string
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+# Seconds between the points of the status history.
+STATUS_RECORD_INTERVAL = 1.0
+
+# Tasks that must be done before the backend is ready.
+# Connecting to CamillaDSP is not required, the gui works offline too.
+REQUIRED_TASKS = ("versions", "validators")
+
+
+class StartupTasks:
+    """
+    Keeps track of the tasks that run in the background after the server has started.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._status = {}
+
+    def _set(self, name, status):
+        with self._lock:
+            self._status[name] = status
+
+    def status(self):
+        with self._lock:
+            return dict(self._status)
+
+    def is_ready(self):
+        """
+        Check if all the required tasks have finished, also if some of them failed.
+        Failed tasks are not retried, the backend then runs degraded.
+        """
+        status = self.status()
+        return all(status.get(name) in (DONE, FAILED) for name in REQUIRED_TASKS)
+
+    def failed(self):
+        """
+        Get the names of the required tasks that failed.
+        """
+        status = self.status()
+        return [name for name in REQUIRED_TASKS if status.get(name) == FAILED]
+
+    def _run(self, name, func, *args):
+        try:
+            func(*args)
+        except Exception as e:
+            logging.error("Startup task %s failed: %s", name, e)
+            self._set(name, FAILED)
+            return
+        self._set(name, DONE)
+
+    def run_in_executor(self, name, func, *args):
+        """
+        Run a blocking function in the default executor.
+        """
+        self._set(name, PENDING)
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(None, self._run, name, func, *args)
+
+    def start_thread(self, name, func, *args):
+        """
+        Run a blocking function that may take a long time in its own daemon thread.
+        """
+        self._set(name, PENDING)
+        thread = threading.Thread(target=self._run, args=(name, func) + args, daemon=True)
+        thread.start()
+        return thread
+
+
+def _read_versions(app):
+    app["STATUSCACHE"]["py_cdsp_version"] = version_string(
+        app["CAMILLA"].versions.library()
+    )
+
+
+def _prepare_validator(app):
+    # Creating the first validator loads the validation module,
+    # the validator is then kept in the pool for the first request.
+    validators = app["VALIDATORS"]
+    validators.release(*validators.acquire())
+
+
+def _connect_dsp(app):
+    # The first attempt is a connect and not a reconnect.
+    reconnect(
+        app["CAMILLA"],
+        app["STATUSCACHE"],
+        app["VALIDATORS"],
+        app["METRICS"],
+        count_first_attempt=False,
+    )
+
+
+async def _record_status(app, last_recorded):
+    # While a gui polls, the values it fetched are recorded.
+    # Otherwise they are fetched in the executor, to not block the event loop.
+    # Returns the time of the recorded values.
+    update_time = app["STORE"]["cache_time"]
+    if time.time() - update_time > STATUS_RECORD_INTERVAL:
+        loop = asyncio.get_running_loop()
+        try:
+            update_time = await loop.run_in_executor(None, update_slow_status, app)
+        except IOError as e:
+            logging.debug("Unable to record the status: %s", e)
+            return last_recorded
+    if update_time is None or update_time == last_recorded:
+        return last_recorded
+    app["STATUS_HISTORY"].record(update_time, app["STATUSCACHE"])
+    return update_time
+
+
+async def _record_status_history(app):
+    # The history is recorded also when no gui is polling the status.
+    cdsp = app["CAMILLA"]
+    last_recorded = None
+    while True:
+        if cdsp.is_connected():
+            last_recorded = await _record_status(app, last_recorded)
+        await asyncio.sleep(STATUS_RECORD_INTERVAL)
+
+
+async def start_background_tasks(app):
+    """
+    Start the slow parts of the startup in the background,
+    so that the server can start listening right away.
+    Until CamillaDSP is found, the status is reported as offline.
+    """
+    app["STATUSCACHE"].update(OFFLINE_CACHE)
+    tasks = app["STARTUP_TASKS"]
+    tasks.run_in_executor("versions", _read_versions, app)
+    tasks.run_in_executor("validators", _prepare_validator, app)
+    app["STORE"]["reconnect_thread"] = tasks.start_thread("dsp", _connect_dsp, app)
+    app["STORE"]["status_recorder"] = asyncio.create_task(_record_status_history(app))
+
+
+async def stop_background_tasks(app):
+    """
+    Stop the tasks that run for as long as the backend.
+    """
+    recorder = app["STORE"].get("status_recorder")
+    if recorder is not None:
+        recorder.cancel()
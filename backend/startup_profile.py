@@ -0,0 +1,93 @@
+import importlib
+import subprocess
+import sys
+import time
+
+# Modules that are only imported when they are first needed.
+DEFERRED_MODULES = ("camilladsp_plot", "camilladsp_plot.validate_config")
+
+
+class StartupProfile:
+    """
+    Records how long each phase of the startup takes.
+    """
+
+    def __init__(self):
+        self._last = time.perf_counter()
+        self.phases = []
+
+    def mark(self, name):
+        """
+        End the current phase and give it a name.
+        """
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+
+def import_time_breakdown(module, limit=10):
+    """
+    Import a module in a fresh interpreter with "-X importtime",
+    and return the total time in seconds, and the slowest of the imports
+    made directly by the module as a list of (name, seconds) tuples.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    total = 0.0
+    children = []
+    imports = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        seconds = int(parts[1]) / 1e6
+        # Nested imports are indented by two extra spaces per level,
+        # and are listed before the module that imports them.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((name.strip(), seconds))
+        elif depth == 0:
+            if name.strip() == module:
+                total = seconds
+                imports = children
+            children = []
+    imports.sort(key=lambda item: item[1], reverse=True)
+    return total, imports[:limit]
+
+
+def deferred_import_times():
+    """
+    Import the modules that are deferred until first use,
+    and return how long each one took.
+    """
+    times = []
+    for module in DEFERRED_MODULES:
+        start = time.perf_counter()
+        importlib.import_module(module)
+        times.append((module, time.perf_counter() - start))
+    return times
+
+
+def _format_line(name, seconds):
+    return f"  {name:<40} {1000 * seconds:8.1f} ms"
+
+
+def print_startup_profile(profile, module="main"):
+    """
+    Print the import times and the duration of each startup phase.
+    """
+    total, imports = import_time_breakdown(module)
+    print(f"Importing {module} in a fresh interpreter: {1000 * total:.1f} ms")
+    for name, seconds in imports:
+        print(_format_line(name, seconds))
+    print("Startup phases:")
+    for name, seconds in profile.phases:
+        print(_format_line(name, seconds))
+    print("Deferred until first use:")
+    for name, seconds in deferred_import_times():
+        print(_format_line(name, seconds))
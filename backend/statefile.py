@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import os
+import threading
+from copy import deepcopy
+
+import yaml
+
+from .filemanagement import DEFAULT_STATEFILE, write_file_atomically
+
+# Time in seconds to wait for more updates before writing the statefile.
+DEFAULT_WRITE_DELAY = 0.5
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class StatefileManager:
+    """
+    Keeps the content of a statefile in memory.
+    The file is read again when its modification time changes,
+    for example when CamillaDSP has updated it.
+    Updates are written after a short delay, so that a burst of updates
+    results in a single write.
+    Writes go via a temporary file, so the statefile is never left
+    partially written.
+    """
+
+    def __init__(self, path, write_delay=DEFAULT_WRITE_DELAY):
+        self.path = path
+        self.write_delay = write_delay
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._state = None
+        self._mtime = None
+        self._pending = {}
+        self._write_handle = None
+        self.writes = 0
+
+    def _load(self):
+        mtime = _mtime(self.path)
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = yaml.safe_load(f)
+            if not isinstance(state, dict):
+                raise ValueError("The statefile does not contain a mapping")
+        except (yaml.YAMLError, ValueError) as e:
+            logging.error(
+                "Invalid yaml syntax in statefile: %s, details: %s", self.path, e
+            )
+            state = deepcopy(DEFAULT_STATEFILE)
+        except OSError as e:
+            logging.error("Statefile could not be opened: %s, details: %s", self.path, e)
+            state = deepcopy(DEFAULT_STATEFILE)
+        # Updates that have not been written yet take precedence.
+        state.update(self._pending)
+        self._state = state
+        self._mtime = mtime
+
+    def _load_if_modified(self):
+        if self._state is None or _mtime(self.path) != self._mtime:
+            self._load()
+
+    def get(self, key, default=None):
+        """
+        Get a value from the statefile.
+        """
+        with self._lock:
+            self._load_if_modified()
+            return deepcopy(self._state.get(key, default))
+
+    def update(self, **values):
+        """
+        Update values in the statefile.
+        When called from the event loop, the write is delayed and coalesced
+        with other updates, otherwise the file is written immediately.
+        """
+        with self._lock:
+            self._load_if_modified()
+            self._state.update(values)
+            self._pending.update(values)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        if self._write_handle is None:
+            self._write_handle = loop.call_later(
+                self.write_delay, self._write_in_executor, loop
+            )
+
+    def _write_in_executor(self, loop):
+        self._write_handle = None
+        loop.run_in_executor(None, self.flush)
+
+    def flush(self):
+        """
+        Write any pending updates to the file.
+        If the file was modified since it was read, for example when CamillaDSP
+        has stored a new volume, it is read again and only the pending updates
+        are applied on top of it.
+        The file is written without holding the lock used by get and update.
+        """
+        with self._write_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                self._load_if_modified()
+                written = dict(self._pending)
+                data = yaml.dump(self._state).encode("utf-8")
+            try:
+                write_file_atomically(self.path, data)
+            except OSError as e:
+                logging.error("Failed to update statefile at %s: %s", self.path, e)
+                return
+            with self._lock:
+                # Values updated again during the write are still pending.
+                for key, value in written.items():
+                    if key in self._pending and self._pending[key] == value:
+                        del self._pending[key]
+                self._mtime = _mtime(self.path)
+                self.writes += 1
+
+    def cancel_delayed_write(self):
+        """
+        Cancel a scheduled write, for use before calling flush at shutdown.
+        """
+        if self._write_handle is not None:
+            self._write_handle.cancel()
+            self._write_handle = None
@@ -0,0 +1,172 @@
+import math
+import threading
+from array import array
+
+# The status values that are recorded in the history.
+HISTORY_METRICS = (
+    "processingload",
+    "bufferlevel",
+    "rateadjust",
+    "clippedsamples",
+    "capturerate",
+)
+
+# Largest number of points returned when no resolution is given.
+DEFAULT_MAX_POINTS = 1000
+
+
+def _as_float(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    return math.nan
+
+
+class StatusHistory:
+    """
+    A fixed size ring buffer of status values.
+    Each metric is stored in a preallocated array of doubles,
+    so the memory use only depends on the capacity.
+    When the buffer is full, the oldest values are overwritten.
+    """
+
+    def __init__(self, capacity, metrics=HISTORY_METRICS):
+        self.capacity = capacity
+        self.metrics = tuple(metrics)
+        self._times = array("d", bytes(8 * capacity))
+        self._values = {name: array("d", bytes(8 * capacity)) for name in self.metrics}
+        self._start = 0
+        self._length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._length
+
+    def _position(self, index):
+        return (self._start + index) % self.capacity
+
+    def record(self, timestamp, status):
+        """
+        Add the values from a status dict.
+        Missing or non-numeric values are stored as NaN.
+        """
+        with self._lock:
+            if self._length and timestamp < self._times[self._position(self._length - 1)]:
+                return
+            if self._length < self.capacity:
+                position = self._position(self._length)
+                self._length += 1
+            else:
+                position = self._start
+                self._start = (self._start + 1) % self.capacity
+            self._times[position] = timestamp
+            for name in self.metrics:
+                self._values[name][position] = _as_float(status.get(name))
+
+    def _first_index_at_or_after(self, timestamp):
+        low, high = 0, self._length
+        while low < high:
+            mid = (low + high) // 2
+            if self._times[self._position(mid)] < timestamp:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def _copy(self, first, last):
+        # Copy the values from index first up to, but not including, last.
+        # The range is at most two slices of the ring buffer.
+        begin = self._position(first)
+        count = last - first
+        if begin + count <= self.capacity:
+            slices = [(begin, begin + count)]
+        else:
+            slices = [(begin, self.capacity), (0, begin + count - self.capacity)]
+
+        def copy(values):
+            result = array("d")
+            for low, high in slices:
+                result.extend(values[low:high])
+            return result
+
+        return copy(self._times), {name: copy(self._values[name]) for name in self.metrics}
+
+    def _first_index_after(self, timestamp):
+        low, high = 0, self._length
+        while low < high:
+            mid = (low + high) // 2
+            if self._times[self._position(mid)] <= timestamp:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def query(self, start=None, end=None, resolution=None):
+        """
+        Get the recorded values between start and end, inclusive,
+        downsampled to one point per resolution seconds.
+        Each point has the start time of its interval,
+        and the min, max and mean of each metric over the interval.
+        Without a resolution, it is chosen to give at most DEFAULT_MAX_POINTS points.
+        """
+        # Only the copying is done while holding the lock,
+        # so that recording is not blocked by a slow query.
+        with self._lock:
+            if self._length == 0:
+                return self._empty_result(resolution)
+            first_time = self._times[self._position(0)]
+            last_time = self._times[self._position(self._length - 1)]
+            start = first_time if start is None else max(start, first_time)
+            end = last_time if end is None else min(end, last_time)
+            if end < start:
+                times, values = array("d"), {name: array("d") for name in self.metrics}
+            else:
+                times, values = self._copy(
+                    self._first_index_at_or_after(start),
+                    self._first_index_after(end),
+                )
+        if resolution is None:
+            resolution = max((end - start) / DEFAULT_MAX_POINTS, 1.0)
+        result = self._empty_result(resolution)
+        bucket = None
+        stats = None
+        for index, timestamp in enumerate(times):
+            current = math.floor((timestamp - start) / resolution)
+            if current != bucket:
+                if stats is not None:
+                    self._append_bucket(result, start + bucket * resolution, stats)
+                bucket = current
+                stats = {name: [math.inf, -math.inf, 0.0, 0] for name in self.metrics}
+            for name in self.metrics:
+                value = values[name][index]
+                if math.isnan(value):
+                    continue
+                stat = stats[name]
+                stat[0] = min(stat[0], value)
+                stat[1] = max(stat[1], value)
+                stat[2] += value
+                stat[3] += 1
+        if stats is not None:
+            self._append_bucket(result, start + bucket * resolution, stats)
+        return result
+
+    def _empty_result(self, resolution):
+        return {
+            "resolution": resolution,
+            "time": [],
+            "metrics": {
+                name: {"min": [], "max": [], "mean": []} for name in self.metrics
+            },
+        }
+
+    def _append_bucket(self, result, timestamp, stats):
+        result["time"].append(timestamp)
+        for name, (low, high, total, count) in stats.items():
+            series = result["metrics"][name]
+            if count:
+                series["min"].append(low)
+                series["max"].append(high)
+                series["mean"].append(total / count)
+            else:
+                series["min"].append(None)
+                series["max"].append(None)
+                series["mean"].append(None)
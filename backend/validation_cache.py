@@ -0,0 +1,219 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from .filemanagement import coefficient_file_paths
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _resolve_tokens(path, config_object):
+    devices = config_object.get("devices")
+    if not isinstance(devices, dict):
+        return path
+    capture = devices.get("capture")
+    if not isinstance(capture, dict):
+        capture = {}
+    return path.replace("$samplerate$", str(devices.get("samplerate"))).replace(
+        "$channels$", str(capture.get("channels"))
+    )
+
+
+def coefficient_file_stamps(config_object):
+    """
+    Get the modification time and size of each coefficient file used by a config,
+    as a list of [path, [mtime, size]] pairs. Missing files get None.
+    The config must have absolute coefficient file paths.
+    """
+    return [
+        [path, _file_stamp(_resolve_tokens(path, config_object))]
+        for path in coefficient_file_paths(config_object)
+    ]
+
+
+def config_hash(config_object, generation=0, stamps=None):
+    """
+    Make a hash of a config, that changes when the config changes
+    or when any of the coefficient files it uses is modified.
+    The config must have absolute coefficient file paths.
+    """
+    canonical = json.dumps(
+        config_object, sort_keys=True, separators=(",", ":"), default=str
+    )
+    if stamps is None:
+        stamps = coefficient_file_stamps(config_object)
+    digest = hashlib.sha256()
+    digest.update(canonical.encode("utf-8"))
+    digest.update(json.dumps([generation, stamps]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ValidationCache:
+    """
+    A bounded cache of validation results.
+    Configs are identified by a hash of their content and the modification
+    times of their coefficient files.
+    The least recently used entry is dropped when the cache is full.
+    """
+
+    def __init__(self, validators, max_entries=32):
+        self._validators = validators
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key):
+        with self._lock:
+            errors = self._entries.get(key)
+            if errors is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(errors)
+
+    def _put(self, key, errors):
+        with self._lock:
+            self._entries[key] = list(errors)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def validate_config(self, config_object, stamps=None):
+        """
+        Validate a config with absolute coefficient file paths,
+        and return the list of errors.
+        The stored result is returned if the same config has already been validated.
+        The coefficient file stamps are read from disk when not given.
+        """
+        key = config_hash(config_object, self._validators.generation, stamps)
+        errors = self._get(key)
+        if errors is not None:
+            return errors
+        with self._validators.validator() as validator:
+            validator.validate_config(config_object)
+            errors = validator.get_errors()
+        self._put(key, errors)
+        return list(errors)
+
+
+# Top level config keys that don't affect the validation result.
+_INFO_KEYS = ("title", "description")
+
+
+def _changed_filter_names(previous, config):
+    """
+    Find the filters that changed between two configs.
+    Returns None if anything else than the parameters of existing filters changed,
+    since then the changes may affect other parts of the config.
+    """
+    keys = (set(previous) | set(config)) - set(_INFO_KEYS)
+    for key in keys:
+        if key != "filters" and previous.get(key) != config.get(key):
+            return None
+    prev_filters = previous.get("filters") or {}
+    filters = config.get("filters") or {}
+    if not isinstance(prev_filters, dict) or not isinstance(filters, dict):
+        return None
+    if prev_filters.keys() != filters.keys():
+        return None
+    changed = []
+    for name, filt in filters.items():
+        prev_filt = prev_filters[name]
+        if filt == prev_filt:
+            continue
+        if not isinstance(filt, dict) or not isinstance(prev_filt, dict):
+            return None
+        if filt.get("type") != prev_filt.get("type"):
+            return None
+        changed.append(name)
+    return changed
+
+
+def _is_filter_issue(issue, names):
+    path = issue[0]
+    return len(path) >= 2 and path[0] == "filters" and path[1] in names
+
+
+class SessionValidator:
+    """
+    Validates configs incrementally, by remembering the last validated
+    config and its errors for each session.
+    When only the parameters of some filters changed since the previous
+    validation, only those filters are validated again.
+    Any other change, such as to devices, mixers or the pipeline,
+    adding, removing or changing the type of a filter,
+    or modifying a coefficient file, falls back to a full validation.
+    """
+
+    def __init__(self, validation_cache, validators, max_sessions=16):
+        self._cache = validation_cache
+        self._validators = validators
+        self._max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+
+    def _previous(self, session):
+        with self._lock:
+            return self._sessions.get(session)
+
+    def _store(self, session, config_object, errors, generation, stamps):
+        with self._lock:
+            self._sessions[session] = (config_object, list(errors), generation, stamps)
+            self._sessions.move_to_end(session)
+            while len(self._sessions) > self._max_sessions:
+                self._sessions.popitem(last=False)
+
+    def _validate_filters(self, config_object, names, previous_errors):
+        reduced = {
+            "devices": config_object.get("devices"),
+            "filters": {name: config_object["filters"][name] for name in names},
+        }
+        with self._validators.validator() as validator:
+            validator.validate_config(reduced)
+            filter_errors = validator.get_errors()
+        errors = [e for e in previous_errors if not _is_filter_issue(e, names)]
+        errors.extend(e for e in filter_errors if _is_filter_issue(e, names))
+        return errors
+
+    def validate_config(self, session, config_object):
+        """
+        Validate a config with absolute coefficient file paths,
+        and return the list of errors.
+        """
+        generation = self._validators.generation
+        stamps = coefficient_file_stamps(config_object)
+        previous = self._previous(session)
+        errors = None
+        if (
+            previous is not None
+            and previous[2] == generation
+            and previous[3] == stamps
+        ):
+            prev_config, prev_errors, _, _ = previous
+            if all(len(issue[0]) > 0 for issue in prev_errors):
+                changed = _changed_filter_names(prev_config, config_object)
+                if changed == []:
+                    errors = list(prev_errors)
+                elif changed is not None:
+                    logging.debug("Validating changed filters: %s", changed)
+                    errors = self._validate_filters(config_object, changed, prev_errors)
+        if errors is None:
+            errors = self._cache.validate_config(config_object, stamps)
+        self._store(session, config_object, errors, generation, stamps)
+        return errors
@@ -0,0 +1,130 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from .metrics import VALIDATION_BUCKETS, Histogram, span
+
+
+class TimedValidator:
+    """
+    Wraps a CamillaValidator, and records the duration of each validation.
+    All other attributes are passed through to the wrapped validator.
+    """
+
+    def __init__(self, validator, durations):
+        self._validator = validator
+        self._durations = durations
+
+    def __getattr__(self, name):
+        return getattr(self._validator, name)
+
+    def _timed(self, method, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            with span("validation"):
+                return method(*args, **kwargs)
+        finally:
+            self._durations.observe(time.perf_counter() - start)
+
+    def validate_config(self, *args, **kwargs):
+        return self._timed(self._validator.validate_config, *args, **kwargs)
+
+    def validate_file(self, *args, **kwargs):
+        return self._timed(self._validator.validate_file, *args, **kwargs)
+
+
+class ValidatorPool:
+    """
+    A pool of CamillaValidator instances.
+
+    A CamillaValidator keeps the result of the last validation as state,
+    so a single instance can't be shared between concurrent validations.
+    The pool hands out one instance per caller, and reuses instances
+    that have been returned.
+    The supported capture and playback types are applied to every
+    instance handed out by the pool.
+    """
+
+    def __init__(
+        self, supported_capture_types=None, supported_playback_types=None, max_idle=4
+    ):
+        self._lock = threading.Lock()
+        self._idle = []
+        self._max_idle = max_idle
+        self._generation = 0
+        self._supported_capture_types = supported_capture_types
+        self._supported_playback_types = supported_playback_types
+        self.durations = Histogram(VALIDATION_BUCKETS)
+
+    def set_supported_capture_types(self, types):
+        """
+        Update the supported capture types.
+        Validators that are in use keep the old types until they are returned.
+        """
+        with self._lock:
+            self._supported_capture_types = types
+            self._discard_idle()
+
+    def set_supported_playback_types(self, types):
+        """
+        Update the supported playback types.
+        Validators that are in use keep the old types until they are returned.
+        """
+        with self._lock:
+            self._supported_playback_types = types
+            self._discard_idle()
+
+    @property
+    def generation(self):
+        """
+        Counter that is incremented each time the supported types change.
+        """
+        return self._generation
+
+    def _discard_idle(self):
+        self._idle = []
+        self._generation += 1
+
+    def acquire(self):
+        """
+        Get a validator for exclusive use by the caller.
+        Returns the validator and the pool generation it was created for.
+        """
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), self._generation
+            generation = self._generation
+            capture_types = self._supported_capture_types
+            playback_types = self._supported_playback_types
+        # The validation module is slow to import, load it on first use.
+        # pylint: disable-next=import-outside-toplevel
+        from camilladsp_plot.validate_config import CamillaValidator
+
+        validator = CamillaValidator()
+        if capture_types is not None:
+            validator.set_supported_capture_types(capture_types)
+        if playback_types is not None:
+            validator.set_supported_playback_types(playback_types)
+        return TimedValidator(validator, self.durations), generation
+
+    def release(self, validator, generation):
+        """
+        Return a validator to the pool.
+        Validators created before the supported types changed are dropped.
+        """
+        with self._lock:
+            if generation == self._generation and len(self._idle) < self._max_idle:
+                self._idle.append(validator)
+
+    @contextmanager
+    def validator(self):
+        """
+        Context manager that provides a validator for exclusive use,
+        and returns it to the pool afterwards.
+        The duration of each validation is recorded in durations.
+        """
+        validator, generation = self.acquire()
+        try:
+            yield validator
+        finally:
+            self.release(validator, generation)
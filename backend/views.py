@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import threading
 import time
@@ -7,17 +8,19 @@ from os.path import basename, expanduser, isfile, join
 import yaml
 from aiohttp import web
 from camilladsp import CamillaError
-from camilladsp_plot import eval_filter, eval_filterstep
-from camilladsp_plot.audiofileread import read_wav_header
 
+from .config_migration import migrate_config_dir_async, result_as_json_line
+from .config_optimizer import optimize_config
+from .config_patch import PatchError, apply_patch
 from .convolver_config_import import ConvolverConfig
 from .eqapo_config_import import EqAPO
 from .filemanagement import (
     coeff_dir_relative_to_config_dir,
     delete_files,
+    file_mtime,
     get_active_config_path,
-    list_of_filenames_in_directory,
-    list_of_files_in_directory,
+    invalidate_active_config_path,
+    iter_uploaded_text,
     make_absolute,
     make_config_filter_paths_absolute,
     make_config_filter_paths_relative,
@@ -33,6 +36,14 @@ from .filemanagement import (
     zip_of_files,
     zip_response,
 )
+from .file_listing import (
+    CONFIG_FIELDS,
+    CONFIG_INFO_FIELDS,
+    FILE_FIELDS,
+    parse_listing_query,
+    pick_fields,
+    select_files,
+)
 from .filters import (
     defaults_for_filter,
     filter_plot_options,
@@ -43,6 +54,8 @@ from .legacy_config_import import (
     identify_version,
     migrate_legacy_config,
 )
+from .load_estimate import estimate_processing_cost
+from .metrics import CONTENT_TYPE, render_metrics, span
 from .settings import GUI_CONFIG_PATH, get_gui_config_or_defaults
 
 OFFLINE_CACHE = {
@@ -69,9 +82,17 @@ async def get_gui_index(request):
     raise web.HTTPFound("/gui/index.html")
 
 
-def _reconnect(cdsp, cache, validator):
+def reconnect(cdsp, cache, validators, metrics, count_first_attempt=True):
+    """
+    Connect to CamillaDSP, retrying once per second until it succeeds.
+    Then read the version, and the backends and devices it supports.
+    """
     done = False
+    count_attempt = count_first_attempt
     while not done:
+        if count_attempt:
+            metrics.count_reconnect_attempt()
+        count_attempt = True
         try:
             cdsp.connect()
             cache["cdsp_version"] = version_string(cdsp.versions.camilladsp())
@@ -80,8 +101,8 @@ def _reconnect(cdsp, cache, validator):
             cache["backends"] = backends
             pb_backends, cap_backends = backends
             logging.debug("Updated backends: %s", backends)
-            validator.set_supported_capture_types(cap_backends)
-            validator.set_supported_playback_types(pb_backends)
+            validators.set_supported_capture_types(cap_backends)
+            validators.set_supported_playback_types(pb_backends)
             # Update playback and capture devices
             for pb_backend in pb_backends:
                 pb_devs = cdsp.general.list_playback_devices(pb_backend)
@@ -96,6 +117,35 @@ def _reconnect(cdsp, cache, validator):
             time.sleep(1)
 
 
+def update_slow_status(app):
+    """
+    Update the status values that change slowly, and return the update time.
+    Returns None without updating if another update is already in progress.
+    Raises IOError if CamillaDSP can't be reached.
+    """
+    lock = app["STATUS_UPDATE_LOCK"]
+    if not lock.acquire(blocking=False):
+        return None
+    try:
+        cdsp = app["CAMILLA"]
+        now = time.time()
+        app["STATUSCACHE"].update(
+            {
+                "capturerate": cdsp.rate.capture(),
+                "rateadjust": cdsp.status.rate_adjust(),
+                "bufferlevel": cdsp.status.buffer_level(),
+                "clippedsamples": cdsp.status.clipped_samples(),
+                "processingload": cdsp.status.processing_load(),
+                "resamplerload": cdsp.status.resampler_load(),
+                "labels": cdsp.levels.labels(),
+            }
+        )
+        app["STORE"]["cache_time"] = now
+        return now
+    finally:
+        lock.release()
+
+
 async def get_status(request):
     """
     Get the state and signal levels etc.
@@ -106,51 +156,116 @@ async def get_status(request):
     reconnect_thread = request.app["STORE"]["reconnect_thread"]
     cache = request.app["STATUSCACHE"]
     cachetime = request.app["STORE"]["cache_time"]
-    validator = request.app["VALIDATOR"]
+    validators = request.app["VALIDATORS"]
     try:
         levels_since = float(request.query.get("since"))
     except Exception:
         levels_since = None
     try:
-        state = cdsp.general.state()
-        state_str = state.name
-        cache["cdsp_status"] = state_str
-        if levels_since is not None:
-            levels = cdsp.levels.levels_since(levels_since)
-        else:
-            levels = cdsp.levels.levels()
-        cache.update(
-            {
-                "capturesignalrms": levels["capture_rms"],
-                "capturesignalpeak": levels["capture_peak"],
-                "playbacksignalrms": levels["playback_rms"],
-                "playbacksignalpeak": levels["playback_peak"],
-            }
-        )
-        now = time.time()
-        # These values don't change that fast, let's update them only once per second.
-        if now - cachetime > 1.0:
-            request.app["STORE"]["cache_time"] = now
+        with span("dsp"):
+            state = cdsp.general.state()
+            state_str = state.name
+            cache["cdsp_status"] = state_str
+            if levels_since is not None:
+                levels = cdsp.levels.levels_since(levels_since)
+            else:
+                levels = cdsp.levels.levels()
             cache.update(
                 {
-                    "capturerate": cdsp.rate.capture(),
-                    "rateadjust": cdsp.status.rate_adjust(),
-                    "bufferlevel": cdsp.status.buffer_level(),
-                    "clippedsamples": cdsp.status.clipped_samples(),
-                    "processingload": cdsp.status.processing_load(),
-                    "resamplerload": cdsp.status.resampler_load(),
-                    "labels": cdsp.levels.labels(),
+                    "capturesignalrms": levels["capture_rms"],
+                    "capturesignalpeak": levels["capture_peak"],
+                    "playbacksignalrms": levels["playback_rms"],
+                    "playbacksignalpeak": levels["playback_peak"],
                 }
             )
+            # These values don't change that fast, let's update them only once per second.
+            if time.time() - cachetime > 1.0:
+                update_slow_status(request.app)
     except IOError:
         if reconnect_thread is None or not reconnect_thread.is_alive():
             cache.update(OFFLINE_CACHE)
             reconnect_thread = threading.Thread(
-                target=_reconnect, args=(cdsp, cache, validator), daemon=True
+                target=reconnect,
+                args=(cdsp, cache, validators, request.app["METRICS"]),
+                daemon=True,
             )
             reconnect_thread.start()
             request.app["STORE"]["reconnect_thread"] = reconnect_thread
-    return web.json_response(cache, headers=HEADERS)
+    with span("serialization"):
+        return web.json_response(cache, headers=HEADERS)
+
+
+def _optional_float_query(request, name):
+    value = request.query.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError as e:
+        raise web.HTTPBadRequest(
+            text=f"Invalid value for {name}: {value}", headers=HEADERS
+        ) from e
+
+
+async def get_ready(request):
+    """
+    Report if the background startup tasks are done.
+    Returns status 503 until the backend is ready to handle all requests.
+    A backend where a required task failed is ready, but degraded.
+    """
+    tasks = request.app["STARTUP_TASKS"]
+    ready = tasks.is_ready()
+    data = {
+        "ready": ready,
+        "degraded": bool(tasks.failed()),
+        "tasks": tasks.status(),
+    }
+    return web.json_response(data, status=200 if ready else 503, headers=HEADERS)
+
+
+async def get_metrics(request):
+    """
+    Get backend and DSP metrics in the Prometheus text format.
+    The DSP values are the ones from the last status update.
+    """
+    return web.Response(
+        text=render_metrics(request.app),
+        headers={**HEADERS, "Content-Type": CONTENT_TYPE},
+    )
+
+
+async def get_request_timings(request):
+    """
+    Get latency percentiles and the mean time spent in each phase,
+    per route, for the most recent requests.
+    """
+    return web.json_response(request.app["METRICS"].timing_summary(), headers=HEADERS)
+
+
+async def get_status_history(request):
+    """
+    Get the recorded history of the processing load, buffer level etc.
+    The optional query parameters "from" and "to" limit the time range,
+    and "resolution" sets the interval in seconds for the min, max and mean values.
+    """
+    start = _optional_float_query(request, "from")
+    end = _optional_float_query(request, "to")
+    resolution = _optional_float_query(request, "resolution")
+    if resolution is not None and resolution <= 0:
+        raise web.HTTPBadRequest(text="Resolution must be positive", headers=HEADERS)
+    loop = asyncio.get_running_loop()
+    history = await loop.run_in_executor(
+        None, request.app["STATUS_HISTORY"].query, start, end, resolution
+    )
+    return web.json_response(history, headers=HEADERS)
+
+
+def _session_key(request):
+    """
+    Identify the gui instance that sent a request.
+    Uses the optional "session" query parameter, with the client address as fallback.
+    """
+    return request.query.get("session", request.remote)
 
 
 def version_string(version_array):
@@ -166,28 +281,29 @@ async def get_param(request):
     """
     name = request.match_info["name"]
     cdsp = request.app["CAMILLA"]
-    if name == "volume":
-        result = cdsp.volume.main_volume()
-    elif name == "mute":
-        result = cdsp.volume.main_mute()
-    elif name == "signalrange":
-        result = cdsp.levels.range()
-    elif name == "signalrangedb":
-        result = cdsp.levels.range_db()
-    elif name == "capturerateraw":
-        result = cdsp.rate.rate_raw()
-    elif name == "updateinterval":
-        result = cdsp.settings.update_interval()
-    elif name == "configname":
-        result = cdsp.config.file_path()
-    elif name == "configraw":
-        result = cdsp.config.active_raw()
-    elif name == "processingload":
-        result = cdsp.status.processing_load()
-    elif name == "resamplerload":
-        result = cdsp.status.resampler_load()
-    else:
-        raise web.HTTPNotFound(text=f"Unknown parameter {name}")
+    with span("dsp"):
+        if name == "volume":
+            result = cdsp.volume.main_volume()
+        elif name == "mute":
+            result = cdsp.volume.main_mute()
+        elif name == "signalrange":
+            result = cdsp.levels.range()
+        elif name == "signalrangedb":
+            result = cdsp.levels.range_db()
+        elif name == "capturerateraw":
+            result = cdsp.rate.rate_raw()
+        elif name == "updateinterval":
+            result = cdsp.settings.update_interval()
+        elif name == "configname":
+            result = cdsp.config.file_path()
+        elif name == "configraw":
+            result = cdsp.config.active_raw()
+        elif name == "processingload":
+            result = cdsp.status.processing_load()
+        elif name == "resamplerload":
+            result = cdsp.status.resampler_load()
+        else:
+            raise web.HTTPNotFound(text=f"Unknown parameter {name}")
     return web.Response(text=str(result), headers=HEADERS)
 
 
@@ -197,10 +313,11 @@ async def get_param_json(request):
     """
     name = request.match_info["name"]
     cdsp = request.app["CAMILLA"]
-    if name == "faders":
-        result = cdsp.volume.all()
-    else:
-        raise web.HTTPNotFound(text=f"Unknown parameter {name}")
+    with span("dsp"):
+        if name == "faders":
+            result = cdsp.volume.all()
+        else:
+            raise web.HTTPNotFound(text=f"Unknown parameter {name}")
     return web.json_response(result, headers=HEADERS)
 
 
@@ -210,12 +327,13 @@ async def get_list_param(request):
     """
     name = request.match_info["name"]
     cdsp = request.app["CAMILLA"]
-    if name == "capturesignalpeak":
-        result = cdsp.levels.capture_peak()
-    elif name == "playbacksignalpeak":
-        result = cdsp.levels.playback_peak()
-    else:
-        result = "[]"
+    with span("dsp"):
+        if name == "capturesignalpeak":
+            result = cdsp.levels.capture_peak()
+        elif name == "playbacksignalpeak":
+            result = cdsp.levels.playback_peak()
+        else:
+            result = "[]"
     return web.json_response(result, headers=HEADERS)
 
 
@@ -226,21 +344,26 @@ async def set_param(request):
     value = await request.text()
     name = request.match_info["name"]
     cdsp = request.app["CAMILLA"]
-    if name == "volume":
-        cdsp.volume.set_main_volume(value)
-    elif name == "mute":
-        if value.lower() == "true":
-            cdsp.volume.set_main_mute(True)
-        elif value.lower() == "false":
-            cdsp.volume.set_main_mute(False)
-        else:
-            raise web.HTTPBadRequest(text=f"Invalid boolean value {value}")
-    elif name == "updateinterval":
-        cdsp.settings.set_update_interval(value)
-    elif name == "configname":
-        cdsp.config.set_file_path(value)
-    elif name == "configraw":
-        cdsp.config.set_active_raw(value)
+    with span("dsp"):
+        if name == "volume":
+            cdsp.volume.set_main_volume(value)
+        elif name == "mute":
+            if value.lower() == "true":
+                cdsp.volume.set_main_mute(True)
+            elif value.lower() == "false":
+                cdsp.volume.set_main_mute(False)
+            else:
+                raise web.HTTPBadRequest(text=f"Invalid boolean value {value}")
+        elif name == "updateinterval":
+            cdsp.settings.set_update_interval(value)
+        elif name == "configname":
+            cdsp.config.set_file_path(value)
+            invalidate_active_config_path(request.app)
+            invalidate_startup_config(request.app)
+        elif name == "configraw":
+            cdsp.config.set_active_raw(value)
+            request.app["STORE"]["active_config"] = None
+            invalidate_startup_config(request.app)
     return web.Response(text="OK", headers=HEADERS)
 
 
@@ -252,15 +375,16 @@ async def set_param_index(request):
     name = request.match_info["name"]
     index = request.match_info["index"]
     cdsp = request.app["CAMILLA"]
-    if name == "volume":
-        cdsp.volume.set_volume(int(index), value)
-    elif name == "mute":
-        if value.lower() == "true":
-            cdsp.volume.set_mute(int(index), True)
-        elif value.lower() == "false":
-            cdsp.volume.set_mute(int(index), False)
-        else:
-            raise web.HTTPBadRequest(text=f"Invalid boolean value {value}")
+    with span("dsp"):
+        if name == "volume":
+            cdsp.volume.set_volume(int(index), value)
+        elif name == "mute":
+            if value.lower() == "true":
+                cdsp.volume.set_mute(int(index), True)
+            elif value.lower() == "false":
+                cdsp.volume.set_mute(int(index), False)
+            else:
+                raise web.HTTPBadRequest(text=f"Invalid boolean value {value}")
     return web.Response(text="OK", headers=HEADERS)
 
 
@@ -275,7 +399,8 @@ async def eval_filter_values(request):
     channels = content["channels"]
     samplerate = content["samplerate"]
     volume = content.get("volume", 0.0)
-    filter_file_names = list_of_filenames_in_directory(request.app["coeff_dir"])
+    with span("file"):
+        filter_file_names = request.app["FILE_WATCHER"].names("coeff")
     if "filename" in config["parameters"]:
         filename = config["parameters"]["filename"]
         options = filter_plot_options(filter_file_names, filename)
@@ -283,13 +408,17 @@ async def eval_filter_values(request):
         options = []
     replace_tokens_in_filter_config(config, samplerate, channels)
     try:
-        data = eval_filter(
-            config,
-            name=(content["name"]),
-            samplerate=samplerate,
-            npoints=1000,
-            volume=volume,
-        )
+        with span("plot"):
+            # pylint: disable-next=import-outside-toplevel
+            from camilladsp_plot import eval_filter
+
+            data = eval_filter(
+                config,
+                name=(content["name"]),
+                samplerate=samplerate,
+                npoints=1000,
+                volume=volume,
+            )
         data["channels"] = channels
         data["options"] = options
         return web.json_response(data, headers=HEADERS)
@@ -312,17 +441,22 @@ async def eval_filterstep_values(request):
     config["devices"]["samplerate"] = samplerate
     config["devices"]["capture"]["channels"] = channels
     plot_config = make_config_filter_paths_absolute(config, config_dir)
-    filter_file_names = list_of_filenames_in_directory(request.app["coeff_dir"])
+    with span("file"):
+        filter_file_names = request.app["FILE_WATCHER"].names("coeff")
     options = pipeline_step_plot_options(filter_file_names, config, step_index)
     for _, filt in plot_config.get("filters", {}).items():
         replace_tokens_in_filter_config(filt, samplerate, channels)
     try:
-        data = eval_filterstep(
-            plot_config,
-            step_index,
-            name=f"Filterstep {step_index}",
-            npoints=1000,
-        )
+        with span("plot"):
+            # pylint: disable-next=import-outside-toplevel
+            from camilladsp_plot import eval_filterstep
+
+            data = eval_filterstep(
+                plot_config,
+                step_index,
+                name=f"Filterstep {step_index}",
+                npoints=1000,
+            )
         data["channels"] = channels
         data["options"] = options
         return web.json_response(data, headers=HEADERS)
@@ -332,13 +466,34 @@ async def eval_filterstep_values(request):
         raise web.HTTPBadRequest(text=str(e))
 
 
+def _update_cached_active_config(store, config):
+    """
+    Store a copy of the active config, and increment the version.
+    """
+    store["active_config"] = config
+    store["active_config_version"] += 1
+    return store["active_config_version"]
+
+
+def _version_headers(version):
+    return {**HEADERS, "X-Config-Version": str(version)}
+
+
 async def get_config(request):
     """
     Get running config.
+    The version of the cached active config is returned in a header,
+    for use as base version for /api/patchconfig.
     """
     cdsp = request.app["CAMILLA"]
-    config = cdsp.config.active()
-    return web.json_response(config, headers=HEADERS)
+    store = request.app["STORE"]
+    with span("dsp"):
+        config = cdsp.config.active()
+    if config != store["active_config"]:
+        _update_cached_active_config(store, config)
+    version = store["active_config_version"]
+    with span("serialization"):
+        return web.json_response(config, headers=_version_headers(version))
 
 
 async def set_config(request):
@@ -349,23 +504,78 @@ async def set_config(request):
     config_object = json["config"]
     config_dir = request.app["config_dir"]
     cdsp = request.app["CAMILLA"]
-    validator = request.app["VALIDATOR"]
     config_object_with_absolute_filter_paths = make_config_filter_paths_absolute(
         config_object, config_dir
     )
     if cdsp.is_connected():
         try:
-            cdsp.config.set_active(config_object_with_absolute_filter_paths)
+            with span("dsp"):
+                cdsp.config.set_active(config_object_with_absolute_filter_paths)
         except CamillaError as e:
             raise web.HTTPUnprocessableEntity(text=str(e))
-    else:
-        validator.validate_config(config_object_with_absolute_filter_paths)
-        errors = validator.get_errors()
-        if len(errors) > 0:
-            return web.json_response(data=errors, headers=HEADERS)
+        invalidate_startup_config(request.app)
+        version = _update_cached_active_config(
+            request.app["STORE"], config_object_with_absolute_filter_paths
+        )
+        return web.Response(text="OK", headers=_version_headers(version))
+    errors = request.app["SESSION_VALIDATOR"].validate_config(
+        _session_key(request), config_object_with_absolute_filter_paths
+    )
+    if len(errors) > 0:
+        return web.json_response(data=errors, headers=HEADERS)
     return web.Response(text="OK", headers=HEADERS)
 
 
+async def patch_config(request):
+    """
+    Apply a JSON Patch to the active config, and send the result to CamillaDSP.
+    The patch is rejected if the base version does not match
+    the version of the cached active config.
+    """
+    content = await request.json()
+    store = request.app["STORE"]
+    cdsp = request.app["CAMILLA"]
+    base_version = content.get("base_version")
+    if store["active_config"] is None:
+        raise web.HTTPConflict(
+            text="No active config available, fetch the config first", headers=HEADERS
+        )
+    if base_version != store["active_config_version"]:
+        raise web.HTTPConflict(
+            text=(
+                f"Base version {base_version} does not match "
+                f"active config version {store['active_config_version']}"
+            ),
+            headers=_version_headers(store["active_config_version"]),
+        )
+    try:
+        patched = apply_patch(store["active_config"], content.get("patch"))
+    except PatchError as e:
+        raise web.HTTPBadRequest(text=str(e), headers=HEADERS)
+    config_object_with_absolute_filter_paths = make_config_filter_paths_absolute(
+        patched, request.app["config_dir"]
+    )
+    if not cdsp.is_connected():
+        raise web.HTTPServiceUnavailable(
+            text="CamillaDSP is offline, the patch was not applied", headers=HEADERS
+        )
+    try:
+        with span("dsp"):
+            cdsp.config.set_active(config_object_with_absolute_filter_paths)
+    except CamillaError as e:
+        raise web.HTTPUnprocessableEntity(text=str(e), headers=HEADERS)
+    except IOError as e:
+        raise web.HTTPServiceUnavailable(
+            text=f"Unable to reach CamillaDSP, the patch was not applied: {e}",
+            headers=HEADERS,
+        )
+    invalidate_startup_config(request.app)
+    version = _update_cached_active_config(
+        store, config_object_with_absolute_filter_paths
+    )
+    return web.json_response({"version": version}, headers=_version_headers(version))
+
+
 async def stop_processing(request):
     """
     Stop CamillaDSP processing.
@@ -430,8 +640,8 @@ def _fetch_dsp_startup_config(cdsp):
             return None
 
 
-def _dsp_startup_config_name(request, cdsp):
-    config_file_name = get_active_config_path(request)
+async def _dsp_startup_config_name(request, cdsp):
+    config_file_name = await get_active_config_path(request)
     if config_file_name:
         return config_file_name
     try:
@@ -443,8 +653,8 @@ def _dsp_startup_config_name(request, cdsp):
     return None
 
 
-def _collect_startup_config_candidates(request):
-    active_config_path = get_active_config_path(request)
+async def _collect_startup_config_candidates(request):
+    active_config_path = await get_active_config_path(request)
     logging.debug("Active config file path: %s", active_config_path)
     default_config_path = request.app["default_config"]
     config_dir = request.app["config_dir"]
@@ -461,18 +671,40 @@ def _collect_startup_config_candidates(request):
     return config_dir, candidates
 
 
-def _find_valid_startup_config_in_files(request, candidates, config_dir):
-    first_error = None
-    for config_path, source, config_name in candidates:
-        config_object, error = _read_config_file_for_startup(
-            request, config_path, config_dir
+def _is_current_version(request, config_object):
+    with request.app["VALIDATORS"].validator() as validator:
+        return identify_version(config_object, validator) == CURRENT_VERSION
+
+
+def _load_startup_candidate(request, config_path, config_dir):
+    config_object, error = _read_config_file_for_startup(
+        request, config_path, config_dir
+    )
+    if error is not None:
+        return None, error
+    return config_object, _is_current_version(request, config_object)
+
+
+async def _find_valid_startup_config_in_files(request, candidates, config_dir):
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(
+        *(
+            loop.run_in_executor(
+                None, _load_startup_candidate, request, config_path, config_dir
+            )
+            for config_path, _source, _name in candidates
         )
-        if error is not None:
+    )
+    first_error = None
+    for (_path, source, config_name), (config_object, result) in zip(
+        candidates, results
+    ):
+        if config_object is None:
             if first_error is None:
-                first_error = error
+                first_error = result
             continue
 
-        if identify_version(config_object) == CURRENT_VERSION:
+        if result:
             return {
                 "configFileName": config_name,
                 "config": config_object,
@@ -485,37 +717,37 @@ def _find_valid_startup_config_in_files(request, candidates, config_dir):
     return None, first_error
 
 
-async def get_config_at_gui_start(request):
+def invalidate_startup_config(app):
     """
-    Get the config to load into the gui when starting.
-    Priority order:
-    - config directly from the dsp
-    - loaded from file using the active file name
-    - loaded from file using the default config file name
+    Forget the cached startup config, it is resolved again on the next request.
     """
+    app["STORE"]["startup_config"] = None
+
+
+async def _resolve_startup_config(request):
     cdsp = request.app["CAMILLA"]
     dsp_config = _fetch_dsp_startup_config(cdsp)
-    if dsp_config is not None and identify_version(dsp_config) == CURRENT_VERSION:
-        config_file_name = _dsp_startup_config_name(request, cdsp)
+    if dsp_config is not None and _is_current_version(request, dsp_config):
+        config_file_name = await _dsp_startup_config_name(request, cdsp)
         data = {"config": dsp_config, "source": "dsp"}
         if config_file_name:
             data["configFileName"] = config_file_name
-        return web.json_response(data, headers=HEADERS)
+        return data
     if dsp_config is not None:
         logging.warning(
             "Ignoring startup config from DSP, not valid for current GUI version"
         )
 
-    config_dir, candidates = _collect_startup_config_candidates(request)
+    config_dir, candidates = await _collect_startup_config_candidates(request)
 
     if len(candidates) == 0:
         raise web.HTTPNotFound(text="No active or default config")
 
-    data, first_error = _find_valid_startup_config_in_files(
+    data, first_error = await _find_valid_startup_config_in_files(
         request, candidates, config_dir
     )
     if data is not None:
-        return web.json_response(data, headers=HEADERS)
+        return data
 
     if first_error is not None:
         raise web.HTTPInternalServerError(text=first_error)
@@ -524,11 +756,35 @@ async def get_config_at_gui_start(request):
     )
 
 
+async def get_config_at_gui_start(request):
+    """
+    Get the config to load into the gui when starting.
+    Priority order:
+    - config directly from the dsp
+    - loaded from file using the active file name
+    - loaded from file using the default config file name
+    The result is cached until the config or the active config file changes,
+    or CamillaDSP connects or disconnects.
+    """
+    store = request.app["STORE"]
+    async with request.app["STARTUP_CONFIG_LOCK"]:
+        key = (
+            request.app["CAMILLA"].is_connected(),
+            file_mtime(request.app["statefile_path"]),
+        )
+        cached = store["startup_config"]
+        if cached is None or cached["key"] != key:
+            data = await _resolve_startup_config(request)
+            cached = {"data": data, "key": key}
+            store["startup_config"] = cached
+    return web.json_response(cached["data"], headers=HEADERS)
+
+
 async def get_active_config_name(request):
     """
     Get the active config file name. If no config is active, return null.
     """
-    active_config_path = get_active_config_path(request)
+    active_config_path = await get_active_config_path(request)
     logging.debug(active_config_path)
     data = {"configFileName": active_config_path}
     return web.json_response(data, headers=HEADERS)
@@ -541,7 +797,8 @@ async def set_active_config_name(request):
     json = await request.json()
     config_name = json["name"]
     config_file = path_of_config_file(request, config_name)
-    set_path_as_active_config(request, config_file)
+    await set_path_as_active_config(request, config_file)
+    invalidate_startup_config(request.app)
     return web.Response(text="OK", headers=HEADERS)
 
 
@@ -578,10 +835,10 @@ async def get_config_file(request):
             migrate_legacy_config(config_object)
             config_object = make_config_filter_paths_relative(config_object, config_dir)
 
-            validator = request.app["VALIDATOR"]
             config_abs = make_config_filter_paths_absolute(config_object, config_dir)
-            validator.validate_config(config_abs)
-            issues = validator.get_errors()
+            with request.app["VALIDATORS"].validator() as validator:
+                validator.validate_config(config_abs)
+                issues = validator.get_errors()
             blocking_errors = [issue for issue in issues if issue[2] == "error"]
             if len(blocking_errors) > 0:
                 details = _format_validation_issues(blocking_errors)
@@ -613,13 +870,41 @@ async def get_config_file(request):
     return web.json_response(config_object, headers=HEADERS)
 
 
+async def migrate_configs(request):
+    """
+    Migrate all legacy config files in config_dir to the current version.
+    The result for each file is streamed back as a line of json
+    as soon as that file is done.
+    """
+    config_dir = request.app["config_dir"]
+    dry_run = str(request.query.get("dryrun", "")).lower() in ("true", "1", "yes")
+    response = web.StreamResponse(headers=HEADERS)
+    response.content_type = "application/x-ndjson"
+    await response.prepare(request)
+    async for result in migrate_config_dir_async(
+        config_dir, request.app["VALIDATORS"], dry_run=dry_run
+    ):
+        request.app["FILE_WATCHER"].refresh(config_dir, (result["name"],))
+        await response.write(result_as_json_line(result))
+    await response.write_eof()
+    return response
+
+
 async def save_config_file(request):
     """
     Save a config to a given filename.
+    The hash of the saved file content is returned in a header.
     """
     content = await request.json()
-    save_config_to_yaml_file(content["filename"], content["config"], request)
-    return web.Response(text="OK", headers=HEADERS)
+    with span("file"):
+        digest = await save_config_to_yaml_file(
+            content["filename"], content["config"], request
+        )
+    request.app["FILE_WATCHER"].refresh(
+        request.app["config_dir"], (content["filename"],)
+    )
+    invalidate_startup_config(request.app)
+    return web.Response(text="OK", headers={**HEADERS, "X-Config-Hash": digest})
 
 
 async def rename_config_file(request):
@@ -628,6 +913,8 @@ async def rename_config_file(request):
     error = rename_config_or_return_error(request, source, target)
     if error:
         raise web.HTTPBadRequest(text=error, headers=HEADERS)
+    request.app["FILE_WATCHER"].refresh(request.app["config_dir"], (source, target))
+    invalidate_startup_config(request.app)
     return web.Response(text="OK", headers=HEADERS)
 
 
@@ -637,6 +924,7 @@ async def rename_coeff_file(request):
     error = rename_coeff_or_return_error(request, source, target)
     if error:
         raise web.HTTPBadRequest(text=error, headers=HEADERS)
+    request.app["FILE_WATCHER"].refresh(request.app["coeff_dir"], (source, target))
     return web.Response(text="OK", headers=HEADERS)
 
 
@@ -654,9 +942,9 @@ async def parse_and_validate_yml_config_to_json(request):
     Parse a yaml config string and return serialized as json.
     """
     config_yaml = await request.text()
-    validator = request.app["VALIDATOR"]
-    validator.validate_yamlstring(config_yaml)
-    config = validator.get_config()
+    with request.app["VALIDATORS"].validator() as validator:
+        validator.validate_yamlstring(config_yaml)
+        config = validator.get_config()
     return web.json_response(config, headers=HEADERS)
 
 
@@ -676,28 +964,73 @@ async def translate_convolver_to_json(request):
     """
     Parse a Convolver config string and return
     as a CamillaDSP config serialized as json.
+    The config can be sent as the request body or as a multipart file upload.
     """
-    config = await request.text()
-    translated = ConvolverConfig(config).to_object()
+    chunks = []
+    async for chunk in iter_uploaded_text(request, request.app["import_max_size"]):
+        chunks.append(chunk)
+    try:
+        translated = ConvolverConfig("".join(chunks)).to_object()
+    except (ValueError, IndexError) as e:
+        raise web.HTTPBadRequest(text=f"Invalid Convolver config: {e}", headers=HEADERS)
     return web.json_response(translated, headers=HEADERS)
 
 
 async def translate_eqapo_to_json(request):
     """
-    Parse a Convolver config string and return
+    Parse an EqualizerAPO config string and return
     as a CamillaDSP config serialized as json.
+    The config can be sent as the request body or as a multipart file upload,
+    and is parsed while it is being received.
     """
     try:
         channels = int(request.rel_url.query.get("channels", None))
     except (ValueError, TypeError) as e:
         raise web.HTTPBadRequest(reason=str(e), headers=HEADERS)
-    config = await request.text()
-    converter = EqAPO(config, channels)
-    converter.translate_file()
-    translated = converter.build_config()
+    converter = EqAPO("", channels)
+    async for chunk in iter_uploaded_text(request, request.app["import_max_size"]):
+        converter.feed(chunk)
+    translated = converter.finish()
     return web.json_response(translated, headers=HEADERS)
 
 
+async def get_optimized_config(request):
+    """
+    Optimize the pipeline of a config.
+    Returns the optimized config and a report of the changes.
+    """
+    config = await request.json()
+    try:
+        optimized, report = optimize_config(config)
+    except (KeyError, TypeError, AttributeError) as e:
+        raise web.HTTPBadRequest(
+            text=f"Unable to optimize config: {e}", headers=HEADERS
+        )
+    return web.json_response({"config": optimized, "report": report}, headers=HEADERS)
+
+
+async def get_load_estimate(request):
+    """
+    Estimate the processing cost of a config.
+    Returns the approximate cost of each pipeline step, of the resampler,
+    and the total, in operations per second.
+    """
+    config = await request.json()
+    config_with_absolute_filter_paths = make_config_filter_paths_absolute(
+        config, request.app["config_dir"]
+    )
+    loop = asyncio.get_running_loop()
+    try:
+        estimate = await loop.run_in_executor(
+            None, estimate_processing_cost, config_with_absolute_filter_paths
+        )
+    except (KeyError, TypeError, AttributeError) as e:
+        raise web.HTTPBadRequest(
+            text=f"Unable to estimate processing cost: {e}", headers=HEADERS
+        )
+    return web.json_response(estimate, headers=HEADERS)
+
+
 async def validate_config(request):
     """
     Validate a config, returned a list of errors or OK.
@@ -707,10 +1040,9 @@ async def validate_config(request):
     config_with_absolute_filter_paths = make_config_filter_paths_absolute(
         config, config_dir
     )
-    validator = request.app["VALIDATOR"]
-    validator.validate_config(config_with_absolute_filter_paths)
-    # print(yaml.dump(config_with_absolute_filter_paths, indent=2))
-    errors = validator.get_errors()
+    errors = request.app["SESSION_VALIDATOR"].validate_config(
+        _session_key(request), config_with_absolute_filter_paths
+    )
     if len(errors) > 0:
         logging.debug("Config has errors")
         logging.debug(errors)
@@ -724,6 +1056,9 @@ async def get_wav_info(request):
     Read the header of a wav file and return the info.
     """
     filename = request.query["filename"]
+    # pylint: disable-next=import-outside-toplevel
+    from camilladsp_plot.audiofileread import read_wav_header
+
     wav_info = read_wav_header(filename)
     return web.json_response(wav_info, headers=HEADERS)
 
@@ -733,7 +1068,9 @@ async def store_coeffs(request):
     Store a FIR coefficients file to coeff_dir.
     """
     folder = request.app["coeff_dir"]
-    return await store_files(folder, request)
+    names = await store_files(folder, request)
+    request.app["FILE_WATCHER"].refresh(folder, names)
+    return web.Response(text=f"Saved {len(names)} file(s)")
 
 
 async def store_configs(request):
@@ -741,28 +1078,100 @@ async def store_configs(request):
     Store a config file to config_dir.
     """
     folder = request.app["config_dir"]
-    return await store_files(folder, request)
+    names = await store_files(folder, request)
+    request.app["FILE_WATCHER"].refresh(folder, names)
+    invalidate_startup_config(request.app)
+    return web.Response(text=f"Saved {len(names)} file(s)")
+
+
+def _listing_query(request, allowed_fields):
+    try:
+        return parse_listing_query(request.query, allowed_fields)
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=str(e), headers=HEADERS) from e
+
+
+def _listing_response(files, total, fields):
+    return web.json_response(
+        pick_fields(files, fields), headers={**HEADERS, "X-Total-Count": str(total)}
+    )
 
 
 async def get_stored_coeffs(request):
     """
     Fetch a list of coefficient files in coeff_dir.
+    The optional query parameters offset, limit, sort, filter and fields
+    select which files and fields to return.
+    The total number of matching files is returned in a header.
     """
-    coeff_dir = request.app["coeff_dir"]
-    coeffs = list_of_files_in_directory(coeff_dir)
-    return web.json_response(coeffs, headers=HEADERS)
+    query = _listing_query(request, FILE_FIELDS)
+    fields = query.pop("fields")
+    with span("file"):
+        total, coeffs = select_files(request.app["FILE_WATCHER"].files("coeff"), **query)
+    return _listing_response(coeffs, total, fields)
+
+
+def handle_file_change(app, event):
+    """
+    Drop the cached values that depend on a file that has changed.
+    """
+    if event["directory"] == "config":
+        invalidate_startup_config(app)
+        app["CONFIG_INFO_INDEX"].forget(event["name"])
+    else:
+        # The validation result of a config depends on its coefficient files.
+        app["CONFIG_INFO_INDEX"].clear()
+
+
+async def file_changes(request):
+    """
+    Websocket that sends an event for every file that is created,
+    modified or deleted in config_dir or coeff_dir.
+    """
+    ws = web.WebSocketResponse(heartbeat=30)
+    await ws.prepare(request)
+    watcher = request.app["FILE_WATCHER"]
+    queue = watcher.subscribe()
+
+    async def send_events():
+        while True:
+            event = await queue.get()
+            await ws.send_json(event)
+
+    sender = asyncio.create_task(send_events())
+    try:
+        # Incoming messages are ignored, this only waits for the client to close.
+        async for _msg in ws:
+            pass
+    finally:
+        sender.cancel()
+        watcher.unsubscribe(queue)
+    return ws
 
 
 async def get_stored_configs(request):
     """
     Fetch a list of config files in config_dir.
+    The optional query parameters offset, limit, sort, filter and fields
+    select which files and fields to return.
+    The total number of matching files is returned in a header.
     """
     config_dir = request.app["config_dir"]
-    validator = request.app["VALIDATOR"]
-    configs = list_of_files_in_directory(
-        config_dir, title_and_desc=True, validator=validator
-    )
-    return web.json_response(configs, headers=HEADERS)
+    query = _listing_query(request, CONFIG_FIELDS)
+    fields = query.pop("fields")
+    with span("file"):
+        total, configs = select_files(
+            request.app["FILE_WATCHER"].files("config"), **query
+        )
+    # Only the selected files are read and validated.
+    # The validation time is counted separately by the validation spans within.
+    if any(field in CONFIG_INFO_FIELDS for field in fields):
+        index = request.app["CONFIG_INFO_INDEX"]
+        with request.app["VALIDATORS"].validator() as validator:
+            with span("file"):
+                for config in configs:
+                    config.update(index.info(config_dir, config, validator))
+    return _listing_response(configs, total, fields)
 
 
 async def delete_coeffs(request):
@@ -772,6 +1181,7 @@ async def delete_coeffs(request):
     coeff_dir = request.app["coeff_dir"]
     files = await request.json()
     delete_files(coeff_dir, files)
+    request.app["FILE_WATCHER"].refresh(coeff_dir, files)
     return web.Response(text="ok", headers=HEADERS)
 
 
@@ -782,6 +1192,8 @@ async def delete_configs(request):
     config_dir = request.app["config_dir"]
     files = await request.json()
     delete_files(config_dir, files)
+    request.app["FILE_WATCHER"].refresh(config_dir, files)
+    invalidate_startup_config(request.app)
     return web.Response(text="ok", headers=HEADERS)
 
 
@@ -0,0 +1,106 @@
+"""
+Compare the linear post-processing of an EqualizerAPO import
+with the list.remove loop it replaced, on a 10k line file.
+Run from the repository root with:
+    python -m benchmarks.eqapo_import
+"""
+
+import logging
+import statistics
+import time
+
+from backend.eqapo_config_import import EqAPO
+from backend.filters import merge_duplicate_filters
+
+NBR_LINES = 10000
+REPEATS = 11
+
+
+class QuadraticEqAPO(EqAPO):
+    """
+    EqAPO with the post-processing as it was done before,
+    removing the empty pipeline steps one by one.
+    """
+
+    def postprocess(self):
+        for step in list(self.pipeline):
+            if step["type"] == "Filter" and len(step["names"]) == 0:
+                self.pipeline.remove(step)
+        for _, mixer in self.mixers.items():
+            for idx, dest in enumerate(list(mixer["mapping"])):
+                if len(dest["sources"]) == 0:
+                    mixer["mapping"].pop(idx)
+        merge_duplicate_filters({"filters": self.filters, "pipeline": self.pipeline})
+
+
+def mixed_lines():
+    """
+    Filters on alternating channels, with a Copy now and then.
+    """
+    lines = ["Preamp: -6 dB"]
+    while len(lines) < NBR_LINES:
+        n = len(lines)
+        if n % 100 == 0:
+            lines.append("Copy: L=R R=L")
+        elif n % 10 == 0:
+            lines.append("Channel: L" if n % 20 == 0 else "Channel: R")
+        else:
+            lines.append(
+                f"Filter {n}: ON PK Fc {20 + n % 15000} Hz Gain -{n % 12}.0 dB Q 1.41"
+            )
+    return "\n".join(lines)
+
+
+def channel_lines():
+    """
+    Channel selections without filters, which all become empty pipeline steps.
+    """
+    lines = ["Filter 1: ON PK Fc 100 Hz Gain -3.0 dB Q 1.41"]
+    while len(lines) < NBR_LINES:
+        lines.append("Channel: L" if len(lines) % 2 else "Channel: R")
+    return "\n".join(lines)
+
+
+def median_ms(converter_class, text):
+    """
+    The median time of a complete import, and of only the post-processing.
+    """
+    totals = []
+    postprocessing = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        converter = converter_class(text, 2)
+        for line in converter.lines:
+            converter.parse_line(line)
+        parsed = time.perf_counter()
+        converter.postprocess()
+        converter.build_config()
+        end = time.perf_counter()
+        totals.append(end - start)
+        postprocessing.append(end - parsed)
+    return statistics.median(totals) * 1e3, statistics.median(postprocessing) * 1e3
+
+
+def main():
+    # The importer logs a warning for each unsupported line.
+    logging.disable(logging.WARNING)
+    for label, text in (
+        ("Mixed Filter/Channel/Copy lines", mixed_lines()),
+        ("Channel lines without filters", channel_lines()),
+    ):
+        expected = QuadraticEqAPO(text, 2).translate_file()
+        assert EqAPO(text, 2).translate_file() == expected
+        print(f"{label}, {NBR_LINES} lines, median of {REPEATS} runs:")
+        for name, converter_class in (
+            ("list.remove loop:", QuadraticEqAPO),
+            ("linear:          ", EqAPO),
+        ):
+            total, postprocessing = median_ms(converter_class, text)
+            print(
+                f"  {name} {total:7.1f} ms in total, "
+                f"{postprocessing:7.1f} ms post-processing"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Compare listing a directory with os.scandir to the os.listdir
+and per file stat calls it replaced, in time and in stat calls.
+Run from the repository root with:
+    python -m benchmarks.file_listing
+"""
+
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from os.path import getmtime, getsize, isfile
+
+from backend.filemanagement import file_in_folder, list_of_files_in_directory
+
+NBR_FILES = 10000
+REPEATS = 21
+
+
+def make_files(folder):
+    for n in range(NBR_FILES):
+        path = os.path.join(folder, f"coeff_{n:05d}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("0.0\n")
+
+
+def listdir_listing(folder):
+    """
+    The directory listing as it was done before os.scandir.
+    """
+    files_list = []
+    for file in os.listdir(folder):
+        filepath = file_in_folder(folder, file)
+        if not isfile(filepath) or file.startswith("."):
+            continue
+        files_list.append(
+            {
+                "name": file,
+                "lastModified": getmtime(filepath),
+                "size": getsize(filepath),
+            }
+        )
+    return sorted(files_list, key=lambda x: x["name"].lower())
+
+
+def names_only_listing(folder):
+    return list_of_files_in_directory(folder, file_stats=False)
+
+
+class CountingEntry:
+    """
+    Wraps an os.DirEntry, and counts the calls that may need a stat syscall.
+    """
+
+    def __init__(self, entry, counts):
+        self._entry = entry
+        self._counts = counts
+        self.name = entry.name
+        self.path = entry.path
+
+    def is_file(self):
+        self._counts["is_file"] += 1
+        return self._entry.is_file()
+
+    def stat(self):
+        self._counts["stat"] += 1
+        return self._entry.stat()
+
+
+def count_stat_calls(function, folder):
+    """
+    List a folder and count the stat calls, per file.
+    os.stat and os.lstat are counted directly. DirEntry.stat() is counted
+    by wrapping the entries of os.scandir, since it does not call os.stat.
+    Returns the stat calls per file, and the DirEntry.is_file() calls per file.
+    """
+    counts = {"stat": 0, "is_file": 0}
+    real_stat, real_lstat, real_scandir = os.stat, os.lstat, os.scandir
+
+    def counting_stat(*args, **kwargs):
+        counts["stat"] += 1
+        return real_stat(*args, **kwargs)
+
+    def counting_lstat(*args, **kwargs):
+        counts["stat"] += 1
+        return real_lstat(*args, **kwargs)
+
+    @contextmanager
+    def counting_scandir(path):
+        with real_scandir(path) as entries:
+            yield (CountingEntry(entry, counts) for entry in entries)
+
+    os.stat, os.lstat, os.scandir = counting_stat, counting_lstat, counting_scandir
+    try:
+        function(folder)
+    finally:
+        os.stat, os.lstat, os.scandir = real_stat, real_lstat, real_scandir
+    return counts["stat"] / NBR_FILES, counts["is_file"] / NBR_FILES
+
+
+def median_ms(function, folder):
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function(folder)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e3
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        make_files(folder)
+        assert listdir_listing(folder) == list_of_files_in_directory(folder)
+        # Warm up the cache, so that both listings read from it.
+        listdir_listing(folder)
+        print(f"Directory with {NBR_FILES} files, median of {REPEATS} runs:")
+        for label, function in (
+            ("os.listdir + isfile/getmtime/getsize:", listdir_listing),
+            ("os.scandir + DirEntry.stat:          ", list_of_files_in_directory),
+            ("os.scandir without file stats:       ", names_only_listing),
+        ):
+            stat_calls, is_file_calls = count_stat_calls(function, folder)
+            print(
+                f"  {label} {median_ms(function, folder):7.1f} ms, "
+                f"{stat_calls:.1f} stat calls and "
+                f"{is_file_calls:.1f} DirEntry.is_file() calls per file"
+            )
+        print(
+            "DirEntry.is_file() uses the file type from the directory listing,\n"
+            "and only needs a stat call on filesystems that don't report it."
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Compare converting the filter paths of a config with structural sharing
+to the deep copy it replaced, in time and peak memory.
+Run from the repository root with:
+    python -m benchmarks.filter_paths
+"""
+
+import statistics
+import timeit
+import tracemalloc
+from copy import deepcopy
+
+from backend.filemanagement import (
+    convert_config_filter_paths,
+    convert_filter_path,
+    make_absolute,
+)
+
+NBR_FILTERS = 500
+NBR_CONV_FILTERS = 50
+NBR_MIXERS = 20
+MIXER_CHANNELS = 8
+NBR_STEPS = 500
+REPEATS = 21
+NUMBER = 20
+CONFIG_DIR = "/home/user/camilladsp/configs"
+
+
+def make_config():
+    """
+    Make a large config, with some Conv filters that read coefficient files.
+    """
+    filters = {}
+    for n in range(NBR_FILTERS):
+        if n < NBR_CONV_FILTERS:
+            filters[f"conv_{n}"] = {
+                "type": "Conv",
+                "parameters": {"type": "Wav", "filename": f"coeffs/conv_{n}.wav"},
+            }
+        else:
+            filters[f"peq_{n}"] = {
+                "type": "Biquad",
+                "parameters": {
+                    "type": "Peaking",
+                    "freq": 100 + n,
+                    "q": 1.0,
+                    "gain": -3,
+                },
+            }
+    mixers = {
+        f"mixer_{n}": {
+            "channels": {"in": MIXER_CHANNELS, "out": MIXER_CHANNELS},
+            "mapping": [
+                {
+                    "dest": dest,
+                    "sources": [
+                        {"channel": source, "gain": -6, "inverted": False}
+                        for source in range(MIXER_CHANNELS)
+                    ],
+                }
+                for dest in range(MIXER_CHANNELS)
+            ],
+        }
+        for n in range(NBR_MIXERS)
+    }
+    names = list(filters)
+    pipeline = [
+        {"type": "Filter", "channels": [n % 2], "names": [names[n % NBR_FILTERS]]}
+        for n in range(NBR_STEPS)
+    ]
+    return {
+        "devices": {
+            "samplerate": 96000,
+            "chunksize": 2048,
+            "capture": {"type": "Stdin", "channels": 2, "format": "S16_LE"},
+            "playback": {"type": "Stdout", "channels": 2, "format": "S32_LE"},
+        },
+        "filters": filters,
+        "mixers": mixers,
+        "pipeline": pipeline,
+    }
+
+
+def conversion(path):
+    return make_absolute(path, CONFIG_DIR)
+
+
+def deep_copy_conversion(config_object):
+    """
+    The path conversion as it was done before the structural sharing.
+    """
+    config = deepcopy(config_object)
+    filters = config.get("filters")
+    if filters is not None:
+        for filt in filters.values():
+            convert_filter_path(filt, conversion)
+    return config
+
+
+def structural_sharing_conversion(config_object):
+    return convert_config_filter_paths(config_object, conversion)
+
+
+def median_ms(function, config):
+    times = timeit.repeat(lambda: function(config), repeat=REPEATS, number=NUMBER)
+    return statistics.median(times) / NUMBER * 1e3
+
+
+def peak_kb(function, config):
+    tracemalloc.start()
+    result = function(config)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak / 1024
+
+
+def main():
+    config = make_config()
+    assert deep_copy_conversion(config) == structural_sharing_conversion(config)
+    print(
+        f"Config with {NBR_FILTERS} filters ({NBR_CONV_FILTERS} Conv), "
+        f"{NBR_MIXERS} {MIXER_CHANNELS}x{MIXER_CHANNELS} mixers "
+        f"and {NBR_STEPS} pipeline steps, median of {REPEATS} runs:"
+    )
+    for label, function in (
+        ("deep copy:         ", deep_copy_conversion),
+        ("structural sharing:", structural_sharing_conversion),
+    ):
+        print(
+            f"  {label} {median_ms(function, config):7.2f} ms, "
+            f"{peak_kb(function, config):7.1f} kB peak"
+        )
+
+
+if __name__ == "__main__":
+    main()
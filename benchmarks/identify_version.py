@@ -0,0 +1,104 @@
+"""
+Compare the single pass legacy version check with the separate checks it replaced.
+Run from the repository root with:
+    python -m benchmarks.identify_version
+"""
+
+import statistics
+import timeit
+
+from backend.legacy_config_import import (
+    _legacy_version,
+    _look_for_v1_devices,
+    _look_for_v1_dither,
+    _look_for_v1_loudness,
+    _look_for_v1_resampler,
+    _look_for_v1_volume,
+    _look_for_v2_devices,
+    _look_for_v2_pipeline,
+    _look_for_v3_mixer,
+    _look_for_v3_sample_formats,
+)
+
+NBR_FILTERS = 500
+NBR_STEPS = 500
+REPEATS = 21
+NUMBER = 200
+
+
+def make_config():
+    """
+    Make a config for the current version, with many filters and pipeline steps.
+    """
+    filters = {
+        f"peq_{n}": {
+            "type": "Biquad",
+            "parameters": {"type": "Peaking", "freq": 100 + n, "q": 1.0, "gain": -3},
+        }
+        for n in range(NBR_FILTERS)
+    }
+    pipeline = [
+        {"type": "Filter", "channels": [n % 2], "names": [f"peq_{n % NBR_FILTERS}"]}
+        for n in range(NBR_STEPS)
+    ]
+    pipeline.append({"type": "Mixer", "name": "2x2"})
+    return {
+        "devices": {
+            "samplerate": 96000,
+            "chunksize": 2048,
+            "capture": {"type": "Stdin", "channels": 2, "format": "S16_LE"},
+            "playback": {"type": "Stdout", "channels": 2, "format": "S32_LE"},
+        },
+        "filters": filters,
+        "mixers": {
+            "2x2": {
+                "channels": {"in": 2, "out": 2},
+                "mapping": [
+                    {"dest": 0, "sources": [{"channel": 0, "gain": 0}]},
+                    {"dest": 1, "sources": [{"channel": 1, "gain": 0}]},
+                ],
+            }
+        },
+        "pipeline": pipeline,
+    }
+
+
+def separate_checks(config):
+    """
+    The legacy version check as it was done before the single pass.
+    """
+    checks = (
+        (_look_for_v1_volume, 1),
+        (_look_for_v1_loudness, 1),
+        (_look_for_v1_resampler, 1),
+        (_look_for_v1_devices, 1),
+        (_look_for_v1_dither, 1),
+        (_look_for_v2_pipeline, 2),
+        (_look_for_v2_devices, 2),
+        (_look_for_v3_mixer, 3),
+        (_look_for_v3_sample_formats, 3),
+    )
+    for check, version in checks:
+        if check(config):
+            return version
+    return None
+
+
+def median_us(function, config):
+    times = timeit.repeat(lambda: function(config), repeat=REPEATS, number=NUMBER)
+    return statistics.median(times) / NUMBER * 1e6
+
+
+def main():
+    config = make_config()
+    assert separate_checks(config) == _legacy_version(config) is None
+    print(
+        f"Config with {NBR_FILTERS} filters and {NBR_STEPS} pipeline steps, "
+        f"median of {REPEATS} runs, without the schema check:"
+    )
+    print(f"  separate checks: {median_us(separate_checks, config):8.1f} us")
+    print(f"  single pass:     {median_us(_legacy_version, config):8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,34 @@
 import argparse
+import asyncio
 import logging
 import ssl
+import threading
+from functools import partial
+from importlib import metadata
 
 import camilladsp
 from aiohttp import web
-from camilladsp_plot import VERSION as plot_version
-from camilladsp_plot.validate_config import CamillaValidator
 
+from backend.config_migration import migrate_config_dir
+from backend.config_saver import ConfigSaver
+from backend.file_listing import ConfigInfoIndex
+from backend.file_watcher import FileWatcher
+from backend.metrics import BackendMetrics, metrics_middleware
 from backend.routes import setup_routes, setup_static_routes
 from backend.settings import CONFIG_PATH, get_config
+from backend.shell_commands import LatestCommandRunner
+from backend.statefile import StatefileManager
+from backend.startup import (
+    StartupTasks,
+    start_background_tasks,
+    stop_background_tasks,
+)
+from backend.startup_profile import StartupProfile, print_startup_profile
+from backend.status_history import StatusHistory
+from backend.validation_cache import SessionValidator, ValidationCache
+from backend.validator_pool import ValidatorPool
 from backend.version import VERSION
-from backend.views import version_string
+from backend.views import handle_file_change, version_string
 
 LOG_LEVELS = ["CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG", "NOTSET"]
 
@@ -20,8 +38,59 @@ LOG_LEVELS = ["CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG", "NOTSET"]
 # logging.error("error")
 
 
+def plot_version():
+    """
+    Get the version of camilladsp_plot, without importing it.
+    """
+    try:
+        return metadata.version("camilladsp_plot")
+    except metadata.PackageNotFoundError:
+        # pylint: disable-next=import-outside-toplevel
+        from camilladsp_plot import VERSION
+
+        return VERSION
+
+
+async def flush_statefile(app):
+    """
+    Write any delayed statefile updates before shutting down.
+    """
+    app["STATEFILE"].cancel_delayed_write()
+    app["STATEFILE"].flush()
+
+
+async def start_file_watcher(app):
+    """
+    Start watching config_dir and coeff_dir for changes.
+    """
+    watcher = app["FILE_WATCHER"]
+    watcher.add_listener(partial(handle_file_change, app))
+    await watcher.start()
+
+
+async def stop_file_watcher(app):
+    app["FILE_WATCHER"].stop()
+
+
+async def finish_config_saves(app):
+    """
+    Wait for config files that are being saved before shutting down.
+    """
+    await app["CONFIG_SAVER"].wait()
+
+
+async def stop_active_config_hook(app):
+    """
+    Stop any on_set_active_config command that is still running when shutting down.
+    """
+    await app["ACTIVE_CONFIG_HOOK"].stop()
+
+
 def build_app(backend_config):
-    app = web.Application(client_max_size=1024**3)  # set max upload file size to 1GB
+    app = web.Application(
+        client_max_size=1024**3,  # set max upload file size to 1GB
+        middlewares=[metrics_middleware],
+    )
     app["config_dir"] = backend_config["config_dir"]
     app["coeff_dir"] = backend_config["coeff_dir"]
     app["default_config"] = backend_config["default_config"]
@@ -33,6 +102,14 @@ def build_app(backend_config):
     app["supported_playback_types"] = backend_config["supported_playback_types"]
     app["can_update_active_config"] = backend_config["can_update_active_config"]
     app["gui_config_file"] = backend_config["gui_config_file"]
+    app["import_max_size"] = backend_config["import_max_size"]
+    app["slow_request_threshold"] = backend_config["slow_request_threshold"]
+    app["active_config_command_timeout"] = backend_config[
+        "active_config_command_timeout"
+    ]
+    app["on_set_active_config_background"] = backend_config[
+        "on_set_active_config_background"
+    ]
     setup_routes(app)
     setup_static_routes(app)
 
@@ -41,31 +118,83 @@ def build_app(backend_config):
     )
     app["STATUSCACHE"] = {
         "backend_version": version_string(VERSION),
-        "py_cdsp_version": version_string(app["CAMILLA"].versions.library()),
-        "py_cdsp_plot_version": plot_version,
+        "py_cdsp_version": None,
+        "py_cdsp_plot_version": plot_version(),
         "backends": [],
         "playback_devices": {},
         "capture_devices": {},
         "labels": {"playback": None, "capture": None},
     }
+    # Makes sure that only one update of the slow status values runs at a time.
+    app["STATUS_UPDATE_LOCK"] = threading.Lock()
+    app["METRICS"] = BackendMetrics()
+    # The status history gets one point per second.
+    app["STATUS_HISTORY"] = StatusHistory(backend_config["status_history_length"])
     app["STORE"] = {
         "reconnect_thread": None,
         "cache_time": 0,
+        "active_config": None,
+        "active_config_version": 0,
+        "active_config_name": None,
+        "status_recorder": None,
+        "startup_config": None,
     }
+    app["STARTUP_CONFIG_LOCK"] = asyncio.Lock()
 
-    camillavalidator = CamillaValidator()
-    if backend_config["supported_capture_types"] is not None:
-        camillavalidator.set_supported_capture_types(
-            backend_config["supported_capture_types"]
-        )
-    if backend_config["supported_playback_types"] is not None:
-        camillavalidator.set_supported_playback_types(
-            backend_config["supported_playback_types"]
-        )
-    app["VALIDATOR"] = camillavalidator
+    app["VALIDATORS"] = ValidatorPool(
+        supported_capture_types=backend_config["supported_capture_types"],
+        supported_playback_types=backend_config["supported_playback_types"],
+    )
+    app["VALIDATION_CACHE"] = ValidationCache(app["VALIDATORS"])
+    app["SESSION_VALIDATOR"] = SessionValidator(
+        app["VALIDATION_CACHE"], app["VALIDATORS"]
+    )
+    if backend_config["statefile_path"]:
+        app["STATEFILE"] = StatefileManager(backend_config["statefile_path"])
+        app.on_cleanup.append(flush_statefile)
+    else:
+        app["STATEFILE"] = None
+    app["ACTIVE_CONFIG_HOOK"] = LatestCommandRunner(
+        backend_config["active_config_command_timeout"]
+    )
+    app.on_cleanup.append(stop_active_config_hook)
+    app["FILE_WATCHER"] = FileWatcher(
+        {"config": app["config_dir"], "coeff": app["coeff_dir"]},
+        poll_interval=backend_config["file_watcher_poll_interval"],
+    )
+    app.on_startup.append(start_file_watcher)
+    app.on_cleanup.append(stop_file_watcher)
+    app["CONFIG_INFO_INDEX"] = ConfigInfoIndex()
+    app["CONFIG_SAVER"] = ConfigSaver()
+    app.on_cleanup.append(finish_config_saves)
+    app["STARTUP_TASKS"] = StartupTasks()
+    app.on_startup.append(start_background_tasks)
+    app.on_cleanup.append(stop_background_tasks)
     return app
 
 
+def run_config_migration(backend_config, dry_run=False):
+    """
+    Migrate all legacy config files in config_dir, and print the progress.
+    """
+    validators = ValidatorPool(
+        supported_capture_types=backend_config["supported_capture_types"],
+        supported_playback_types=backend_config["supported_playback_types"],
+    )
+    counts = {}
+    for result in migrate_config_dir(
+        backend_config["config_dir"], validators, dry_run=dry_run
+    ):
+        status = result["status"]
+        counts[status] = counts.get(status, 0) + 1
+        print(f"{result['name']}: {status}")
+        for path, message, severity in result["errors"] or []:
+            location = "/".join(str(p) for p in path) if path else "config"
+            print(f"    {severity}: {location}: {message}")
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    print(f"Done: {summary or 'no files found'}")
+
+
 def main():
     parser = argparse.ArgumentParser(
         prog="python main.py", description="Backend for the CamillaDSP web GUI"
@@ -87,14 +216,50 @@ def main():
         default="WARNING",
     )
 
+    parser.add_argument(
+        "--profile-startup",
+        help="Print the import times and the duration of each startup phase",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--migrate-configs",
+        help="Migrate all legacy config files in config_dir to the current version and exit",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--dry-run",
+        help="Together with --migrate-configs, check the configs without writing any files",
+        action="store_true",
+    )
+
     args = parser.parse_args()
+    profile = StartupProfile() if args.profile_startup else None
 
     logging.getLogger("aiohttp").setLevel(getattr(logging, args.aiohttp_log_level))
     logging.getLogger("root").setLevel(getattr(logging, args.log_level))
 
     config = get_config(args.config)
+    if profile:
+        profile.mark("load config")
+
+    if args.migrate_configs:
+        run_config_migration(config, dry_run=args.dry_run)
+        return
 
     app = build_app(config)
+    print_started = print
+    if profile:
+        profile.mark("build app")
+
+        def print_started(*args, **kwargs):
+            # Called by run_app once the server is listening.
+            profile.mark("start server")
+            print(*args, **kwargs)
+            # Print from a thread, to not delay the server.
+            asyncio.get_running_loop().run_in_executor(
+                None, print_startup_profile, profile
+            )
+
     if config.get("ssl_certificate"):
         ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
         ssl_context.load_cert_chain(
@@ -103,7 +268,11 @@ def main():
     else:
         ssl_context = None
     web.run_app(
-        app, host=config["bind_address"], port=config["port"], ssl_context=ssl_context
+        app,
+        host=config["bind_address"],
+        port=config["port"],
+        ssl_context=ssl_context,
+        print=print_started,
     )
 
 
@@ -1,7 +1,10 @@
+import asyncio
+import hashlib
 import json
 import os
 import random
 import string
+import time
 from textwrap import dedent
 from unittest.mock import MagicMock, patch
 
@@ -9,9 +12,11 @@ import camilladsp
 import pytest
 import yaml
 from aiohttp import FormData, web
+from camilladsp_plot.validate_config import CamillaValidator
 
 import main
 from backend import views
+from test_eqapo_config_import import EXAMPLE as EQAPO_EXAMPLE
 
 TESTFILE_DIR = os.path.join(os.path.dirname(__file__), "testfiles")
 SAMPLE_CONFIG_PATH = os.path.join(TESTFILE_DIR, "config.yml")
@@ -50,6 +55,12 @@ server_config = {
     "supported_capture_types": None,
     "supported_playback_types": None,
     "can_update_active_config": True,
+    "import_max_size": 1024**2,
+    "status_history_length": 3600,
+    "slow_request_threshold": 1.0,
+    "active_config_command_timeout": 5.0,
+    "on_set_active_config_background": False,
+    "file_watcher_poll_interval": 2.0,
 }
 
 
@@ -256,6 +267,72 @@ async def test_startup_config_online(server):
     assert content["configFileName"] == "config.yml"
 
 
+async def test_startup_config_is_cached(server, mock_app):
+    cdsp = mock_app["CAMILLA"]
+    for _ in range(3):
+        resp = await server.get("/api/getstartconfig")
+        assert resp.status == 200
+    assert cdsp.config.active.call_count == 1
+    resp = await server.post("/api/setactiveconfigfile", json={"name": "config.yml"})
+    assert resp.status == 200
+    resp = await server.get("/api/getstartconfig")
+    assert resp.status == 200
+    assert cdsp.config.active.call_count == 2
+
+
+async def test_save_config_file(aiohttp_client, mock_camillaclient, tmp_path):
+    with patch("camilladsp.CamillaClient", mock_camillaclient):
+        app = main.build_app({**server_config, "config_dir": str(tmp_path)})
+    client = await aiohttp_client(app)
+    name = "saved_by_test.yml"
+    resp = await client.post(
+        "/api/saveconfigfile", json={"filename": name, "config": SAMPLE_CONFIG}
+    )
+    assert resp.status == 200
+    data = (tmp_path / name).read_bytes()
+    assert resp.headers["X-Config-Hash"] == hashlib.sha256(data).hexdigest()
+
+
+async def test_file_changes_websocket(aiohttp_client, mock_camillaclient, tmp_path):
+    with patch("camilladsp.CamillaClient", mock_camillaclient):
+        app = main.build_app({**server_config, "coeff_dir": str(tmp_path)})
+    client = await aiohttp_client(app)
+    ws = await client.ws_connect("/api/filechanges")
+    (tmp_path / "filter.txt").write_text("1.0\n")
+    event = await ws.receive_json(timeout=2)
+    assert event["directory"] == "coeff"
+    assert event["name"] == "filter.txt"
+    resp = await client.get("/api/storedcoeffs")
+    assert [f["name"] for f in await resp.json()] == ["filter.txt"]
+    await ws.close()
+
+
+async def test_stored_coeffs_query(aiohttp_client, mock_camillaclient, tmp_path):
+    for name, size in (("a.txt", 3), ("b.wav", 1), ("c.txt", 2)):
+        (tmp_path / name).write_bytes(b"x" * size)
+    with patch("camilladsp.CamillaClient", mock_camillaclient):
+        app = main.build_app({**server_config, "coeff_dir": str(tmp_path)})
+    client = await aiohttp_client(app)
+    resp = await client.get(
+        "/api/storedcoeffs",
+        params={"filter": "*.txt", "sort": "-size", "limit": 1, "fields": "name"},
+    )
+    assert resp.status == 200
+    assert resp.headers["X-Total-Count"] == "2"
+    assert await resp.json() == [{"name": "a.txt"}]
+    resp = await client.get("/api/storedcoeffs", params={"sort": "color"})
+    assert resp.status == 400
+
+
+async def test_stored_configs_only_requested_fields(server):
+    resp = await server.get(
+        "/api/storedconfigs", params={"filter": "config.yml", "fields": "name,title"}
+    )
+    assert resp.status == 200
+    content = await resp.json()
+    assert content and all(set(item) == {"name", "title"} for item in content)
+
+
 async def test_startup_config_offline(offline_server):
     resp = await offline_server.get("/api/getstartconfig")
     assert resp.status == 200
@@ -322,11 +399,12 @@ async def test_translate_convolver(server):
     assert content["devices"]["samplerate"] == 96000
 
 
+@patch.object(
+    CamillaValidator,
+    "validate_file",
+    MagicMock(side_effect=camilladsp.CamillaError("strict file validation failed")),
+)
 async def test_get_config_file_with_migration_bypasses_file_validation(server):
-    server.app["VALIDATOR"].validate_file = MagicMock(
-        side_effect=camilladsp.CamillaError("strict file validation failed")
-    )
-
     resp_without_migration = await server.get(
         "/api/getconfigfile", params={"name": "config.yml"}
     )
@@ -340,9 +418,11 @@ async def test_get_config_file_with_migration_bypasses_file_validation(server):
     assert isinstance(content["devices"]["samplerate"], int)
 
 
-async def test_stored_configs_missing_files_only_is_warning(server):
-    server.app["VALIDATOR"].validate_config = MagicMock(return_value=None)
-    server.app["VALIDATOR"].get_errors = MagicMock(
+@patch.object(CamillaValidator, "validate_config", MagicMock(return_value=None))
+@patch.object(
+    CamillaValidator,
+    "get_errors",
+    MagicMock(
         return_value=[
             (
                 ["filters", "conv", "parameters", "filename"],
@@ -350,7 +430,9 @@ async def test_stored_configs_missing_files_only_is_warning(server):
                 "warning",
             )
         ]
-    )
+    ),
+)
+async def test_stored_configs_missing_files_only_is_warning(server):
 
     resp = await server.get("/api/storedconfigs")
     assert resp.status == 200
@@ -362,9 +444,11 @@ async def test_stored_configs_missing_files_only_is_warning(server):
     assert config_file["errors"][0][2] == "warning"
 
 
-async def test_stored_configs_missing_files_plus_other_error_is_invalid(server):
-    server.app["VALIDATOR"].validate_config = MagicMock(return_value=None)
-    server.app["VALIDATOR"].get_errors = MagicMock(
+@patch.object(CamillaValidator, "validate_config", MagicMock(return_value=None))
+@patch.object(
+    CamillaValidator,
+    "get_errors",
+    MagicMock(
         return_value=[
             (
                 ["filters", "conv", "parameters", "filename"],
@@ -373,7 +457,9 @@ async def test_stored_configs_missing_files_plus_other_error_is_invalid(server):
             ),
             (["devices", "samplerate"], "Must be larger than 0", "error"),
         ]
-    )
+    ),
+)
+async def test_stored_configs_missing_files_plus_other_error_is_invalid(server):
 
     resp = await server.get("/api/storedconfigs")
     assert resp.status == 200
@@ -385,9 +471,14 @@ async def test_stored_configs_missing_files_plus_other_error_is_invalid(server):
     assert any(issue[2] == "error" for issue in config_file["errors"])
 
 
-async def test_stored_configs_eqapo_text_does_not_crash_and_has_no_version(server):
+async def test_stored_configs_eqapo_text_does_not_crash_and_has_no_version(
+    aiohttp_client, mock_camillaclient, tmp_path
+):
+    with patch("camilladsp.CamillaClient", mock_camillaclient):
+        app = main.build_app({**server_config, "config_dir": str(tmp_path)})
+    server = await aiohttp_client(app)
     filename = "eqapo_like.yml"
-    filepath = os.path.join(TESTFILE_DIR, filename)
+    filepath = os.path.join(str(tmp_path), filename)
     content = dedent("""
         Preamp: -7.08 dB
         Filter 1: ON LSC Fc 105.0 Hz Gain 7.2 dB Q 0.70
@@ -397,19 +488,372 @@ async def test_stored_configs_eqapo_text_does_not_crash_and_has_no_version(serve
     with open(filepath, "w", encoding="utf-8") as f:
         f.write(content)
 
-    try:
-        resp = await server.get("/api/storedconfigs")
+    resp = await server.get("/api/storedconfigs")
+    assert resp.status == 200
+    files = await resp.json()
+    config_file = next((item for item in files if item["name"] == filename), None)
+    assert config_file is not None
+    assert config_file["version"] is None
+    assert config_file["valid"] is False
+    assert config_file["errors"] is not None
+    assert (
+        config_file["errors"][0][1]
+        == "This does not appear to be a CamillaDSP config file."
+    )
+
+
+def test_validator_pool_hands_out_separate_instances(mock_app):
+    pool = mock_app["VALIDATORS"]
+    with pool.validator() as first, pool.validator() as second:
+        assert first is not second
+    with pool.validator() as reused:
+        assert reused in (first, second)
+
+
+def test_validator_pool_drops_validators_when_types_change(mock_app):
+    pool = mock_app["VALIDATORS"]
+    with pool.validator() as old_validator:
+        pool.set_supported_capture_types(["Alsa"])
+    with pool.validator() as new_validator:
+        assert new_validator is not old_validator
+
+
+def test_validator_pool_records_only_validation_time(mock_app):
+    pool = mock_app["VALIDATORS"]
+    with pool.validator() as validator:
+        validator.passes_sections_schema(SAMPLE_CONFIG)
+    assert pool.durations.snapshot()[2] == 0
+    with pool.validator() as validator:
+        validator.validate_config(SAMPLE_CONFIG)
+    assert pool.durations.snapshot()[2] == 1
+
+
+async def test_validate_config_uses_cached_result(server):
+    with patch.object(
+        CamillaValidator, "get_errors", MagicMock(return_value=[])
+    ), patch.object(
+        CamillaValidator, "validate_config", MagicMock(return_value=None)
+    ) as validate:
+        resp = await server.post("/api/validateconfig", json=SAMPLE_CONFIG)
+        assert resp.status == 200
+        resp = await server.post("/api/validateconfig", json=SAMPLE_CONFIG)
         assert resp.status == 200
-        files = await resp.json()
-        config_file = next((item for item in files if item["name"] == filename), None)
-        assert config_file is not None
-        assert config_file["version"] is None
-        assert config_file["valid"] is False
-        assert config_file["errors"] is not None
-        assert (
-            config_file["errors"][0][1]
-            == "This does not appear to be a CamillaDSP config file."
+        assert validate.call_count == 1
+        changed = dict(
+            SAMPLE_CONFIG, devices=dict(SAMPLE_CONFIG["devices"], chunksize=4321)
         )
-    finally:
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        resp = await server.post("/api/validateconfig", json=changed)
+        assert resp.status == 200
+        assert validate.call_count == 2
+
+
+async def test_patch_config(server):
+    resp = await server.get("/api/getconfig")
+    assert resp.status == 200
+    version = int(resp.headers["X-Config-Version"])
+    patch = [{"op": "replace", "path": "/devices/chunksize", "value": 4321}]
+
+    resp = await server.post(
+        "/api/patchconfig", json={"base_version": version, "patch": patch}
+    )
+    assert resp.status == 200
+    content = await resp.json()
+    assert content["version"] == version + 1
+    sent_config = server.app["CAMILLA"].config.set_active.call_args[0][0]
+    assert sent_config["devices"]["chunksize"] == 4321
+
+    resp = await server.post(
+        "/api/patchconfig", json={"base_version": version, "patch": patch}
+    )
+    assert resp.status == 409
+
+
+async def test_patch_config_with_dsp_offline(server):
+    resp = await server.get("/api/getconfig")
+    version = int(resp.headers["X-Config-Version"])
+    patch = [{"op": "replace", "path": "/devices/chunksize", "value": 4321}]
+    cdsp = server.app["CAMILLA"]
+
+    cdsp.is_connected = MagicMock(return_value=False)
+    resp = await server.post(
+        "/api/patchconfig", json={"base_version": version, "patch": patch}
+    )
+    assert resp.status == 503
+    cdsp.config.set_active.assert_not_called()
+
+    cdsp.is_connected = MagicMock(return_value=True)
+    cdsp.config.set_active = MagicMock(side_effect=ConnectionRefusedError)
+    resp = await server.post(
+        "/api/patchconfig", json={"base_version": version, "patch": patch}
+    )
+    assert resp.status == 503
+
+    resp = await server.get("/api/getconfig")
+    assert int(resp.headers["X-Config-Version"]) == version
+
+
+async def test_migrate_configs_dry_run(server):
+    with open(SAMPLE_CONFIG_PATH, "rb") as f:
+        original = f.read()
+    resp = await server.post("/api/migrateconfigs", params={"dryrun": "true"})
+    assert resp.status == 200
+    lines = (await resp.text()).splitlines()
+    results = {result["name"]: result for result in map(json.loads, lines)}
+    assert results["config.yml"]["status"] == "current"
+    assert results["log.txt"]["status"] == "skipped"
+    with open(SAMPLE_CONFIG_PATH, "rb") as f:
+        assert f.read() == original
+
+
+async def test_migrate_configs_closed_early_does_not_wait(server):
+    from backend import config_migration
+
+    def slow_migrate(config_dir, name, validators, dry_run=False):
+        time.sleep(0.2)
+        return {"name": name}
+
+    with patch.object(config_migration, "migrate_config_file", slow_migrate):
+        results = config_migration.migrate_config_dir_async(
+            TESTFILE_DIR, server.app["VALIDATORS"], workers=1, dry_run=True
+        )
+        await results.__anext__()
+        start = time.monotonic()
+        await results.aclose()
+        assert time.monotonic() - start < 0.1
+
+
+async def test_translate_eqapo_multipart_upload(server):
+    data = FormData()
+    data.add_field("file0", EQAPO_EXAMPLE.encode(), filename="eqapo.txt")
+    resp = await server.post("/api/eqapotojson?channels=2", data=data)
+    assert resp.status == 200
+    content = await resp.json()
+    assert "filters" in content
+
+
+async def test_translate_eqapo_too_large(server):
+    too_large = "Preamp: -6 dB\n" * (server.app["import_max_size"] // 10)
+    resp = await server.post("/api/eqapotojson?channels=2", data=too_large)
+    assert resp.status == 413
+
+
+async def test_optimize_config(server):
+    resp = await server.post("/api/optimizeconfig", json=SAMPLE_CONFIG)
+    assert resp.status == 200
+    content = await resp.json()
+    assert content["config"] == SAMPLE_CONFIG
+    assert content["report"]["operations_per_sample_saved"] == 0
+
+
+async def test_estimate_load(server):
+    resp = await server.post("/api/estimateload", json=SAMPLE_CONFIG)
+    assert resp.status == 200
+    content = await resp.json()
+    assert content["unit"] == "operations per second"
+    assert content["total_operations_per_second"] >= 0
+    assert "load" not in content
+
+
+async def test_status_history(server):
+    # The history is recorded in the background, without polling the status.
+    await asyncio.sleep(0.05)
+    resp = await server.get("/api/statushistory?resolution=10")
+    assert resp.status == 200
+    content = await resp.json()
+    assert len(content["time"]) == 1
+    assert content["metrics"]["processingload"]["mean"] == [0.5]
+    assert content["metrics"]["bufferlevel"]["max"] == [1234]
+
+
+async def test_status_history_recording_does_not_block(
+    aiohttp_client, mock_camillaclient
+):
+    def slow_processing_load():
+        time.sleep(0.5)
+        return 0.5
+
+    mock_camillaclient._client.status.processing_load = slow_processing_load
+    with patch("camilladsp.CamillaClient", mock_camillaclient):
+        app = main.build_app(server_config)
+    start = time.monotonic()
+    client = await aiohttp_client(app)
+    await asyncio.sleep(0.05)
+    resp = await client.get("/api/ready")
+    assert resp.status in (200, 503)
+    assert time.monotonic() - start < 0.3
+
+
+async def test_status_history_bad_query(server):
+    resp = await server.get("/api/statushistory?from=yesterday")
+    assert resp.status == 400
+
+
+async def test_metrics(server):
+    resp = await server.get("/api/status")
+    assert resp.status == 200
+    resp = await server.post("/api/validateconfig", json=SAMPLE_CONFIG)
+    assert resp.status == 200
+    resp = await server.get("/metrics")
+    assert resp.status == 200
+    assert resp.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    lines = (await resp.text()).splitlines()
+    assert "camilladsp_processing_load 0.5" in lines
+    assert "camilladsp_buffer_level 1234" in lines
+    assert 'camilladsp_state{state="RUNNING"} 1' in lines
+    assert (
+        'camillagui_http_requests_total{method="GET",route="/api/status",status="200"} 1'
+        in lines
+    )
+    assert (
+        'camillagui_http_request_duration_seconds_count{method="GET",route="/api/status"} 1'
+        in lines
+    )
+    assert "camillagui_validation_cache_misses_total 1" in lines
+    assert "camillagui_validation_duration_seconds_count 1" in lines
+    assert "camillagui_reconnect_attempts_total 0" in lines
+
+
+async def test_request_timings(server):
+    resp = await server.get("/api/status")
+    assert resp.status == 200
+    resp = await server.get("/api/admin/timings")
+    assert resp.status == 200
+    timings = {entry["route"]: entry for entry in await resp.json()}
+    status = timings["/api/status"]
+    assert status["count"] == 1
+    assert "dsp" in status["mean_phases"]
+
+
+async def test_stored_configs_timing_counts_validation(server):
+    def slow_validation(*_args, **_kwargs):
+        time.sleep(0.01)
+
+    with patch.object(
+        CamillaValidator, "validate_config", MagicMock(side_effect=slow_validation)
+    ):
+        resp = await server.get("/api/storedconfigs")
+        assert resp.status == 200
+    resp = await server.get("/api/admin/timings")
+    timings = {entry["route"]: entry for entry in await resp.json()}
+    phases = timings["/api/storedconfigs"]["mean_phases"]
+    assert phases["validation"] >= 0.01
+    assert phases["file"] < phases["validation"]
+
+
+async def test_slow_request_log(aiohttp_client, mock_camillaclient, caplog):
+    with patch("camilladsp.CamillaClient", mock_camillaclient):
+        app = main.build_app({**server_config, "slow_request_threshold": 1e-9})
+    client = await aiohttp_client(app)
+    resp = await client.get("/api/status")
+    assert resp.status == 200
+    messages = [r.getMessage() for r in caplog.records]
+    assert any(m.startswith("Slow request: GET /api/status") for m in messages)
+
+
+async def test_ready(server):
+    for _ in range(100):
+        resp = await server.get("/api/ready")
+        if resp.status == 200:
+            break
+        assert resp.status == 503
+        await asyncio.sleep(0.01)
+    assert resp.status == 200
+    content = await resp.json()
+    assert content["ready"]
+    assert not content["degraded"]
+    assert content["tasks"]["validators"] == "done"
+    assert content["tasks"]["versions"] == "done"
+    assert content["tasks"]["dsp"] in ("pending", "done")
+
+
+async def test_ready_but_degraded_when_a_task_fails(aiohttp_client, mock_camillaclient):
+    mock_camillaclient._client.versions.library = MagicMock(side_effect=IOError)
+    with patch("camilladsp.CamillaClient", mock_camillaclient):
+        app = main.build_app(server_config)
+    client = await aiohttp_client(app)
+    for _ in range(100):
+        resp = await client.get("/api/ready")
+        if resp.status == 200:
+            break
+        await asyncio.sleep(0.01)
+    assert resp.status == 200
+    content = await resp.json()
+    assert content["ready"]
+    assert content["degraded"]
+    assert content["tasks"]["versions"] == "failed"
+
+
+@pytest.fixture
+def active_config_command(tmp_path):
+    counter = tmp_path / "calls.txt"
+    config_path = os.path.join(TESTFILE_DIR, "config2.yml")
+    return counter, f'echo call >> "{counter}"; echo "{config_path}"'
+
+
+async def test_active_config_name_is_cached(
+    aiohttp_client, mock_offline_app, active_config_command
+):
+    counter, command = active_config_command
+    mock_offline_app["on_get_active_config"] = command
+    client = await aiohttp_client(mock_offline_app)
+    for _ in range(3):
+        resp = await client.get("/api/getactiveconfigfilename")
+        assert resp.status == 200
+        content = await resp.json()
+        assert content["configFileName"] == "config2.yml"
+    assert counter.read_text().count("call") == 1
+
+    resp = await client.post("/api/setactiveconfigfile", json={"name": "config.yml"})
+    assert resp.status == 200
+    resp = await client.get("/api/getactiveconfigfilename")
+    assert resp.status == 200
+    assert counter.read_text().count("call") == 2
+
+
+async def test_active_config_command_timeout(aiohttp_client, mock_offline_app):
+    mock_offline_app["on_get_active_config"] = "sleep 5"
+    mock_offline_app["active_config_command_timeout"] = 0.2
+    client = await aiohttp_client(mock_offline_app)
+    resp = await client.get("/api/getactiveconfigfilename")
+    assert resp.status == 200
+    content = await resp.json()
+    assert content["configFileName"] is None
+
+
+async def test_on_set_active_config_command(aiohttp_client, mock_offline_app, tmp_path):
+    target = tmp_path / "active.txt"
+    mock_offline_app["on_set_active_config"] = f"echo {{}} > {target}"
+    client = await aiohttp_client(mock_offline_app)
+    resp = await client.post("/api/setactiveconfigfile", json={"name": "config.yml"})
+    assert resp.status == 200
+    assert target.read_text().strip() == os.path.join(TESTFILE_DIR, "config.yml")
+
+
+async def test_on_set_active_config_bad_template(aiohttp_client, mock_offline_app):
+    mock_offline_app["on_set_active_config"] = "echo {path}"
+    client = await aiohttp_client(mock_offline_app)
+    resp = await client.post("/api/setactiveconfigfile", json={"name": "config.yml"})
+    assert resp.status == 200
+
+
+async def test_on_set_active_config_command_stopped_on_cleanup(
+    aiohttp_client, mock_offline_app
+):
+    mock_offline_app["on_set_active_config"] = "sleep 10"
+    mock_offline_app["on_set_active_config_background"] = True
+    runner = mock_offline_app["ACTIVE_CONFIG_HOOK"]
+    futures = []
+
+    def submit(cmd, submit=runner.submit):
+        futures.append(submit(cmd))
+        return futures[-1]
+
+    runner.submit = submit
+    client = await aiohttp_client(mock_offline_app)
+    resp = await client.post("/api/setactiveconfigfile", json={"name": "config.yml"})
+    assert resp.status == 200
+    await asyncio.sleep(0.1)
+    start = time.monotonic()
+    await client.close()
+    assert time.monotonic() - start < 5
+    assert futures[0].cancelled()
@@ -0,0 +1,78 @@
+import pytest
+
+from backend.config_optimizer import optimize_config
+from backend.eqapo_config_import import EqAPO
+
+
+def gain(value, scale="dB"):
+    return {"type": "Gain", "parameters": {"gain": value, "scale": scale}}
+
+
+def passthrough_mixer(channels):
+    return {
+        "channels": {"in": channels, "out": channels},
+        "mapping": [
+            {"dest": ch, "sources": [{"channel": ch, "gain": 0, "scale": "dB"}]}
+            for ch in range(channels)
+        ],
+    }
+
+
+@pytest.fixture
+def config():
+    return {
+        "devices": {"samplerate": 48000, "capture": {"channels": 2}},
+        "filters": {
+            "pre": gain(-3.0),
+            "pre2": gain(0.5, scale="linear"),
+            "peak": {
+                "type": "Biquad",
+                "parameters": {"type": "Peaking", "freq": 100, "gain": 3, "q": 1},
+            },
+        },
+        "mixers": {"copy": passthrough_mixer(2)},
+        "pipeline": [
+            {"type": "Filter", "channels": None, "names": ["pre"]},
+            {"type": "Mixer", "name": "copy"},
+            {"type": "Filter", "channels": None, "names": ["pre2", "peak"]},
+        ],
+    }
+
+
+def test_optimize_config(config):
+    optimized, report = optimize_config(config)
+    assert report["mixers_removed"] == 1
+    assert report["filter_steps_merged"] == 1
+    assert report["gain_filters_folded"] == 1
+    assert optimized["mixers"] == {}
+    assert len(optimized["pipeline"]) == 1
+    names = optimized["pipeline"][0]["names"]
+    assert names == ["pre+pre2", "peak"]
+    assert optimized["filters"]["pre+pre2"]["parameters"]["gain"] == pytest.approx(
+        -3.0 - 6.0206, abs=1e-3
+    )
+    assert set(optimized["filters"]) == {"pre+pre2", "peak"}
+    assert report["operations_per_sample_saved"] == 2 + 2
+
+
+def test_optimize_does_not_modify_input(config):
+    optimize_config(config)
+    assert len(config["pipeline"]) == 3
+    assert "copy" in config["mixers"]
+
+
+def test_steps_on_different_channels_are_kept(config):
+    config["pipeline"][2]["channels"] = [0]
+    optimized, report = optimize_config(config)
+    assert report["filter_steps_merged"] == 0
+    assert len(optimized["pipeline"]) == 2
+
+
+def test_optimize_eqapo_import():
+    text = "Preamp: -6 dB\nCopy: L=L R=R\nPreamp: -1 dB\nFilter: ON PK Fc 100 Hz Gain 2 dB Q 1\n"
+    converter = EqAPO(text, 2)
+    imported = converter.translate_file()
+    optimized, report = optimize_config(imported)
+    assert report["mixers_removed"] == 1
+    assert len(optimized["pipeline"]) == 1
+    assert optimized["pipeline"][0]["names"] == ["Preamp_1+Preamp_2", "Filter_1"]
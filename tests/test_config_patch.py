@@ -0,0 +1,81 @@
+from copy import deepcopy
+
+import pytest
+
+from backend.config_patch import PatchError, apply_patch
+
+CONFIG = {
+    "devices": {"samplerate": 44100, "chunksize": 1024},
+    "filters": {
+        "gain": {"type": "Gain", "parameters": {"gain": -3.0}},
+        "a/b": {"type": "Gain", "parameters": {"gain": 0.0}},
+    },
+    "mixers": {},
+    "pipeline": [
+        {"type": "Filter", "channels": [0], "names": ["gain"]},
+        {"type": "Filter", "channels": [1], "names": ["gain"]},
+    ],
+}
+
+
+def test_replace_value():
+    config = deepcopy(CONFIG)
+    patched = apply_patch(
+        config, [{"op": "replace", "path": "/filters/gain/parameters/gain", "value": 2}]
+    )
+    assert patched["filters"]["gain"]["parameters"]["gain"] == 2
+    assert config == CONFIG
+
+
+def test_unchanged_sections_are_shared():
+    patched = apply_patch(
+        CONFIG, [{"op": "replace", "path": "/devices/chunksize", "value": 2048}]
+    )
+    assert patched["filters"] is CONFIG["filters"]
+    assert patched["pipeline"] is CONFIG["pipeline"]
+    assert patched["devices"] is not CONFIG["devices"]
+
+
+def test_add_and_remove_in_list():
+    step = {"type": "Filter", "channels": [0, 1], "names": ["gain"]}
+    patched = apply_patch(CONFIG, [{"op": "add", "path": "/pipeline/-", "value": step}])
+    assert patched["pipeline"][-1] == step
+    patched = apply_patch(patched, [{"op": "remove", "path": "/pipeline/0"}])
+    assert len(patched["pipeline"]) == 2
+    assert patched["pipeline"][-1] == step
+
+
+def test_escaped_pointer():
+    patched = apply_patch(
+        CONFIG, [{"op": "replace", "path": "/filters/a~1b/parameters/gain", "value": 1}]
+    )
+    assert patched["filters"]["a/b"]["parameters"]["gain"] == 1
+
+
+def test_move_and_copy():
+    patched = apply_patch(
+        CONFIG,
+        [
+            {"op": "copy", "from": "/filters/gain", "path": "/filters/gain2"},
+            {"op": "move", "from": "/filters/gain", "path": "/filters/gain3"},
+        ],
+    )
+    assert "gain" not in patched["filters"]
+    assert patched["filters"]["gain2"] == CONFIG["filters"]["gain"]
+    assert patched["filters"]["gain3"] == CONFIG["filters"]["gain"]
+
+
+@pytest.mark.parametrize(
+    "patch",
+    [
+        [{"op": "replace", "path": "/filters/missing/type", "value": "Gain"}],
+        [{"op": "remove", "path": "/pipeline/5"}],
+        [{"op": "test", "path": "/devices/samplerate", "value": 48000}],
+        [{"op": "unknown", "path": "/devices"}],
+        [{"op": "add", "path": "devices/x", "value": 1}],
+        {"op": "add", "path": "/devices/x", "value": 1},
+    ],
+)
+def test_invalid_patches(patch):
+    with pytest.raises(PatchError):
+        apply_patch(CONFIG, patch)
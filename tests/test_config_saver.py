@@ -0,0 +1,30 @@
+import asyncio
+
+import yaml
+
+from backend.config_saver import ConfigSaver, content_hash
+
+
+async def test_only_latest_pending_config_is_written(tmp_path):
+    path = str(tmp_path / "config.yml")
+    saver = ConfigSaver()
+    futures = [saver.save(path, {"title": f"config {n}"}) for n in range(3)]
+    results = await asyncio.gather(*futures)
+    with open(path, "rb") as f:
+        data = f.read()
+    assert yaml.safe_load(data) == {"title": "config 2"}
+    assert results == [content_hash(data)] * 3
+    assert saver.writes == 1
+
+
+async def test_unchanged_config_is_not_written_again(tmp_path):
+    path = tmp_path / "config.yml"
+    saver = ConfigSaver()
+    first = await saver.save(str(path), {"title": "config"})
+    second = await saver.save(str(path), {"title": "config"})
+    assert first == second
+    assert saver.writes == 1
+    path.write_text("title: changed elsewhere\n")
+    await saver.save(str(path), {"title": "config"})
+    assert saver.writes == 2
+    assert yaml.safe_load(path.read_text()) == {"title": "config"}
@@ -166,6 +166,26 @@ def test_wav_file_with_multiple_impulse_responses():
     assert conf["filters"]["IR.wav-1"]["parameters"]["channel"] == 1
 
 
+def test_blocks_with_same_impulse_response_share_one_filter():
+    convolver_config = clean_multi_line_string("""
+        0 2 2 0
+        0 0
+        0 0
+        C:\\path\\IR.wav
+        0
+        0.0
+        0.0
+        IR.wav
+        0
+        1.0
+        1.0
+    """)
+    conf = ConvolverConfig(convolver_config).to_object()
+    assert list(conf["filters"].keys()) == ["IR.wav-0"]
+    filter_steps = [step for step in conf["pipeline"] if step["type"] == "Filter"]
+    assert [step["names"] for step in filter_steps] == [["IR.wav-0"], ["IR.wav-0"]]
+
+
 def test_impulse_responses_are_mapped_to_correct_channels():
     convolver_config = clean_multi_line_string("""
         0 1 1 0
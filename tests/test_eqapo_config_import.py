@@ -187,3 +187,37 @@ def test_crossover():
     converter.translate_file()
     conf = converter.build_config()
     assert conf == CROSSOVER_CDSP
+
+
+def test_crossover_from_chunks():
+    converter = EqAPO("", 4)
+    for start in range(0, len(CROSSOVER_EQAPO), 7):
+        converter.feed(CROSSOVER_EQAPO[start : start + 7])
+    conf = converter.finish()
+    assert conf == CROSSOVER_CDSP
+
+
+def test_crossover_from_file(tmp_path):
+    path = tmp_path / "crossover.txt"
+    path.write_text(CROSSOVER_EQAPO, encoding="utf-8")
+    with open(path, encoding="utf-8") as f:
+        converter = EqAPO(f, 4)
+        conf = converter.translate_file()
+    assert conf == CROSSOVER_CDSP
+
+
+DUPLICATES_EQAPO = """
+Channel: L
+Filter  1: ON  PK       Fc     50 Hz   Gain  -3.0 dB  Q 10.00
+Filter  2: ON  PK       Fc     80 Hz   Gain  -2.0 dB  Q 5.00
+Channel: R
+Filter  1: ON  PK       Fc     50 Hz   Gain  -3.0 dB  Q 10.00
+"""
+
+
+def test_duplicate_filters_are_merged():
+    converter = EqAPO(DUPLICATES_EQAPO, 2)
+    conf = converter.translate_file()
+    assert list(conf["filters"].keys()) == ["Filter_1", "Filter_2"]
+    assert conf["pipeline"][0]["names"] == ["Filter_1", "Filter_2"]
+    assert conf["pipeline"][1]["names"] == ["Filter_1"]
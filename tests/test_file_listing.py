@@ -0,0 +1,86 @@
+import pytest
+
+from backend.file_listing import (
+    CONFIG_FIELDS,
+    FILE_FIELDS,
+    ConfigInfoIndex,
+    name_matches,
+    parse_listing_query,
+    pick_fields,
+    select_files,
+)
+
+ENTRIES = [
+    {"name": "b.txt", "lastModified": 3.0, "size": 10},
+    {"name": "A.wav", "lastModified": 1.0, "size": 30},
+    {"name": "c.txt", "lastModified": 2.0, "size": 20},
+    {"name": "d.wav", "lastModified": 2.0, "size": 5},
+]
+
+
+def names(entries):
+    return [entry["name"] for entry in entries]
+
+
+def test_default_query():
+    query = parse_listing_query({}, FILE_FIELDS)
+    assert query == {
+        "offset": 0,
+        "limit": None,
+        "sort": "name",
+        "pattern": None,
+        "fields": FILE_FIELDS,
+    }
+    query.pop("fields")
+    total, selected = select_files(ENTRIES, **query)
+    assert total == 4
+    assert names(selected) == ["A.wav", "b.txt", "c.txt", "d.wav"]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        {"offset": "-1"},
+        {"limit": "many"},
+        {"sort": "color"},
+        {"fields": "name,title"},
+    ],
+)
+def test_invalid_query(query):
+    with pytest.raises(ValueError):
+        parse_listing_query(query, FILE_FIELDS)
+
+
+def test_sort_and_paginate():
+    total, selected = select_files(ENTRIES, sort="-mtime", offset=1, limit=2)
+    assert total == 4
+    # Equal modification times are sorted by name.
+    assert names(selected) == ["c.txt", "d.wav"]
+    total, selected = select_files(ENTRIES, sort="size", offset=3, limit=10)
+    assert names(selected) == ["A.wav"]
+
+
+def test_filter():
+    assert name_matches("Filter_44100.WAV", "*_44100.wav")
+    assert name_matches("Filter_44100.WAV", "filter")
+    assert not name_matches("Filter_44100.WAV", "*.txt")
+    total, selected = select_files(ENTRIES, pattern="*.wav")
+    assert total == 2
+    assert names(selected) == ["A.wav", "d.wav"]
+
+
+def test_pick_fields():
+    assert pick_fields(ENTRIES[:1], ("name", "size")) == [{"name": "b.txt", "size": 10}]
+
+
+def test_config_info_is_reused_while_file_is_unchanged(tmp_path):
+    path = tmp_path / "config.yml"
+    path.write_text("title: First\n")
+    index = ConfigInfoIndex()
+    entry = {"name": "config.yml", "lastModified": 1.0, "size": 13}
+    assert index.info(str(tmp_path), entry, None)["title"] == "First"
+    path.write_text("title: Second\n")
+    assert index.info(str(tmp_path), entry, None)["title"] == "First"
+    changed = {**entry, "lastModified": 2.0}
+    assert index.info(str(tmp_path), changed, None)["title"] == "Second"
+    assert set(CONFIG_FIELDS) >= set(index.info(str(tmp_path), changed, None))
@@ -0,0 +1,199 @@
+import asyncio
+import shutil
+import sys
+
+import pytest
+
+from backend import file_watcher
+from backend.file_watcher import FileWatcher
+
+
+async def next_event(queue):
+    return await asyncio.wait_for(queue.get(), timeout=2)
+
+
+@pytest.fixture(params=["inotify", "polling"])
+def method(request, monkeypatch):
+    if request.param == "inotify" and not sys.platform.startswith("linux"):
+        pytest.skip("inotify is only available on Linux")
+    if request.param == "polling":
+
+        def unavailable():
+            raise OSError("disabled for test")
+
+        monkeypatch.setattr(file_watcher, "_Inotify", unavailable)
+    return request.param
+
+
+async def test_initial_state(tmp_path, method):
+    (tmp_path / "b.yml").write_text("b")
+    (tmp_path / "A.yml").write_text("aa")
+    (tmp_path / ".hidden").write_text("x")
+    (tmp_path / "folder").mkdir()
+    watcher = FileWatcher({"config": str(tmp_path)}, poll_interval=0.05)
+    await watcher.start()
+    try:
+        assert watcher.method == method
+        assert watcher.names("config") == ["A.yml", "b.yml"]
+        files = watcher.files("config")
+        assert [f["size"] for f in files] == [2, 1]
+    finally:
+        watcher.stop()
+
+
+async def test_change_events(tmp_path, method):
+    watcher = FileWatcher({"coeff": str(tmp_path)}, poll_interval=0.05)
+    await watcher.start()
+    queue = watcher.subscribe()
+    try:
+        path = tmp_path / "filter.txt"
+        path.write_text("1.0\n")
+        event = await next_event(queue)
+        assert event["directory"] == "coeff"
+        assert event["name"] == "filter.txt"
+        assert event["event"] in ("created", "modified")
+        path.write_text("1.0\n0.5\n")
+        while event["file"]["size"] != 8:
+            event = await next_event(queue)
+        path.unlink()
+        event = await next_event(queue)
+        assert event == {
+            "directory": "coeff",
+            "event": "deleted",
+            "name": "filter.txt",
+            "file": None,
+        }
+        assert watcher.names("coeff") == []
+    finally:
+        watcher.stop()
+
+
+async def test_listing_includes_refreshed_changes(tmp_path, method):
+    watcher = FileWatcher({"coeff": str(tmp_path)}, poll_interval=60)
+    await watcher.start()
+    try:
+        (tmp_path / "new.txt").write_text("1.0\n")
+        watcher.refresh(str(tmp_path), ["new.txt"])
+        assert watcher.names("coeff") == ["new.txt"]
+    finally:
+        watcher.stop()
+
+
+async def test_inotify_listing_includes_changes_made_just_before(tmp_path, method):
+    if method != "inotify":
+        pytest.skip("polling only sees changes at the next scan")
+    watcher = FileWatcher({"coeff": str(tmp_path)}, poll_interval=60)
+    await watcher.start()
+    try:
+        (tmp_path / "new.txt").write_text("1.0\n")
+        assert watcher.names("coeff") == ["new.txt"]
+    finally:
+        watcher.stop()
+
+
+async def test_polling_listing_does_not_scan(tmp_path, method, monkeypatch):
+    if method != "polling":
+        pytest.skip("only for polling")
+    watcher = FileWatcher({"coeff": str(tmp_path)}, poll_interval=60)
+    await watcher.start()
+    try:
+
+        def fail(_folder):
+            raise AssertionError("scanned while listing")
+
+        monkeypatch.setattr(file_watcher, "scan_directory", fail)
+        assert watcher.names("coeff") == []
+    finally:
+        watcher.stop()
+
+
+@pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify is only available on Linux"
+)
+async def test_fallback_to_polling_per_directory(tmp_path, monkeypatch):
+    watched = tmp_path / "watched"
+    polled = tmp_path / "polled"
+    watched.mkdir()
+    polled.mkdir()
+    add_watch = file_watcher._Inotify.add_watch
+
+    def failing_add_watch(self, path):
+        if path == str(polled):
+            raise OSError("too many watches")
+        return add_watch(self, path)
+
+    monkeypatch.setattr(file_watcher._Inotify, "add_watch", failing_add_watch)
+    watcher = FileWatcher(
+        {"config": str(watched), "coeff": str(polled)}, poll_interval=0.05
+    )
+    await watcher.start()
+    queue = watcher.subscribe()
+    try:
+        assert watcher.methods == {"config": "inotify", "coeff": "polling"}
+        assert watcher.method == "mixed"
+        (polled / "filter.txt").write_text("1.0\n")
+        event = await next_event(queue)
+        assert (event["directory"], event["name"]) == ("coeff", "filter.txt")
+        (watched / "config.yml").write_text("title: x\n")
+        event = await next_event(queue)
+        assert (event["directory"], event["name"]) == ("config", "config.yml")
+    finally:
+        watcher.stop()
+
+
+async def wait_for_file(queue, name):
+    event = await next_event(queue)
+    while event["name"] != name:
+        event = await next_event(queue)
+    return event
+
+
+async def test_recreated_directory_is_watched_again(tmp_path, method):
+    folder = tmp_path / "configs"
+    folder.mkdir()
+    (folder / "old.yml").write_text("old")
+    watcher = FileWatcher({"config": str(folder)}, poll_interval=0.05)
+    await watcher.start()
+    queue = watcher.subscribe()
+    try:
+        shutil.rmtree(folder)
+        folder.mkdir()
+        await asyncio.sleep(0.1)
+        (folder / "new.yml").write_text("new")
+        event = await wait_for_file(queue, "new.yml")
+        assert event["event"] in ("created", "modified")
+        assert watcher.names("config") == ["new.yml"]
+    finally:
+        watcher.stop()
+
+
+@pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify is only available on Linux"
+)
+async def test_removed_directory_is_polled(tmp_path):
+    folder = tmp_path / "configs"
+    folder.mkdir()
+    watcher = FileWatcher({"config": str(folder)}, poll_interval=0.05)
+    await watcher.start()
+    queue = watcher.subscribe()
+    try:
+        assert watcher.methods == {"config": "inotify"}
+        folder.rmdir()
+        await asyncio.sleep(0.1)
+        assert watcher.methods == {"config": "polling"}
+        folder.mkdir()
+        (folder / "new.yml").write_text("new")
+        await wait_for_file(queue, "new.yml")
+        assert watcher.names("config") == ["new.yml"]
+    finally:
+        watcher.stop()
+
+
+async def test_slow_subscriber_gets_overflow(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_watcher, "SUBSCRIBER_QUEUE_SIZE", 2)
+    watcher = FileWatcher({"coeff": str(tmp_path)})
+    queue = watcher.subscribe()
+    for n in range(3):
+        watcher._publish("coeff", "created", f"{n}.txt", None)
+    assert queue.qsize() == 1
+    assert queue.get_nowait() == {"event": "overflow"}
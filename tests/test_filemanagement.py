@@ -0,0 +1,91 @@
+from copy import deepcopy
+
+from backend.filemanagement import (
+    list_of_files_in_directory,
+    make_config_filter_paths_absolute,
+    make_config_filter_paths_relative,
+)
+
+
+def config_with_filters():
+    config = {
+        "devices": {"samplerate": 44100, "capture": {"channels": 2}},
+        "filters": {
+            "conv": {
+                "type": "Conv",
+                "parameters": {"type": "Wav", "filename": "coeffs/filter.wav"},
+            },
+            "conv_abs": {
+                "type": "Conv",
+                "parameters": {"type": "Raw", "filename": "/abs/filter.raw"},
+            },
+            "conv_values": {
+                "type": "Conv",
+                "parameters": {"type": "Values", "values": [1.0, 0.0]},
+            },
+            "peak": {
+                "type": "Biquad",
+                "parameters": {"type": "Peaking", "freq": 100, "gain": 2, "q": 1},
+            },
+        },
+        "mixers": {"mix": {"channels": {"in": 2, "out": 2}, "mapping": []}},
+        "pipeline": [{"type": "Filter", "channels": [0], "names": ["peak"]}],
+    }
+    return config
+
+
+def test_make_paths_absolute():
+    config = config_with_filters()
+    converted = make_config_filter_paths_absolute(config, "/configs")
+    filters = converted["filters"]
+    assert filters["conv"]["parameters"]["filename"] == "/configs/coeffs/filter.wav"
+    assert filters["conv_abs"]["parameters"]["filename"] == "/abs/filter.raw"
+
+
+def test_make_paths_relative():
+    config = config_with_filters()
+    converted = make_config_filter_paths_relative(config, "/abs")
+    filters = converted["filters"]
+    assert filters["conv"]["parameters"]["filename"] == "coeffs/filter.wav"
+    assert filters["conv_abs"]["parameters"]["filename"] == "filter.raw"
+
+
+def test_path_conversion_does_not_modify_input():
+    config = config_with_filters()
+    original = deepcopy(config)
+    make_config_filter_paths_absolute(config, "/configs")
+    assert config == original
+
+
+def test_path_conversion_shares_unmodified_sections():
+    config = config_with_filters()
+    converted = make_config_filter_paths_absolute(config, "/configs")
+    assert converted["devices"] is config["devices"]
+    assert converted["mixers"] is config["mixers"]
+    assert converted["pipeline"] is config["pipeline"]
+    assert converted["filters"]["peak"] is config["filters"]["peak"]
+    assert converted["filters"]["conv_values"] is config["filters"]["conv_values"]
+    assert converted["filters"]["conv"] is not config["filters"]["conv"]
+
+
+def test_path_conversion_without_filters():
+    config = {"devices": {"samplerate": 44100}, "filters": None}
+    converted = make_config_filter_paths_absolute(config, "/configs")
+    assert converted == config
+
+
+def test_list_of_files_in_directory(tmp_path):
+    (tmp_path / "b.txt").write_text("12")
+    (tmp_path / "A.txt").write_text("1")
+    (tmp_path / ".hidden").write_text("1")
+    (tmp_path / "folder").mkdir()
+    (tmp_path / "link.txt").symlink_to(tmp_path / "b.txt")
+    files = list_of_files_in_directory(str(tmp_path))
+    assert [(f["name"], f["size"]) for f in files] == [
+        ("A.txt", 1),
+        ("b.txt", 2),
+        ("link.txt", 2),
+    ]
+    assert files[0]["lastModified"] == (tmp_path / "A.txt").stat().st_mtime
+    names = list_of_files_in_directory(str(tmp_path), file_stats=False)
+    assert names[0] == {"name": "A.txt"}
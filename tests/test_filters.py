@@ -1,4 +1,8 @@
-from backend.filters import filter_plot_options, pipeline_step_plot_options
+from backend.filters import (
+    filter_plot_options,
+    merge_duplicate_filters,
+    pipeline_step_plot_options,
+)
 
 
 def test_filter_plot_options_with_samplerate():
@@ -150,3 +154,22 @@ def test_pipeline_step_plot_options_for_many_samplerate_and_channel_options():
         {"name": "48000 Hz - 8 Channels", "samplerate": 48000, "channels": 8},
     ]
     assert result == expected
+
+
+def test_merge_duplicate_filters():
+    config = {
+        "filters": {
+            "a": {"type": "Gain", "parameters": {"gain": -3.0}, "description": "a"},
+            "b": {"type": "Gain", "parameters": {"gain": 1.0}, "description": "b"},
+            "c": {"type": "Gain", "parameters": {"gain": -3.0}, "description": "c"},
+        },
+        "pipeline": [
+            {"type": "Mixer", "name": "mix"},
+            {"type": "Filter", "channels": [0], "names": ["a", "b"]},
+            {"type": "Filter", "channels": [1], "names": ["c", "b"]},
+        ],
+    }
+    merge_duplicate_filters(config)
+    assert list(config["filters"].keys()) == ["a", "b"]
+    assert config["pipeline"][1]["names"] == ["a", "b"]
+    assert config["pipeline"][2]["names"] == ["a", "b"]
@@ -1,7 +1,10 @@
+from copy import deepcopy
+
 import pytest
 from camilladsp_plot.validate_config import CamillaValidator
 
 from backend.legacy_config_import import (
+    _legacy_version,
     identify_version,
     _look_for_v1_devices,
     _look_for_v1_dither,
@@ -238,3 +241,86 @@ def test_look_for_helpers_with_missing_optional_sections():
     assert _look_for_v2_pipeline(config) is False
     assert _look_for_v3_mixer(config) is False
     assert _look_for_v3_sample_formats(config) is False
+
+
+def _identify_legacy_version_by_separate_checks(config):
+    checks = (
+        (_look_for_v1_volume, 1),
+        (_look_for_v1_loudness, 1),
+        (_look_for_v1_resampler, 1),
+        (_look_for_v1_devices, 1),
+        (_look_for_v1_dither, 1),
+        (_look_for_v2_pipeline, 2),
+        (_look_for_v2_devices, 2),
+        (_look_for_v3_mixer, 3),
+        (_look_for_v3_sample_formats, 3),
+    )
+    for check, version in checks:
+        if check(config):
+            return version
+    return None
+
+
+@pytest.mark.parametrize("fixture", ["config_v1", "config_v2", "config_v3", "config_v4"])
+def test_single_pass_matches_separate_checks(fixture, request):
+    config = request.getfixturevalue(fixture)
+    assert _legacy_version(config) == _identify_legacy_version_by_separate_checks(
+        config
+    )
+
+
+def test_single_pass_matches_separate_checks_for_single_markers(config_v4):
+    variants = []
+
+    config = deepcopy(config_v4)
+    config["devices"]["capture"] = {"type": "File", "channels": 2, "format": "S16LE"}
+    variants.append(config)
+
+    config = deepcopy(config_v4)
+    config["filters"]["conv"] = {
+        "type": "Conv",
+        "parameters": {"type": "Raw", "filename": "a.raw", "format": "FLOAT32LE"},
+    }
+    variants.append(config)
+
+    config = deepcopy(config_v4)
+    config["devices"]["playback"] = {"type": "Pulse", "channels": 2, "format": None}
+    variants.append(config)
+
+    config = deepcopy(config_v4)
+    config["pipeline"][0]["channel"] = 0
+    config["mixers"]["2x2"]["mapping"][0]["sources"].append({"channel": 0, "gain": 0})
+    variants.append(config)
+
+    config = deepcopy(config_v4)
+    config["devices"]["enable_resampling"] = False
+    config["devices"]["capture"]["format"] = "S16LE"
+    variants.append(config)
+
+    for config in variants:
+        assert _legacy_version(config) == _identify_legacy_version_by_separate_checks(
+            config
+        )
+
+
+def test_single_pass_skips_malformed_mixers(config_v4):
+    config_v4["mixers"] = {
+        "no_mapping": {"channels": {"in": 2, "out": 2}},
+        "mapping_not_a_list": {"mapping": {"dest": 0}},
+        "bad_mappings": {
+            "mapping": [
+                "not a mapping",
+                {"sources": [{"channel": 0}]},
+                {"dest": 1},
+                {"dest": 2, "sources": "not a list"},
+                {"dest": 3, "sources": [None, {"gain": 0}, {"channel": 0}]},
+            ]
+        },
+    }
+    assert _legacy_version(config_v4) is None
+
+
+def test_single_pass_finds_v3_mixer_next_to_malformed_mapping(config_v4):
+    config_v4["mixers"]["2x2"]["mapping"].insert(0, {"dest": 5})
+    config_v4["mixers"]["2x2"]["mapping"][1]["sources"].append({"channel": 0})
+    assert _legacy_version(config_v4) == 3
@@ -0,0 +1,91 @@
+import struct
+
+import pytest
+
+from backend.load_estimate import (
+    coefficient_file_taps,
+    estimate_processing_cost,
+    resampler_operations_per_sample,
+)
+from backend.processing_cost import convolution_operations_per_sample
+
+
+@pytest.fixture
+def raw_coeffs(tmp_path):
+    path = tmp_path / "filter_44100.raw"
+    path.write_bytes(struct.pack("<2048f", *([0.0] * 2048)))
+    return str(path)
+
+
+@pytest.fixture
+def text_coeffs(tmp_path):
+    path = tmp_path / "filter.txt"
+    path.write_text("header\n" + "0.1\n" * 100)
+    return str(path)
+
+
+def conv(filename, fmt="FLOAT32LE"):
+    return {
+        "type": "Conv",
+        "parameters": {"type": "Raw", "filename": filename, "format": fmt},
+    }
+
+
+def test_raw_file_taps(raw_coeffs):
+    assert coefficient_file_taps(conv(raw_coeffs)["parameters"]) == 2048
+    assert coefficient_file_taps(conv(raw_coeffs, fmt="S16LE")["parameters"]) == 4096
+
+
+def test_text_file_taps(text_coeffs):
+    parameters = conv(text_coeffs, fmt="TEXT")["parameters"]
+    parameters["skip_bytes_lines"] = 1
+    assert coefficient_file_taps(parameters) == 100
+    parameters["read_bytes_lines"] = 10
+    assert coefficient_file_taps(parameters) == 10
+
+
+def test_missing_file_taps(tmp_path):
+    assert coefficient_file_taps(conv(str(tmp_path / "nothing.raw"))["parameters"]) == 0
+
+
+def test_convolution_cost_grows_with_segments():
+    short = convolution_operations_per_sample(1024, 1024)
+    long = convolution_operations_per_sample(4096, 1024)
+    assert long > short > 0
+    assert convolution_operations_per_sample(0, 1024) == 0
+
+
+def test_resampler_cost():
+    assert resampler_operations_per_sample(None) == 0
+    fast = resampler_operations_per_sample({"type": "AsyncSinc", "profile": "Fast"})
+    accurate = resampler_operations_per_sample(
+        {"type": "AsyncSinc", "profile": "Accurate"}
+    )
+    assert accurate > fast > 0
+    assert resampler_operations_per_sample({"type": "Synchronous"}) > 0
+
+
+def test_estimate_processing_cost(raw_coeffs):
+    config = {
+        "devices": {
+            "samplerate": 44100,
+            "chunksize": 1024,
+            "capture": {"channels": 2},
+            "resampler": {"type": "AsyncSinc", "profile": "Balanced"},
+        },
+        "filters": {
+            "conv": conv(raw_coeffs.replace("44100", "$samplerate$")),
+            "peak": {"type": "Biquad", "parameters": {"type": "Peaking"}},
+        },
+        "pipeline": [
+            {"type": "Filter", "channels": [0, 1], "names": ["conv", "peak"]},
+        ],
+    }
+    estimate = estimate_processing_cost(config)
+    step = estimate["steps"][0]
+    expected = 2 * (convolution_operations_per_sample(2048, 1024) + 5)
+    assert step["operations_per_sample"] == pytest.approx(expected)
+    assert step["operations_per_second"] == pytest.approx(expected * 44100)
+    assert estimate["resampler_operations_per_second"] > 0
+    total = step["operations_per_second"] + estimate["resampler_operations_per_second"]
+    assert estimate["total_operations_per_second"] == pytest.approx(total)
@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+from backend.metrics import (
+    BackendMetrics,
+    Histogram,
+    _request_timing,
+    _RequestTiming,
+    span,
+)
+
+
+def test_histogram_is_cumulative():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 5.0):
+        histogram.observe(value)
+    cumulative, total, count = histogram.snapshot()
+    assert cumulative == [1, 3]
+    assert total == 6.25
+    assert count == 4
+
+
+def test_nested_spans_are_exclusive():
+    timing = _RequestTiming()
+    token = _request_timing.set(timing)
+    try:
+        with span("dsp"):
+            time.sleep(0.01)
+            with span("validation"):
+                time.sleep(0.02)
+    finally:
+        _request_timing.reset(token)
+    assert 0.01 <= timing.phases["dsp"] < 0.02
+    assert timing.phases["validation"] >= 0.02
+
+
+def test_span_outside_request():
+    with span("dsp"):
+        pass
+
+
+def test_timing_summary():
+    metrics = BackendMetrics()
+    for ms in range(1, 101):
+        metrics.observe_request("GET", "/api/status", 200, ms / 1000, {"dsp": 0.001})
+    summary = metrics.timing_summary()
+    assert len(summary) == 1
+    entry = summary[0]
+    assert entry["count"] == 100
+    assert entry["p50"] == 0.05
+    assert entry["p90"] == 0.09
+    assert entry["p99"] == 0.099
+    assert entry["max"] == 0.1
+    assert entry["mean_phases"]["dsp"] == pytest.approx(0.001)
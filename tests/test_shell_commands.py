@@ -0,0 +1,56 @@
+import asyncio
+import sys
+
+import pytest
+
+from backend.shell_commands import (
+    CommandTimeout,
+    LatestCommandRunner,
+    run_shell_command,
+)
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="the commands use a posix shell"
+)
+
+
+async def test_output_is_captured():
+    returncode, stdout, stderr = await run_shell_command(
+        "echo out; echo err >&2; exit 3", timeout=5
+    )
+    assert returncode == 3
+    assert stdout == "out\n"
+    assert stderr == "err\n"
+
+
+async def test_timeout():
+    with pytest.raises(CommandTimeout):
+        await run_shell_command("sleep 5", timeout=0.1)
+
+
+async def test_only_newest_pending_command_runs(tmp_path):
+    log = tmp_path / "log.txt"
+    runner = LatestCommandRunner(timeout=5)
+    first = runner.submit(f"sleep 0.2; echo first >> {log}")
+    # Let the first command start, the next ones are then pending.
+    await asyncio.sleep(0.05)
+    second = runner.submit(f"echo second >> {log}")
+    third = runner.submit(f"echo third >> {log}")
+    results = await asyncio.gather(first, second, third)
+    assert results[0][0] == 0
+    assert results[1] is None
+    assert results[2][0] == 0
+    assert log.read_text().split() == ["first", "third"]
+
+
+async def test_stop_kills_running_command(tmp_path):
+    log = tmp_path / "log.txt"
+    runner = LatestCommandRunner(timeout=5)
+    running = runner.submit(f"sleep 0.3; echo running >> {log}")
+    await asyncio.sleep(0.05)
+    pending = runner.submit(f"echo pending >> {log}")
+    await runner.stop()
+    assert running.cancelled()
+    assert pending.cancelled()
+    await asyncio.sleep(0.4)
+    assert not log.exists()
@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+from backend.startup_profile import StartupProfile, import_time_breakdown
+
+ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
+
+
+def test_plot_and_validation_imports_are_deferred():
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, main; print(any(m.startswith('camilladsp_plot') for m in sys.modules))",
+        ],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "False"
+
+
+def test_import_time_breakdown():
+    total, imports = import_time_breakdown("json")
+    assert total > 0
+    assert "json.decoder" in [name for name, _ in imports]
+
+
+def test_startup_profile_phases():
+    profile = StartupProfile()
+    profile.mark("first")
+    profile.mark("second")
+    assert [name for name, _ in profile.phases] == ["first", "second"]
@@ -0,0 +1,90 @@
+import asyncio
+import os
+
+import yaml
+
+from backend.statefile import StatefileManager
+
+
+def write_state(path, state):
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.dump(state, f)
+
+
+def read_state(path):
+    with open(path, encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def test_update_without_event_loop_writes_immediately(tmp_path):
+    path = tmp_path / "statefile.yml"
+    write_state(path, {"config_path": "a.yml", "volume": [0.0]})
+    manager = StatefileManager(str(path))
+    manager.update(config_path="b.yml")
+    assert read_state(path) == {"config_path": "b.yml", "volume": [0.0]}
+    assert [name for name in os.listdir(tmp_path)] == ["statefile.yml"]
+
+
+def test_reload_on_external_change(tmp_path):
+    path = tmp_path / "statefile.yml"
+    write_state(path, {"config_path": "a.yml"})
+    manager = StatefileManager(str(path))
+    assert manager.get("config_path") == "a.yml"
+    write_state(path, {"config_path": "c.yml"})
+    os.utime(path, ns=(1, 1))
+    assert manager.get("config_path") == "c.yml"
+
+
+def test_invalid_statefile_uses_defaults(tmp_path):
+    path = tmp_path / "statefile.yml"
+    path.write_text("config_path: [unclosed")
+    manager = StatefileManager(str(path))
+    assert manager.get("config_path") is None
+    assert manager.get("mute") == [False, False, False, False, False]
+
+
+async def test_updates_are_coalesced(tmp_path):
+    path = tmp_path / "statefile.yml"
+    write_state(path, {"config_path": "a.yml"})
+    manager = StatefileManager(str(path), write_delay=0.05)
+    for name in ("b.yml", "c.yml", "d.yml"):
+        manager.update(config_path=name)
+    assert manager.get("config_path") == "d.yml"
+    assert read_state(path)["config_path"] == "a.yml"
+    for _ in range(50):
+        await asyncio.sleep(0.02)
+        if manager.writes:
+            break
+    assert manager.writes == 1
+    assert read_state(path)["config_path"] == "d.yml"
+
+
+async def test_pending_update_survives_external_change(tmp_path):
+    path = tmp_path / "statefile.yml"
+    write_state(path, {"config_path": "a.yml", "volume": [0.0]})
+    manager = StatefileManager(str(path), write_delay=10)
+    manager.update(config_path="b.yml")
+    write_state(path, {"config_path": "a.yml", "volume": [-10.0]})
+    os.utime(path, ns=(1, 1))
+    assert manager.get("volume") == [-10.0]
+    manager.cancel_delayed_write()
+    manager.flush()
+    assert read_state(path) == {"config_path": "b.yml", "volume": [-10.0]}
+
+
+async def test_flush_keeps_external_change_made_during_delay(tmp_path):
+    path = tmp_path / "statefile.yml"
+    write_state(path, {"config_path": "a.yml", "mute": [False], "volume": [0.0]})
+    manager = StatefileManager(str(path), write_delay=10)
+    manager.get("config_path")
+    manager.update(config_path="b.yml")
+    # CamillaDSP stores a new volume before the delayed write.
+    write_state(path, {"config_path": "a.yml", "mute": [True], "volume": [-20.0]})
+    os.utime(path, ns=(1, 1))
+    manager.cancel_delayed_write()
+    manager.flush()
+    assert read_state(path) == {
+        "config_path": "b.yml",
+        "mute": [True],
+        "volume": [-20.0],
+    }
@@ -0,0 +1,71 @@
+import math
+
+import pytest
+
+from backend.status_history import StatusHistory
+
+
+def status(load, level=1000):
+    return {
+        "processingload": load,
+        "bufferlevel": level,
+        "rateadjust": 1.0,
+        "clippedsamples": 0,
+        "capturerate": 44100,
+    }
+
+
+@pytest.fixture
+def history():
+    history = StatusHistory(10)
+    for second in range(6):
+        history.record(100.0 + second, status(float(second)))
+    return history
+
+
+def test_empty_history():
+    result = StatusHistory(4).query()
+    assert result["time"] == []
+    assert result["metrics"]["processingload"]["mean"] == []
+
+
+def test_full_resolution(history):
+    result = history.query(resolution=1)
+    assert result["time"] == [100.0, 101.0, 102.0, 103.0, 104.0, 105.0]
+    assert result["metrics"]["processingload"]["mean"] == [0, 1, 2, 3, 4, 5]
+
+
+def test_downsampling(history):
+    result = history.query(start=100, end=105, resolution=3)
+    assert result["time"] == [100.0, 103.0]
+    load = result["metrics"]["processingload"]
+    assert load["min"] == [0.0, 3.0]
+    assert load["max"] == [2.0, 5.0]
+    assert load["mean"] == [1.0, 4.0]
+
+
+def test_time_range(history):
+    result = history.query(start=102, end=103.5, resolution=1)
+    assert result["time"] == [102.0, 103.0]
+    assert history.query(start=200)["time"] == []
+
+
+def test_oldest_values_are_overwritten():
+    history = StatusHistory(4)
+    for second in range(10):
+        history.record(float(second), status(float(second)))
+    assert len(history) == 4
+    result = history.query(resolution=1)
+    assert result["time"] == [6.0, 7.0, 8.0, 9.0]
+
+
+def test_missing_values_are_skipped():
+    history = StatusHistory(4)
+    history.record(0.0, status(None))
+    history.record(0.5, status(2.0))
+    result = history.query(resolution=1)
+    assert result["metrics"]["processingload"]["mean"] == [2.0]
+    history.record(1.0, {})
+    result = history.query(start=1, resolution=1)
+    assert result["metrics"]["processingload"]["mean"] == [None]
+    assert not math.isnan(result["time"][0])
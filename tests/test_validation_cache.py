@@ -0,0 +1,105 @@
+import os
+from contextlib import contextmanager
+
+from backend.validation_cache import (
+    SessionValidator,
+    ValidationCache,
+    _changed_filter_names,
+)
+
+
+def config():
+    return {
+        "title": "Test",
+        "devices": {"samplerate": 44100, "chunksize": 1024},
+        "filters": {
+            "lowpass": {
+                "type": "Biquad",
+                "parameters": {"type": "Lowpass", "freq": 1000, "q": 0.7},
+            },
+            "gain": {"type": "Gain", "parameters": {"gain": -3.0}},
+        },
+        "pipeline": [{"type": "Filter", "channels": [0], "names": ["lowpass"]}],
+    }
+
+
+def test_no_changes():
+    assert _changed_filter_names(config(), config()) == []
+
+
+def test_title_change_is_ignored():
+    changed = config()
+    changed["title"] = "Other"
+    assert _changed_filter_names(config(), changed) == []
+
+
+def test_changed_filter_parameter():
+    changed = config()
+    changed["filters"]["gain"]["parameters"]["gain"] = -6.0
+    assert _changed_filter_names(config(), changed) == ["gain"]
+
+
+def test_changed_filter_type_needs_full_validation():
+    changed = config()
+    changed["filters"]["gain"] = {"type": "Volume", "parameters": {"fader": "Aux1"}}
+    assert _changed_filter_names(config(), changed) is None
+
+
+def test_added_filter_needs_full_validation():
+    changed = config()
+    changed["filters"]["other"] = {"type": "Gain", "parameters": {"gain": 1.0}}
+    assert _changed_filter_names(config(), changed) is None
+
+
+def test_changed_pipeline_needs_full_validation():
+    changed = config()
+    changed["pipeline"][0]["names"].append("gain")
+    assert _changed_filter_names(config(), changed) is None
+
+
+class MissingFileValidator:
+    """
+    Reports an error for each Conv filter with a missing coefficient file.
+    """
+
+    def __init__(self):
+        self.errors = []
+
+    def validate_config(self, config_object):
+        self.errors = [
+            (["filters", name, "parameters", "filename"], "missing file", "error")
+            for name, filt in config_object.get("filters", {}).items()
+            if filt["type"] == "Conv"
+            and not os.path.exists(filt["parameters"]["filename"])
+        ]
+
+    def get_errors(self):
+        return self.errors
+
+
+class Validators:
+    generation = 0
+
+    @contextmanager
+    def validator(self):
+        yield MissingFileValidator()
+
+
+def test_session_validator_notices_coefficient_file_changes(tmp_path):
+    coeff_path = tmp_path / "coeffs.wav"
+    conv_config = config()
+    conv_config["filters"]["conv"] = {
+        "type": "Conv",
+        "parameters": {"type": "Wav", "filename": str(coeff_path)},
+    }
+    validators = Validators()
+    session_validator = SessionValidator(ValidationCache(validators), validators)
+    assert len(session_validator.validate_config("gui", conv_config)) == 1
+
+    coeff_path.write_bytes(b"RIFF")
+    assert session_validator.validate_config("gui", conv_config) == []
+
+    # Only the gain changed, but the file was removed too.
+    coeff_path.unlink()
+    conv_config["filters"]["gain"]["parameters"]["gain"] = -6.0
+    assert len(session_validator.validate_config("gui", conv_config)) == 1